@@ -1,9 +1,20 @@
 from __future__ import annotations
 
+import asyncio
+import contextlib
+import fcntl
+import hashlib
 import importlib
 import importlib.util
+import json
 import os
-from typing import Any, Optional
+import tempfile
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, AsyncIterator, Optional
 
 DEFAULT_MODEL = "gpt-5.2-chat-latest"
 MODEL_FALLBACKS = [
@@ -13,15 +24,296 @@ MODEL_FALLBACKS = [
     "gpt-4.1",
 ]
 REASONING_EFFORTS: list[Optional[str]] = ["high", "xhigh", "medium", None]
+MAX_IN_FLIGHT = 8
+CACHE_MODES = ("off", "readwrite", "record", "replay")
+DEFAULT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_CAPABILITIES_TTL_SECONDS = 24 * 60 * 60
+
+# Process-wide state: one pooled OpenAI client per (api key, base url), plus a
+# bound on concurrent requests shared by every LLMClient instance and by sync
+# and async calls alike.
+_SHARED_LOCK = threading.Lock()
+_HAS_OPENAI: Optional[bool] = None
+_SYNC_CLIENTS: dict[tuple[Optional[str], Optional[str]], Any] = {}
+_ASYNC_CLIENTS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[tuple[Optional[str], Optional[str]], Any]]" = (
+    weakref.WeakKeyDictionary()
+)
+_SLOTS = threading.BoundedSemaphore(MAX_IN_FLIGHT)
+# Async callers wait for a slot here rather than in the loop's default executor,
+# which would starve the cache and capability file I/O also sent there.
+_SLOT_WAITERS = ThreadPoolExecutor(thread_name_prefix="llm_slot_wait")
+
+
+class ResponseCache:
+    # Content-addressed response store, one JSON file per (model, effort, prompts).
+    # Reads bump the file mtime; writes evict least recently used entries once the
+    # store grows past max_bytes.
+
+    def __init__(self, root: Path, max_bytes: int = DEFAULT_CACHE_MAX_BYTES) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None
+
+    @staticmethod
+    def key(model_name: str, effort: Optional[str], system_prompt: str, user_prompt: str) -> str:
+        payload = json.dumps([model_name, effort, system_prompt, user_prompt])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            text = json.loads(path.read_text(encoding="utf-8"))["text"]
+            os.utime(path)
+        except (OSError, ValueError, KeyError):
+            return None
+        return text
+
+    def put(self, key: str, model_name: str, effort: Optional[str], text: str) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = json.dumps({"model": model_name, "effort": effort, "text": text})
+        fd, tmp_name = tempfile.mkstemp(prefix=".tmp_", dir=path.parent)
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            fh.write(data)
+        previous = path.stat().st_size if path.exists() else 0
+        os.replace(tmp_name, path)
+        with self._lock:
+            if self._size is None:
+                self._size = sum(p.stat().st_size for p in self.root.glob("*/*.json"))
+            else:
+                self._size += len(data.encode("utf-8")) - previous
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        entries = []
+        for entry in self.root.glob("*/*.json"):
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime_ns, st.st_size, entry))
+        entries.sort()
+        size = sum(e[1] for e in entries)
+        target = self.max_bytes * 9 // 10
+        for _, entry_size, entry in entries:
+            if size <= target:
+                break
+            entry.unlink(missing_ok=True)
+            size -= entry_size
+        self._size = size
+
+
+_UNSET = object()
+
+
+class CapabilityCache:
+    # What each endpoint/model accepted last time: whether the model exists and
+    # which reasoning.effort values were accepted or rejected. Kept per process
+    # and, when a path is given, persisted as JSON; entries expire after ttl.
+    # Agent workers share the file: each write merges what is on disk (newest
+    # entry per key wins) under an flock on "<path>.lock".
+
+    def __init__(self, path: Optional[Path] = None, ttl_seconds: float = DEFAULT_CAPABILITIES_TTL_SECONDS) -> None:
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: dict[str, dict[str, Any]] = self._read() if path is not None else {}
+
+    def _read(self) -> dict[str, dict[str, Any]]:
+        assert self.path is not None
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def _fresh(self, key: str) -> Optional[dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None or time.time() - float(entry.get("checked_at", 0)) > self.ttl_seconds:
+            return None
+        return entry
+
+    def is_missing(self, key: str) -> bool:
+        with self._lock:
+            entry = self._fresh(key)
+            return entry is not None and not entry.get("available", True)
+
+    def efforts(self, key: str) -> list[Optional[str]]:
+        with self._lock:
+            entry = self._fresh(key) or {}
+            accepted = [e for e in entry.get("accepted", []) if e in REASONING_EFFORTS]
+            rejected = entry.get("rejected", [])
+        rest = [e for e in REASONING_EFFORTS if e not in accepted and e not in rejected]
+        return accepted + rest
+
+    def _update(self, key: str, **changes: Any) -> None:
+        with self._lock:
+            previous = self._fresh(key)
+            entry = dict(previous or {"available": True, "accepted": [], "rejected": []})
+            effort_accepted = changes.pop("accepted", _UNSET)
+            effort_rejected = changes.pop("rejected", _UNSET)
+            if effort_accepted is not _UNSET:
+                entry["accepted"] = [effort_accepted] + [e for e in entry["accepted"] if e != effort_accepted]
+                entry["rejected"] = [e for e in entry["rejected"] if e != effort_accepted]
+            if effort_rejected is not _UNSET and effort_rejected not in entry["rejected"]:
+                entry["rejected"] = entry["rejected"] + [effort_rejected]
+                entry["accepted"] = [e for e in entry["accepted"] if e != effort_rejected]
+            entry.update(changes)
+            now = time.time()
+            # Unchanged entries are only rewritten once half their TTL has passed.
+            if previous is not None and entry == previous:
+                if now - float(previous.get("checked_at", 0)) < self.ttl_seconds / 2:
+                    return
+            entry["checked_at"] = now
+            self._entries[key] = entry
+            self._persist()
+
+    def record_missing(self, key: str) -> None:
+        self._update(key, available=False)
+
+    def record_rejected(self, key: str, effort: Optional[str]) -> None:
+        self._update(key, rejected=effort)
+
+    def record_accepted(self, key: str, effort: Optional[str]) -> None:
+        self._update(key, available=True, accepted=effort)
+
+    def _persist(self) -> None:
+        # Caller holds self._lock.
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path.with_name(self.path.name + ".lock"), "a+b") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                merged = self._read()
+                for key, entry in self._entries.items():
+                    if float(entry.get("checked_at", 0)) >= float(merged.get(key, {}).get("checked_at", 0)):
+                        merged[key] = entry
+                fd, tmp_name = tempfile.mkstemp(prefix=".capabilities_", dir=self.path.parent)
+                with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                    json.dump(merged, fh, indent=2, sort_keys=True)
+                os.replace(tmp_name, self.path)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+        self._entries = merged
+
+
+_CACHE: Optional[ResponseCache] = None
+_CACHE_MODE = "off"
+_CAPABILITIES = CapabilityCache()
+
+
+def configure(
+    cache_dir: Optional[Path] = None,
+    mode: str = "off",
+    max_bytes: int = DEFAULT_CACHE_MAX_BYTES,
+    capabilities_path: Optional[Path] = None,
+    capabilities_ttl_seconds: float = DEFAULT_CAPABILITIES_TTL_SECONDS,
+) -> None:
+    global _CACHE, _CACHE_MODE, _CAPABILITIES
+    if mode not in CACHE_MODES:
+        raise ValueError(f"Unknown LLM cache mode: {mode}")
+    if mode != "off" and cache_dir is None:
+        raise ValueError("An LLM cache directory is required unless mode is 'off'")
+    _CACHE = ResponseCache(Path(cache_dir), max_bytes=max_bytes) if mode != "off" else None
+    _CACHE_MODE = mode
+    _CAPABILITIES = CapabilityCache(
+        Path(capabilities_path) if capabilities_path else None,
+        ttl_seconds=capabilities_ttl_seconds,
+    )
+
+
+def _openai_available() -> bool:
+    global _HAS_OPENAI
+    if _HAS_OPENAI is None:
+        _HAS_OPENAI = importlib.util.find_spec("openai") is not None
+    return _HAS_OPENAI
+
+
+def _shared_sync_client(api_key: Optional[str], base_url: Optional[str]) -> Any:
+    key = (api_key, base_url)
+    with _SHARED_LOCK:
+        client = _SYNC_CLIENTS.get(key)
+        if client is None:
+            openai_module = importlib.import_module("openai")
+            client = openai_module.OpenAI(api_key=api_key, base_url=base_url)
+            _SYNC_CLIENTS[key] = client
+        return client
+
+
+def _shared_async_client(api_key: Optional[str], base_url: Optional[str]) -> Any:
+    # httpx async connections belong to the loop that opened them, so the pool is per loop.
+    loop = asyncio.get_running_loop()
+    key = (api_key, base_url)
+    with _SHARED_LOCK:
+        clients = _ASYNC_CLIENTS.setdefault(loop, {})
+        client = clients.get(key)
+        if client is None:
+            openai_module = importlib.import_module("openai")
+            client = openai_module.AsyncOpenAI(api_key=api_key, base_url=base_url)
+            clients[key] = client
+        return client
+
+
+@contextlib.asynccontextmanager
+async def _async_slot() -> AsyncIterator[None]:
+    # One of the _SLOTS, taken without blocking the event loop.
+    if not _SLOTS.acquire(blocking=False):
+        acquiring = asyncio.get_running_loop().run_in_executor(_SLOT_WAITERS, _SLOTS.acquire)
+        try:
+            await asyncio.shield(acquiring)
+        except asyncio.CancelledError:
+            # The waiter thread still gets the slot; hand it straight back.
+            acquiring.add_done_callback(lambda _: _SLOTS.release())
+            raise
+    try:
+        yield
+    finally:
+        _SLOTS.release()
+
+
+def _request_kwargs(model_name: str, effort: Optional[str], system_prompt: str, user_prompt: str) -> dict[str, Any]:
+    kwargs: dict[str, Any] = {
+        "model": model_name,
+        "input": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ],
+    }
+    if effort is not None:
+        kwargs["reasoning"] = {"effort": effort}
+    return kwargs
+
+
+def _is_effort_rejected(exc: Exception) -> bool:
+    body = str(exc)
+    return "reasoning.effort" in body and "unsupported_value" in body
+
+
+def _is_model_missing(exc: Exception) -> bool:
+    body = str(exc)
+    return "model_not_found" in body or "does not exist" in body
+
+
+def _response_text(response: Any) -> Optional[str]:
+    text = getattr(response, "output_text", "")
+    return text.strip() if text else None
 
 
 class LLMClient:
-    def __init__(self, model: str = DEFAULT_MODEL) -> None:
+    def __init__(self, model: str = DEFAULT_MODEL, base_url: Optional[str] = None) -> None:
         api_key = os.environ.get("OPENAI_API_KEY")
-        has_openai = importlib.util.find_spec("openai") is not None
-        self._enabled = bool(api_key) and has_openai
+        self._online = bool(api_key) and _openai_available() and _CACHE_MODE != "replay"
+        self._cache = _CACHE
+        self._cache_mode = _CACHE_MODE
+        self._enabled = self._online or self._cache_mode == "replay"
+        self._capabilities = _CAPABILITIES
         self._api_key = api_key
-        self._client: Any = None
+        self._base_url = base_url
         self._model = model
 
     @property
@@ -29,57 +321,132 @@ class LLMClient:
         return self._enabled
 
     def _ensure_client(self) -> Any:
-        if self._client is not None:
-            return self._client
-        if not self._enabled:
+        if not self._online:
             return None
-        openai_module = importlib.import_module("openai")
-        self._client = openai_module.OpenAI(api_key=self._api_key)
-        return self._client
+        return _shared_sync_client(self._api_key, self._base_url)
+
+    def _cache_lookup(self, system_prompt: str, cache_prompt: str) -> Optional[str]:
+        if self._cache is None or self._cache_mode not in ("readwrite", "replay"):
+            return None
+        for model_name in self._candidate_models():
+            for effort in REASONING_EFFORTS:
+                text = self._cache.get(ResponseCache.key(model_name, effort, system_prompt, cache_prompt))
+                if text is not None:
+                    return text
+        return None
+
+    def _cache_store(
+        self, model_name: str, effort: Optional[str], system_prompt: str, cache_prompt: str, text: Optional[str]
+    ) -> None:
+        if self._cache is None or self._cache_mode not in ("readwrite", "record") or not text:
+            return
+        key = ResponseCache.key(model_name, effort, system_prompt, cache_prompt)
+        self._cache.put(key, model_name, effort, text)
 
     def _candidate_models(self) -> list[str]:
         models = [self._model]
         models.extend(m for m in MODEL_FALLBACKS if m not in models)
         return models
 
-    def _create_response(self, client: Any, model_name: str, system_prompt: str, user_prompt: str) -> Any:
-        for effort in REASONING_EFFORTS:
-            kwargs: dict[str, Any] = {
-                "model": model_name,
-                "input": [
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt},
-                ],
-            }
-            if effort is not None:
-                kwargs["reasoning"] = {"effort": effort}
+    def _capability_key(self, model_name: str) -> str:
+        return f"{self._base_url or 'default'}|{model_name}"
+
+    def _negotiable_models(self) -> list[str]:
+        # Models the endpoint recently reported missing are skipped outright.
+        return [m for m in self._candidate_models() if not self._capabilities.is_missing(self._capability_key(m))]
+
+    def _create_response(
+        self, client: Any, model_name: str, system_prompt: str, user_prompt: str
+    ) -> Optional[tuple[Optional[str], Any]]:
+        key = self._capability_key(model_name)
+        for effort in self._capabilities.efforts(key):
+            kwargs = _request_kwargs(model_name, effort, system_prompt, user_prompt)
             try:
-                return client.responses.create(**kwargs)
+                with _SLOTS:
+                    response = client.responses.create(**kwargs)
             except Exception as exc:
-                body = str(exc)
                 # Try next effort level if this model rejects current reasoning effort.
-                if "reasoning.effort" in body and "unsupported_value" in body:
+                if _is_effort_rejected(exc):
+                    self._capabilities.record_rejected(key, effort)
                     continue
                 raise
+            self._capabilities.record_accepted(key, effort)
+            return effort, response
         return None
 
-    def generate_patch(self, system_prompt: str, user_prompt: str) -> Optional[str]:
+    async def _acreate_response(
+        self, client: Any, model_name: str, system_prompt: str, user_prompt: str
+    ) -> Optional[tuple[Optional[str], Any]]:
+        # Capability updates may rewrite the capabilities file, so they run off the loop.
+        key = self._capability_key(model_name)
+        for effort in self._capabilities.efforts(key):
+            kwargs = _request_kwargs(model_name, effort, system_prompt, user_prompt)
+            try:
+                async with _async_slot():
+                    response = await client.responses.create(**kwargs)
+            except Exception as exc:
+                if _is_effort_rejected(exc):
+                    await asyncio.to_thread(self._capabilities.record_rejected, key, effort)
+                    continue
+                raise
+            await asyncio.to_thread(self._capabilities.record_accepted, key, effort)
+            return effort, response
+        return None
+
+    def generate_patch(
+        self, system_prompt: str, user_prompt: str, cache_prompt: Optional[str] = None
+    ) -> Optional[str]:
+        # cache_prompt stands in for user_prompt in the cache key, so callers can
+        # strip run-specific details (temp paths) and keep replays deterministic.
+        cache_prompt = user_prompt if cache_prompt is None else cache_prompt
+        cached = self._cache_lookup(system_prompt, cache_prompt)
+        if cached is not None:
+            return cached
         client = self._ensure_client()
         if client is None:
             return None
 
-        for model_name in self._candidate_models():
+        for model_name in self._negotiable_models():
             try:
-                response = self._create_response(client, model_name, system_prompt, user_prompt)
-                if response is None:
+                created = self._create_response(client, model_name, system_prompt, user_prompt)
+                if created is None:
                     continue
-                text = getattr(response, "output_text", "")
-                return text.strip() if text else None
+                effort, response = created
+                text = _response_text(response)
+                self._cache_store(model_name, effort, system_prompt, cache_prompt, text)
+                return text
             except Exception as exc:  # fallback on model-not-found only
-                body = str(exc)
-                if "model_not_found" in body or "does not exist" in body:
+                if _is_model_missing(exc):
+                    self._capabilities.record_missing(self._capability_key(model_name))
                     continue
                 raise
 
         # If all model names fail because unavailable, degrade gracefully.
         return None
+
+    async def agenerate_patch(
+        self, system_prompt: str, user_prompt: str, cache_prompt: Optional[str] = None
+    ) -> Optional[str]:
+        cache_prompt = user_prompt if cache_prompt is None else cache_prompt
+        cached = await asyncio.to_thread(self._cache_lookup, system_prompt, cache_prompt)
+        if cached is not None:
+            return cached
+        if not self._online:
+            return None
+        client = _shared_async_client(self._api_key, self._base_url)
+
+        for model_name in self._negotiable_models():
+            try:
+                created = await self._acreate_response(client, model_name, system_prompt, user_prompt)
+                if created is None:
+                    continue
+                effort, response = created
+                text = _response_text(response)
+                await asyncio.to_thread(self._cache_store, model_name, effort, system_prompt, cache_prompt, text)
+                return text
+            except Exception as exc:
+                if _is_model_missing(exc):
+                    await asyncio.to_thread(self._capabilities.record_missing, self._capability_key(model_name))
+                    continue
+                raise
+        return None
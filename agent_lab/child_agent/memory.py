@@ -1,23 +1,232 @@
 from __future__ import annotations
 
+import atexit
+import fcntl
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
 from dataclasses import dataclass, asdict
 from pathlib import Path
-import json
+from typing import Any, BinaryIO, Iterator, Optional
+
+FLUSH_RECORDS = 64
+FLUSH_INTERVAL_SECONDS = 5.0
+REFRESH_INTERVAL_SECONDS = 1.0
+COMPACT_BYTES = 8 * 1024 * 1024
+
+# Open logs, flushed by one exit hook rather than one hook per instance.
+_OPEN: "set[AgentMemory]" = set()
+_OPEN_LOCK = threading.Lock()
+
+
+def _flush_open() -> None:
+    with _OPEN_LOCK:
+        memories = list(_OPEN)
+    for memory in memories:
+        memory.flush()
+
+
+atexit.register(_flush_open)
 
 
 @dataclass
+class TaskHistory:
+    attempts: int = 0
+    passes: int = 0
+    pass_streak: int = 0
+    last_passed: Optional[bool] = None
+    last_elapsed_seconds: float = 0.0
+    total_elapsed_seconds: float = 0.0
+    last_patch_bytes: int = 0
+    last_passing_patch: Optional[str] = None
+    updated_at: float = 0.0
+
+    def add(self, record: dict[str, Any]) -> None:
+        passed = bool(record["passed"])
+        self.attempts += 1
+        self.passes += int(passed)
+        self.pass_streak = self.pass_streak + 1 if passed else 0
+        self.last_passed = passed
+        self.last_elapsed_seconds = float(record.get("elapsed_seconds", 0.0))
+        self.total_elapsed_seconds += self.last_elapsed_seconds
+        self.last_patch_bytes = int(record.get("patch_bytes", 0))
+        if passed and record.get("patch") is not None:
+            self.last_passing_patch = record["patch"]
+        self.updated_at = float(record.get("ts", 0.0))
+
+
 class AgentMemory:
-    total_tasks: int = 0
-    total_passed: int = 0
-    last_score: int = 0
+    # Append-only JSON-lines log of task outcomes, shared by every process that
+    # points at the same path (eval threads, agent workers, queue workers).
+    #   {"kind": "outcome", "task": id, "passed", "elapsed_seconds", "patch_bytes", "patch", "ts"}
+    #   {"kind": "history", "task": id, **TaskHistory}   (written by compaction)
+    # Appends are buffered per process and written under an flock on
+    # "<path>.lock"; an in-memory index folds the log into one TaskHistory per
+    # task and follows other processes' appends from its last read offset.
+    # Compaction rewrites the log as one history line per task, swaps it in with
+    # os.replace and bumps the generation stored in the lock file; readers that
+    # see a new generation re-read from the start. (Inode numbers are not used
+    # for this: the filesystem may hand the old one to the next compaction.)
+
+    def __init__(self, path: Path, compact_bytes: int = COMPACT_BYTES) -> None:
+        self.path = path
+        self.compact_bytes = compact_bytes
+        self._lock = threading.Lock()
+        self._index: dict[str, TaskHistory] = {}
+        self._buffer: list[dict[str, Any]] = []
+        self._last_flush = time.monotonic()
+        self._last_refresh = 0.0
+        self._generation: Optional[str] = None
+        self._offset = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.refresh()
+        with _OPEN_LOCK:
+            _OPEN.add(self)
 
     @classmethod
     def load(cls, path: Path) -> "AgentMemory":
-        if not path.exists():
-            return cls()
-        data = json.loads(path.read_text(encoding="utf-8"))
-        return cls(**data)
-
-    def save(self, path: Path) -> None:
-        path.parent.mkdir(parents=True, exist_ok=True)
-        path.write_text(json.dumps(asdict(self), indent=2), encoding="utf-8")
+        return cls(path)
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool) -> Iterator[BinaryIO]:
+        # Yields the lock file, which holds the compaction generation.
+        with open(self.path.with_name(self.path.name + ".lock"), "a+b") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield lock_file
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _apply(self, record: dict[str, Any]) -> None:
+        task_id = str(record["task"])
+        if record.get("kind") == "history":
+            fields = {k: v for k, v in record.items() if k not in ("kind", "task")}
+            self._index[task_id] = TaskHistory(**fields)
+        else:
+            self._index.setdefault(task_id, TaskHistory()).add(record)
+
+    def refresh(self) -> None:
+        # Folds in whatever other processes appended since the last read.
+        with self._lock, self._file_lock(exclusive=False) as lock_file:
+            self._read_new(lock_file)
+            self._last_refresh = time.monotonic()
+
+    def _read_new(self, lock_file: BinaryIO) -> None:
+        # Caller holds self._lock and the file lock.
+        lock_file.seek(0)
+        generation = lock_file.read().decode("ascii")
+        try:
+            size = self.path.stat().st_size
+        except FileNotFoundError:
+            size = 0
+        rebuilt = generation != self._generation or size < self._offset
+        if rebuilt:
+            # Compacted since the last read: rebuild from scratch.
+            self._index = {}
+            self._offset = 0
+            self._generation = generation
+        if size > self._offset:
+            with self.path.open("rb") as fh:
+                fh.seek(self._offset)
+                data = fh.read()
+            # A torn final line (writer died mid-append) is left for the next read.
+            end = data.rfind(b"\n") + 1
+            for line in data[:end].splitlines():
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # The remains of a torn line that a later append terminated.
+                    continue
+                self._apply(record)
+            self._offset += end
+        if rebuilt:
+            # Our own records that are not on disk yet.
+            for record in self._buffer:
+                self._apply(record)
+
+    def record(self, task_id: str, passed: bool, elapsed_seconds: float, patch: Optional[str]) -> None:
+        entry = {
+            "kind": "outcome",
+            "task": task_id,
+            "passed": passed,
+            "elapsed_seconds": elapsed_seconds,
+            "patch_bytes": len(patch.encode("utf-8")) if patch else 0,
+            # Only passing patches are worth keeping for reuse.
+            "patch": patch if passed else None,
+            "ts": time.time(),
+        }
+        with self._lock:
+            self._buffer.append(entry)
+            self._apply(entry)
+            due = len(self._buffer) >= FLUSH_RECORDS or time.monotonic() - self._last_flush >= FLUSH_INTERVAL_SECONDS
+        if due:
+            self.flush()
+
+    def history(self, task_id: str) -> Optional[TaskHistory]:
+        if time.monotonic() - self._last_refresh >= REFRESH_INTERVAL_SECONDS:
+            self.refresh()
+        with self._lock:
+            return self._index.get(task_id)
+
+    @property
+    def total_tasks(self) -> int:
+        with self._lock:
+            return sum(h.attempts for h in self._index.values())
+
+    @property
+    def total_passed(self) -> int:
+        with self._lock:
+            return sum(h.passes for h in self._index.values())
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._buffer:
+                return
+            payload = "".join(json.dumps(record) + "\n" for record in self._buffer).encode("utf-8")
+            with self._file_lock(exclusive=True) as lock_file:
+                # Catch up first so the offset stays in step with the file; the
+                # buffered records are already in the index.
+                self._read_new(lock_file)
+                self._buffer = []
+                with self.path.open("ab") as fh:
+                    if fh.tell() > self._offset:
+                        # Never glue our records onto a torn line.
+                        fh.write(b"\n")
+                    fh.write(payload)
+                    fh.flush()
+                    os.fsync(fh.fileno())
+                    self._offset = fh.tell()
+                if self._offset >= self.compact_bytes:
+                    self._compact(lock_file)
+            self._last_flush = time.monotonic()
+
+    def _compact(self, lock_file: BinaryIO) -> None:
+        # Caller holds self._lock and the exclusive file lock; the index is
+        # current, so it is written out as one history line per task.
+        fd, tmp_name = tempfile.mkstemp(prefix=f".{self.path.name}.", dir=self.path.parent)
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            for task_id, history in self._index.items():
+                fh.write(json.dumps({"kind": "history", "task": task_id, **asdict(history)}) + "\n")
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp_name, self.path)
+        self._generation = str(int(self._generation or 0) + 1)
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(self._generation.encode("ascii"))
+        lock_file.flush()
+        self._offset = self.path.stat().st_size
+
+    def compact(self) -> None:
+        self.flush()
+        with self._lock, self._file_lock(exclusive=True) as lock_file:
+            self._read_new(lock_file)
+            self._compact(lock_file)
+
+    def close(self) -> None:
+        self.flush()
+        with _OPEN_LOCK:
+            _OPEN.discard(self)
@@ -0,0 +1,366 @@
+from __future__ import annotations
+
+# The agent's own copy of agent_lab/evals/patching.py, so the agent tree imports
+# nothing from the harness. Candidates may change it; the harness keeps its copy.
+
+import os
+import re
+import stat
+import tempfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+DEFAULT_FUZZ = 200
+
+_HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+_DEV_NULL = "/dev/null"
+# Mode of files a patch creates.
+NEW_FILE_MODE = 0o644
+
+
+class PatchError(ValueError):
+    pass
+
+
+@dataclass
+class Hunk:
+    old_start: int
+    new_start: int
+    old_lines: list[str] = field(default_factory=list)
+    new_lines: list[str] = field(default_factory=list)
+    # "\ No newline at end of file" after the last old / new line.
+    old_no_eol: bool = False
+    new_no_eol: bool = False
+
+
+@dataclass
+class FilePatch:
+    old_path: Optional[str]
+    new_path: Optional[str]
+    hunks: list[Hunk] = field(default_factory=list)
+
+    @property
+    def path(self) -> str:
+        path = self.new_path if self.new_path is not None else self.old_path
+        assert path is not None
+        return path
+
+
+def _clean_path(raw: str) -> Optional[str]:
+    # Drop "\t<timestamp>" suffixes and the a/ b/ prefixes git adds.
+    path = raw.split("\t", 1)[0].strip()
+    if path == _DEV_NULL:
+        return None
+    if path.startswith(("a/", "b/")):
+        path = path[2:]
+    return path
+
+
+class _Lines:
+    # Minimal peekable line iterator so the parser can stream its input.
+
+    def __init__(self, lines: Iterable[str]) -> None:
+        self._it = iter(lines)
+        self._buffer: list[str] = []
+
+    def peek(self, offset: int = 0) -> Optional[str]:
+        while len(self._buffer) <= offset:
+            line = next(self._it, None)
+            if line is None:
+                return None
+            self._buffer.append(line.rstrip("\r\n"))
+        return self._buffer[offset]
+
+    def pop(self) -> str:
+        line = self.peek()
+        assert line is not None
+        self._buffer.pop(0)
+        return line
+
+
+def _starts_file_header(lines: _Lines) -> bool:
+    line = lines.peek()
+    if line is None:
+        return False
+    if line.startswith("diff --git "):
+        return True
+    nxt = lines.peek(1)
+    return line.startswith("--- ") and nxt is not None and nxt.startswith("+++ ")
+
+
+def _parse_hunk(lines: _Lines) -> Hunk:
+    header = lines.pop()
+    match = _HUNK_HEADER.match(header)
+    if not match:
+        raise PatchError(f"Malformed hunk header: {header}")
+    old_left = int(match.group(2)) if match.group(2) is not None else 1
+    new_left = int(match.group(4)) if match.group(4) is not None else 1
+    hunk = Hunk(old_start=int(match.group(1)), new_start=int(match.group(3)))
+
+    # Generated diffs often get the header counts wrong, so the body runs until
+    # the next hunk or file header instead. Counts only decide whether a bare
+    # empty line (a context line whose leading space was stripped) still belongs
+    # to the hunk once they are used up.
+    last = ""
+    while True:
+        line = lines.peek()
+        if line is None or line.startswith("@@") or _starts_file_header(lines):
+            break
+        if line.startswith("\\"):
+            # Marks the line before it, on the side(s) that line belongs to.
+            hunk.old_no_eol = hunk.old_no_eol or last in (" ", "-")
+            hunk.new_no_eol = hunk.new_no_eol or last in (" ", "+")
+            lines.pop()
+            continue
+        if line == "" and old_left <= 0 and not _more_body_follows(lines):
+            break
+        if line == "" or line.startswith(" "):
+            text = line[1:]
+            hunk.old_lines.append(text)
+            hunk.new_lines.append(text)
+            old_left -= 1
+            new_left -= 1
+        elif line.startswith("-"):
+            hunk.old_lines.append(line[1:])
+            old_left -= 1
+        elif line.startswith("+"):
+            hunk.new_lines.append(line[1:])
+            new_left -= 1
+        else:
+            break
+        last = line[:1] or " "
+        lines.pop()
+    return hunk
+
+
+def _more_body_follows(lines: _Lines) -> bool:
+    offset = 0
+    while lines.peek(offset) == "":
+        offset += 1
+    line = lines.peek(offset)
+    return line is not None and line.startswith((" ", "+", "-")) and not line.startswith(("--- ", "+++ "))
+
+
+def iter_file_patches(lines: Iterable[str]) -> Iterator[FilePatch]:
+    source = _Lines(lines)
+    rename_from: Optional[str] = None
+    rename_to: Optional[str] = None
+    current: Optional[FilePatch] = None
+
+    while True:
+        line = source.peek()
+        if line is None:
+            break
+        if line.startswith("diff --git "):
+            if current is not None:
+                yield current
+                current = None
+            elif rename_from is not None and rename_to is not None:
+                yield FilePatch(old_path=rename_from, new_path=rename_to)
+            rename_from = rename_to = None
+            source.pop()
+        elif line.startswith("rename from "):
+            rename_from = line.removeprefix("rename from ").strip()
+            source.pop()
+        elif line.startswith("rename to "):
+            rename_to = line.removeprefix("rename to ").strip()
+            source.pop()
+        elif _starts_file_header(source):
+            if current is not None:
+                yield current
+            old_path = _clean_path(source.pop().removeprefix("--- "))
+            new_path = _clean_path(source.pop().removeprefix("+++ "))
+            if old_path is None and new_path is None:
+                raise PatchError("Diff header has /dev/null on both sides")
+            current = FilePatch(old_path=rename_from or old_path, new_path=rename_to or new_path)
+            rename_from = rename_to = None
+        elif line.startswith("@@"):
+            if current is None:
+                raise PatchError("Hunk without a file header")
+            current.hunks.append(_parse_hunk(source))
+        else:
+            source.pop()
+
+    if current is not None:
+        yield current
+    elif rename_from is not None and rename_to is not None:
+        yield FilePatch(old_path=rename_from, new_path=rename_to)
+
+
+def parse_patch(diff_text: str) -> list[FilePatch]:
+    return list(iter_file_patches(diff_text.splitlines()))
+
+
+def _matches(original: list[str], at: int, expected: list[str], loose: bool) -> bool:
+    if at < 0 or at + len(expected) > len(original):
+        return False
+    if loose:
+        return all(original[at + k].rstrip() == line.rstrip() for k, line in enumerate(expected))
+    return original[at : at + len(expected)] == expected
+
+
+def _locate(original: list[str], expected: list[str], guess: int, floor: int, fuzz: int) -> Optional[int]:
+    # Exact text first, then ignoring trailing whitespace; each pass searches
+    # outwards from the header position, at most `fuzz` lines either way.
+    for loose in (False, True):
+        for delta in range(fuzz + 1):
+            for at in (guess - delta, guess + delta) if delta else (guess,):
+                if at >= floor and _matches(original, at, expected, loose):
+                    return at
+    return None
+
+
+def apply_hunks(original: list[str], hunks: list[Hunk], path: str = "", fuzz: int = DEFAULT_FUZZ) -> list[str]:
+    output: list[str] = []
+    pos = 0
+    offset = 0
+    for number, hunk in enumerate(hunks, start=1):
+        if hunk.old_lines:
+            guess = max(hunk.old_start - 1, 0) + offset
+            at = _locate(original, hunk.old_lines, guess, pos, fuzz)
+            if at is None:
+                raise PatchError(
+                    f"Hunk #{number} for {path or 'file'} does not match near line {hunk.old_start}"
+                )
+            offset = at - max(hunk.old_start - 1, 0)
+        else:
+            # Pure insertion: old_start is the line the new text follows.
+            at = min(max(hunk.old_start + offset, pos), len(original))
+        output.extend(original[pos:at])
+        output.extend(hunk.new_lines)
+        pos = at + len(hunk.old_lines)
+    output.extend(original[pos:])
+    return output
+
+
+def _resolve_inside(root: Path, rel: str) -> Path:
+    target = (root / rel).resolve()
+    if root not in target.parents:
+        raise PatchError(f"Patch writes outside workspace: {rel}")
+    return target
+
+
+@dataclass
+class _Text:
+    # A file's lines plus what is needed to write it back the way it was:
+    # line ending, whether the last line ends with one, and permission bits.
+    lines: list[str]
+    eol: str = "\n"
+    final_eol: bool = True
+    mode: int = NEW_FILE_MODE
+
+
+def _read_text(path: Path) -> _Text:
+    text = path.read_bytes().decode("utf-8")
+    first = text.find("\n")
+    eol = "\r\n" if first > 0 and text[first - 1] == "\r" else "\n"
+    lines = text.split(eol)
+    final_eol = lines[-1] == ""
+    if final_eol:
+        lines.pop()
+    return _Text(lines, eol, final_eol, stat.S_IMODE(path.stat().st_mode))
+
+
+def _final_eol(original: Optional[_Text], hunks: list[Hunk]) -> bool:
+    # Kept as it was unless a hunk marks the old or new end of the file.
+    final_eol = original.final_eol if original is not None else True
+    for hunk in hunks:
+        if hunk.new_no_eol:
+            final_eol = False
+        elif hunk.old_no_eol:
+            final_eol = True
+    return final_eol
+
+
+def _write_temp(target: Path, text: _Text) -> Path:
+    target.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{target.name}.", suffix=".new", dir=target.parent)
+    with os.fdopen(fd, "wb") as fh:
+        if text.lines:
+            fh.write((text.eol.join(text.lines) + (text.eol if text.final_eol else "")).encode("utf-8"))
+    # mkstemp creates 0600; the replaced file keeps its own mode.
+    os.chmod(tmp_name, text.mode)
+    return Path(tmp_name)
+
+
+def apply_patch(diff_text: str, root: Path, fuzz: int = DEFAULT_FUZZ) -> list[str]:
+    # Applies every file in the diff or none of them. New contents are computed
+    # in memory, staged as temp files next to their targets, then swapped in with
+    # os.replace; any failure restores the originals. Files keep their mode,
+    # line endings and (unless the diff says otherwise) final newline; created
+    # files get NEW_FILE_MODE. Returns the touched paths.
+    root = root.resolve()
+    state: dict[Path, Optional[_Text]] = {}
+    touched: list[str] = []
+
+    def current(path: Path) -> Optional[_Text]:
+        if path not in state:
+            try:
+                state[path] = _read_text(path) if path.is_file() else None
+            except (OSError, UnicodeDecodeError) as exc:
+                raise PatchError(f"Cannot read {path.relative_to(root)}: {exc}") from exc
+        return state[path]
+
+    for file_patch in iter_file_patches(diff_text.splitlines()):
+        source_rel = file_patch.old_path if file_patch.old_path is not None else file_patch.new_path
+        assert source_rel is not None
+        source = _resolve_inside(root, source_rel)
+        original = current(source)
+        if file_patch.old_path is None and original is not None and file_patch.hunks:
+            raise PatchError(f"Patch creates {file_patch.path}, which already exists")
+        if file_patch.old_path is not None and original is None and any(h.old_lines for h in file_patch.hunks):
+            raise PatchError(f"Patch modifies missing file {file_patch.old_path}")
+        lines = apply_hunks(original.lines if original else [], file_patch.hunks, path=file_patch.path, fuzz=fuzz)
+
+        if file_patch.new_path is None:
+            if lines:
+                raise PatchError(f"Deletion of {file_patch.old_path} leaves content behind")
+            state[source] = None
+        else:
+            target = _resolve_inside(root, file_patch.new_path)
+            if target != source:
+                if current(target) is not None:
+                    raise PatchError(f"Rename target {file_patch.new_path} already exists")
+                state[source] = None
+            updated = _Text(lines, final_eol=_final_eol(original, file_patch.hunks))
+            if original is not None:
+                updated.eol, updated.mode = original.eol, original.mode
+            state[target] = updated
+        touched.append(file_patch.path)
+
+    try:
+        _commit(state)
+    except OSError as exc:
+        raise PatchError(f"Cannot write patched files: {exc}") from exc
+    return touched
+
+
+def _commit(state: dict[Path, Optional[_Text]]) -> None:
+    staged: dict[Path, Path] = {}
+    backups: list[tuple[Path, Optional[Path]]] = []
+    try:
+        for path, text in state.items():
+            if text is not None:
+                staged[path] = _write_temp(path, text)
+        for path, text in state.items():
+            backup: Optional[Path] = None
+            if path.exists():
+                backup = path.with_name(f".{path.name}.{os.getpid()}.orig")
+                os.replace(path, backup)
+            backups.append((path, backup))
+            if text is not None:
+                os.replace(staged.pop(path), path)
+    except BaseException:
+        for path, backup in reversed(backups):
+            if backup is not None:
+                os.replace(backup, path)
+            else:
+                path.unlink(missing_ok=True)
+        raise
+    finally:
+        for tmp in staged.values():
+            tmp.unlink(missing_ok=True)
+    for _, backup in backups:
+        if backup is not None:
+            backup.unlink(missing_ok=True)
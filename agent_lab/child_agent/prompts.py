@@ -9,6 +9,10 @@ SELF_IMPROVE_PROMPT_TEMPLATE = """You are improving your own child-agent impleme
 Objective: {objective}
 Constraints:
 - Edit only files under: {candidate_workspace}
+- You may change any of: {files}. Put every file you change in the same diff.
+- Use paths relative to that directory (--- a/agent.py, +++ b/agent.py) with exact context lines.
 - Prefer small safe improvements.
+Current sources:
+{sources}
 Return a unified diff patch.
 """
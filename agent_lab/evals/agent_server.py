@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+# Long-lived agent worker. Started by agent_worker.AgentWorker as a plain script
+# with the agent directory as its only argument; the agent is imported once and
+# then serves requests until stdin closes. Protocol: one JSON request per line
+# on stdin ({"id", "op", ...}), one JSON response per line on stdout
+# ({"id", "ok", "result"} or {"id", "ok": false, "error"}). Requests are served
+# concurrently, so responses may arrive out of order.
+
+import asyncio
+import importlib.util
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable
+
+
+def _load_agent(agent_dir: Path) -> Any:
+    agent_file = agent_dir / "agent.py"
+    spec = importlib.util.spec_from_file_location("candidate_agent", agent_file)
+    if spec is None or spec.loader is None:
+        raise RuntimeError(f"Unable to load agent module from {agent_file}")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _describe(exc: BaseException) -> str:
+    return f"{type(exc).__name__}: {exc}"
+
+
+class _Agent:
+    # Agents exposing `agenerate_task_patch` get all their generation coroutines
+    # scheduled on one background event loop, so LLM requests from concurrent
+    # tasks overlap on the agent's shared connection pool.
+
+    def __init__(self, module: Any) -> None:
+        self._module = module
+        self._loop: asyncio.AbstractEventLoop | None = None
+        if hasattr(module, "agenerate_task_patch"):
+            self._loop = asyncio.new_event_loop()
+            threading.Thread(target=self._loop.run_forever, name="agent_lab_llm", daemon=True).start()
+
+    def configure(self, options: dict[str, Any]) -> None:
+        configure = getattr(self._module, "configure", None)
+        if options and callable(configure):
+            configure(options)
+
+    def generate_task_patch(self, task: dict[str, Any], workspace: str) -> str:
+        if self._loop is None:
+            return self._module.generate_task_patch(task, Path(workspace))
+        coro = self._module.agenerate_task_patch(task, Path(workspace))
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def self_improve(self, candidate_workspace: str, objective: str) -> bool:
+        return bool(self._module.self_improve(candidate_workspace=Path(candidate_workspace), objective=objective))
+
+    def record_task_result(self, task: dict[str, Any], passed: bool, elapsed_seconds: float, patch: str) -> None:
+        # Optional: agents without a memory ignore outcomes.
+        record = getattr(self._module, "record_task_result", None)
+        if callable(record):
+            record(task, passed, elapsed_seconds, patch)
+
+
+def main() -> None:
+    agent_dir = Path(sys.argv[1]).resolve()
+    # The agent imports its siblings (llm_client, patching, prompts) by bare
+    # name; neither this directory nor agent_lab is visible.
+    sys.path[0] = str(agent_dir)
+
+    protocol_out = os.fdopen(os.dup(1), "w", encoding="utf-8")
+    # Nothing but protocol messages may reach the parent on the original stdout;
+    # agent prints go to stderr.
+    os.dup2(2, 1)
+    write_lock = threading.Lock()
+
+    def send(message: dict[str, Any]) -> None:
+        line = json.dumps(message) + "\n"
+        with write_lock:
+            protocol_out.write(line)
+            protocol_out.flush()
+
+    try:
+        agent = _Agent(_load_agent(agent_dir))
+    except BaseException as exc:
+        send({"ready": False, "error": _describe(exc)})
+        return
+    send({"ready": True})
+
+    ops: dict[str, Callable[..., Any]] = {
+        "configure": agent.configure,
+        "generate_task_patch": agent.generate_task_patch,
+        "self_improve": agent.self_improve,
+        "record_task_result": agent.record_task_result,
+    }
+
+    def handle(request: dict[str, Any]) -> None:
+        request_id = request.get("id")
+        try:
+            op = ops.get(request.get("op", ""))
+            if op is None:
+                raise ValueError(f"Unknown op: {request.get('op')}")
+            result = op(**request.get("params", {}))
+            send({"id": request_id, "ok": True, "result": result})
+        except Exception as exc:
+            send({"id": request_id, "ok": False, "error": _describe(exc)})
+
+    with ThreadPoolExecutor(thread_name_prefix="agent_lab_agent") as pool:
+        for line in sys.stdin:
+            if line.strip():
+                pool.submit(handle, json.loads(line))
+
+
+if __name__ == "__main__":
+    main()
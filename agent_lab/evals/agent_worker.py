@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from pathlib import Path
+from typing import Any
+
+from agent_lab.evals.hashing import hash_tree
+
+DEFAULT_AGENT_TIMEOUT = 900.0
+STARTUP_TIMEOUT = 120.0
+
+_SERVER_SCRIPT = Path(__file__).resolve().parent / "agent_server.py"
+
+
+class AgentWorkerError(RuntimeError):
+    pass
+
+
+class _Connection:
+    # One agent_server process plus the requests in flight on it. A reader
+    # thread resolves responses by id; if the process dies, everything still
+    # pending fails with AgentWorkerError. The process leads its own process
+    # group, so kill() also stops anything the agent started.
+
+    def __init__(self, agent_dir: Path) -> None:
+        self.agent_dir = agent_dir
+        self._lock = threading.Lock()
+        self._pending: dict[int, Future[dict[str, Any]]] = {}
+        self._next_id = 0
+        self._ready: Future[dict[str, Any]] = Future()
+        self._proc = subprocess.Popen(
+            [sys.executable, str(_SERVER_SCRIPT), str(agent_dir)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            bufsize=1,
+            start_new_session=True,
+        )
+        threading.Thread(target=self._read_loop, name="agent_lab_agent_reader", daemon=True).start()
+        try:
+            ready = self._ready.result(timeout=STARTUP_TIMEOUT)
+        except FutureTimeout:
+            self.close()
+            raise AgentWorkerError(f"Agent worker for {agent_dir} did not start within {STARTUP_TIMEOUT:g}s")
+        except AgentWorkerError:
+            self.close()
+            raise
+        if not ready.get("ready"):
+            self.close()
+            raise AgentWorkerError(f"Agent in {agent_dir} failed to load: {ready.get('error')}")
+
+    @property
+    def alive(self) -> bool:
+        return self._proc.poll() is None
+
+    def _read_loop(self) -> None:
+        assert self._proc.stdout is not None
+        for line in self._proc.stdout:
+            message = json.loads(line)
+            if "ready" in message:
+                self._ready.set_result(message)
+                continue
+            with self._lock:
+                future = self._pending.pop(message.get("id"), None)
+            if future is not None:
+                future.set_result(message)
+        error = AgentWorkerError(f"Agent worker for {self.agent_dir} exited with code {self._proc.wait()}")
+        if not self._ready.done():
+            self._ready.set_exception(error)
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            future.set_exception(error)
+
+    def submit(self, op: str, params: dict[str, Any]) -> tuple[int, Future[dict[str, Any]]]:
+        assert self._proc.stdin is not None
+        future: Future[dict[str, Any]] = Future()
+        with self._lock:
+            request_id = self._next_id
+            self._next_id += 1
+            self._pending[request_id] = future
+            try:
+                self._proc.stdin.write(json.dumps({"id": request_id, "op": op, "params": params}) + "\n")
+                self._proc.stdin.flush()
+            except OSError as exc:
+                self._pending.pop(request_id, None)
+                raise AgentWorkerError(f"Agent worker for {self.agent_dir} is gone: {exc}") from exc
+        return request_id, future
+
+    def forget(self, request_id: int) -> None:
+        with self._lock:
+            self._pending.pop(request_id, None)
+
+    def kill(self) -> None:
+        try:
+            os.killpg(self._proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        self._proc.wait()
+
+    def close(self) -> None:
+        if self._proc.stdin is not None:
+            try:
+                self._proc.stdin.close()
+            except OSError:
+                pass
+        try:
+            self._proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.kill()
+
+
+class AgentWorker:
+    # An agent tree imported once into a subprocess. Calls are thread-safe and
+    # may overlap; a worker that crashed or was killed after a timeout is
+    # restarted on the next call.
+
+    def __init__(self, agent_dir: Path, options: dict[str, Any] | None = None) -> None:
+        self.agent_dir = agent_dir.resolve()
+        self._options = options or {}
+        self._lock = threading.Lock()
+        self._conn: _Connection | None = None
+
+    def _connection(self) -> _Connection:
+        with self._lock:
+            if self._conn is None or not self._conn.alive:
+                conn = _Connection(self.agent_dir)
+                if self._options:
+                    request_id, future = conn.submit("configure", {"options": self._options})
+                    _unwrap(conn, request_id, future, STARTUP_TIMEOUT, "configure")
+                self._conn = conn
+            return self._conn
+
+    def call(self, op: str, timeout: float = DEFAULT_AGENT_TIMEOUT, **params: Any) -> Any:
+        conn = self._connection()
+        request_id, future = conn.submit(op, params)
+        return _unwrap(conn, request_id, future, timeout, op)
+
+    def generate_task_patch(self, task: dict[str, Any], workspace: Path, timeout: float = DEFAULT_AGENT_TIMEOUT) -> str:
+        return str(self.call("generate_task_patch", timeout=timeout, task=task, workspace=str(workspace)))
+
+    def self_improve(self, candidate_workspace: Path, objective: str, timeout: float = DEFAULT_AGENT_TIMEOUT) -> bool:
+        return bool(
+            self.call(
+                "self_improve",
+                timeout=timeout,
+                candidate_workspace=str(candidate_workspace),
+                objective=objective,
+            )
+        )
+
+    def record_task_result(
+        self,
+        task: dict[str, Any],
+        passed: bool,
+        elapsed_seconds: float,
+        patch: str,
+        timeout: float = DEFAULT_AGENT_TIMEOUT,
+    ) -> None:
+        self.call(
+            "record_task_result",
+            timeout=timeout,
+            task=task,
+            passed=passed,
+            elapsed_seconds=elapsed_seconds,
+            patch=patch,
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            conn, self._conn = self._conn, None
+        if conn is not None:
+            conn.close()
+
+    def __enter__(self) -> "AgentWorker":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+def _unwrap(conn: _Connection, request_id: int, future: Future[dict[str, Any]], timeout: float, op: str) -> Any:
+    try:
+        response = future.result(timeout=timeout)
+    except FutureTimeout:
+        # A hung call would hold one of the worker's threads for good, and a
+        # late self_improve could still be editing a tree the parent has moved
+        # on from. Kill the worker; other calls in flight on it fail too.
+        conn.forget(request_id)
+        conn.kill()
+        raise AgentWorkerError(f"{op} timed out after {timeout:g}s in {conn.agent_dir}; the worker was killed")
+    if not response.get("ok"):
+        raise AgentWorkerError(f"{op} failed in {conn.agent_dir}: {response.get('error')}")
+    return response.get("result")
+
+
+class AgentWorkerPool:
+    # Workers keyed by the hash of the agent tree, so identical trees (a
+    # promoted candidate and the next baseline, no-op population members)
+    # share one process and pay their imports once.
+
+    def __init__(self, options: dict[str, Any] | None = None) -> None:
+        self._options = options or {}
+        self._lock = threading.Lock()
+        self._workers: dict[str, AgentWorker] = {}
+
+    def get(self, agent_dir: Path) -> AgentWorker:
+        tree = hash_tree(agent_dir)
+        with self._lock:
+            worker = self._workers.get(tree)
+            if worker is None:
+                worker = AgentWorker(agent_dir, options=self._options)
+                self._workers[tree] = worker
+            return worker
+
+    def retain(self, agent_dirs: list[Path]) -> None:
+        # Stops every worker except those serving the given trees.
+        keep = {hash_tree(agent_dir) for agent_dir in agent_dirs}
+        with self._lock:
+            dropped = [w for tree, w in self._workers.items() if tree not in keep]
+            self._workers = {tree: w for tree, w in self._workers.items() if tree in keep}
+        for worker in dropped:
+            worker.close()
+
+    def close(self) -> None:
+        with self._lock:
+            workers, self._workers = list(self._workers.values()), {}
+        for worker in workers:
+            worker.close()
+
+    def __enter__(self) -> "AgentWorkerPool":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import argparse
+import json
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+from agent_lab.evals.check_runner import CHECK_RUNNERS
+from agent_lab.evals.run_evals import run_evals
+from agent_lab.evals.synthetic import SuiteSpec, add_spec_arguments, generate_suite, spec_from_args
+from agent_lab.evals.workspace import WORKSPACE_MODES
+from agent_lab.parent_runner.scoring import summarize_results
+
+
+def _peak_rss_mb(who: int) -> float:
+    # ru_maxrss is in KiB on Linux and in bytes on macOS.
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_benchmark(
+    spec: SuiteSpec,
+    workers: int = 1,
+    check_runner: str = "subprocess",
+    workspace_mode: str = "auto",
+    dedupe_checks: bool = True,
+    suite_dir: Path | None = None,
+) -> dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix="agent_lab_bench_harness_") as tmp:
+        root = suite_dir or Path(tmp)
+        start = time.perf_counter()
+        paths = generate_suite(root / "suite", spec)
+        build_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = run_evals(
+            tasks_path=paths["tasks_path"],
+            agent_dir=paths["agent_dir"],
+            output_dir=root / "output",
+            workers=workers,
+            workspace_mode=workspace_mode,
+            check_runner=check_runner,
+            dedupe_checks=dedupe_checks,
+            fixtures_root=paths["fixtures_root"],
+        )
+        run_seconds = time.perf_counter() - start
+
+    summary = summarize_results(results)
+    stats: dict[str, Any] = {
+        "tasks": results["total"],
+        "passed": results["score"],
+        "tests_in_fixture": spec.num_tests,
+        "suite_build_seconds": build_seconds,
+        "run_seconds": run_seconds,
+        "tasks_per_second": results["total"] / run_seconds if run_seconds else 0.0,
+        "peak_rss_mb": _peak_rss_mb(resource.RUSAGE_SELF),
+        "peak_rss_children_mb": _peak_rss_mb(resource.RUSAGE_CHILDREN),
+    }
+    # Per-task and per-phase latency percentiles.
+    stats.update((name, value) for name, value in summary.metrics.items() if "_seconds_p" in name)
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark run_evals on a generated synthetic suite with a deterministic agent (no network)"
+    )
+    add_spec_arguments(parser)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--check-runner", choices=CHECK_RUNNERS, default="subprocess")
+    parser.add_argument("--workspace-mode", choices=WORKSPACE_MODES, default="auto")
+    parser.add_argument("--no-dedupe-checks", action="store_true")
+    parser.add_argument(
+        "--suite-dir",
+        default=None,
+        help="Keep the generated suite and eval output here instead of a temporary directory.",
+    )
+    args = parser.parse_args()
+
+    stats = run_benchmark(
+        spec_from_args(args),
+        workers=args.workers,
+        check_runner=args.check_runner,
+        workspace_mode=args.workspace_mode,
+        dedupe_checks=not args.no_dedupe_checks,
+        suite_dir=Path(args.suite_dir) if args.suite_dir else None,
+    )
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from agent_lab.evals.patching import apply_patch, parse_patch
+
+
+def _make_tree(root: Path, num_files: int, lines_per_file: int) -> dict[str, list[str]]:
+    files: dict[str, list[str]] = {}
+    for f in range(num_files):
+        rel = f"pkg/mod_{f // 100:03d}/file_{f:05d}.py"
+        lines = [f"value_{f}_{n} = {n}  # line {n}" for n in range(lines_per_file)]
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        files[rel] = lines
+    return files
+
+
+def _make_diff(files: dict[str, list[str]], hunks_per_file: int, changed_per_hunk: int, rng: random.Random) -> str:
+    out: list[str] = []
+    for rel, lines in files.items():
+        out.append(f"--- a/{rel}")
+        out.append(f"+++ b/{rel}")
+        span = len(lines) // hunks_per_file
+        delta = 0
+        for h in range(hunks_per_file):
+            lo = h * span + 3
+            start = lo + rng.randrange(max(span - changed_per_hunk - 6, 1))
+            ctx_before = lines[start - 3 : start]
+            changed = lines[start : start + changed_per_hunk]
+            ctx_after = lines[start + changed_per_hunk : start + changed_per_hunk + 3]
+            old_len = len(ctx_before) + len(changed) + len(ctx_after)
+            new_len = old_len + 1
+            out.append(f"@@ -{start - 2},{old_len} +{start - 2 + delta},{new_len} @@")
+            out.extend(f" {line}" for line in ctx_before)
+            out.extend(f"-{line}" for line in changed)
+            out.extend(f"+{line}  # patched" for line in changed)
+            out.append(f"+# inserted after line {start + changed_per_hunk}")
+            out.extend(f" {line}" for line in ctx_after)
+            delta += 1
+    return "\n".join(out) + "\n"
+
+
+def run_benchmark(
+    num_files: int, lines_per_file: int, hunks_per_file: int, changed_per_hunk: int, seed: int
+) -> dict[str, float]:
+    rng = random.Random(seed)
+    with tempfile.TemporaryDirectory(prefix="agent_lab_bench_patch_") as tmp:
+        root = Path(tmp)
+        files = _make_tree(root, num_files, lines_per_file)
+        diff_text = _make_diff(files, hunks_per_file, changed_per_hunk, rng)
+        diff_lines = diff_text.count("\n")
+
+        start = time.perf_counter()
+        parsed = parse_patch(diff_text)
+        parse_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        touched = apply_patch(diff_text, root)
+        apply_seconds = time.perf_counter() - start
+
+    return {
+        "files": float(len(touched)),
+        "hunks": float(sum(len(fp.hunks) for fp in parsed)),
+        "diff_lines": float(diff_lines),
+        "source_lines": float(num_files * lines_per_file),
+        "parse_seconds": parse_seconds,
+        "apply_seconds": apply_seconds,
+        "diff_lines_per_second": diff_lines / apply_seconds if apply_seconds else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the unified diff engine on large synthetic patches")
+    parser.add_argument("--files", type=int, default=500)
+    parser.add_argument("--lines-per-file", type=int, default=400)
+    parser.add_argument("--hunks-per-file", type=int, default=8)
+    parser.add_argument("--changed-per-hunk", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    stats = run_benchmark(
+        num_files=args.files,
+        lines_per_file=args.lines_per_file,
+        hunks_per_file=args.hunks_per_file,
+        changed_per_hunk=args.changed_per_hunk,
+        seed=args.seed,
+    )
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import Any
+
+DEFAULT_MAX_INLINE_BYTES = 4096
+
+
+class BlobStore:
+    # Content-addressed, gzip-compressed text blobs under <output_dir>/blobs.
+    # Records keep a short inline tail plus a relative reference to the blob.
+
+    def __init__(self, output_dir: Path, max_inline_bytes: int = DEFAULT_MAX_INLINE_BYTES) -> None:
+        self.output_dir = output_dir
+        self.max_inline_bytes = max_inline_bytes
+
+    def put(self, text: str) -> str:
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        rel = f"blobs/{digest[:2]}/{digest}.txt.gz"
+        path = self.output_dir / rel
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(prefix=".blob_", dir=path.parent)
+            with os.fdopen(fd, "wb") as fh:
+                # mtime=0 keeps identical outputs byte-identical on disk.
+                with gzip.GzipFile(fileobj=fh, mode="wb", mtime=0) as gz:
+                    gz.write(data)
+            os.replace(tmp_name, path)
+        return rel
+
+    def externalize(self, name: str, text: str) -> dict[str, Any]:
+        data = text.encode("utf-8")
+        if len(data) <= self.max_inline_bytes:
+            return {name: text}
+        # Keep the tail inline: pytest puts its summary at the end.
+        tail = data[-self.max_inline_bytes :].decode("utf-8", errors="ignore") if self.max_inline_bytes else ""
+        return {
+            name: tail,
+            f"{name}_truncated": True,
+            f"{name}_bytes": len(data),
+            f"{name}_blob": self.put(text),
+        }
+
+
+def read_blob(output_dir: Path, rel: str) -> str:
+    with gzip.open(output_dir / rel, "rb") as fh:
+        return fh.read().decode("utf-8")
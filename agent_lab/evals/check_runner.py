@@ -0,0 +1,361 @@
+from __future__ import annotations
+
+import json
+import os
+import queue
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from dataclasses import asdict, dataclass, replace
+from pathlib import Path
+from typing import Any, Callable
+
+from agent_lab.evals.junit import parse_junit
+
+CHECK_RUNNERS = ("subprocess", "forkserver")
+
+_SERVER_SCRIPT = Path(__file__).resolve().parent / "pytest_server.py"
+
+# How often a running check's usage is sampled; also the worst-case overshoot
+# of the CPU and memory limits.
+LIMIT_POLL_SECONDS = 0.05
+
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+@dataclass(frozen=True)
+class CheckLimits:
+    # Per-check limits; None disables one. CPU time and memory (RSS) cover the
+    # check's whole process tree and are sampled from /proc, so they are only
+    # enforced on Linux; wall time and output size are enforced everywhere.
+    wall_seconds: float | None = 300.0
+    cpu_seconds: float | None = 300.0
+    memory_mb: float | None = 2048.0
+    output_bytes: int | None = 16 * 1024 * 1024
+
+    def merged(self, overrides: dict[str, Any] | None) -> "CheckLimits":
+        # A task check's "limits" object, applied over these defaults.
+        if not overrides:
+            return self
+        unknown = set(overrides) - set(asdict(self))
+        if unknown:
+            raise ValueError(f"Unknown check limits: {sorted(unknown)}")
+        return replace(self, **overrides)
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+DEFAULT_CHECK_LIMITS = CheckLimits()
+
+# Task outcomes of checks killed for a limit or by the OOM killer.
+LIMIT_OUTCOMES = ("timeout", "oom", "output_limit")
+
+
+class LimitedProcess(subprocess.CompletedProcess):
+    # A finished check; `limit` names the limit it was killed for, if any:
+    # "wall", "cpu", "memory" or "output". `tests` holds per-test results (see
+    # junit.parse_junit) when they were requested and pytest wrote them.
+
+    def __init__(
+        self,
+        args: list[str],
+        returncode: int,
+        stdout: str,
+        stderr: str,
+        limit: str | None = None,
+        tests: dict[str, Any] | None = None,
+    ) -> None:
+        super().__init__(args, returncode, stdout, stderr)
+        self.limit = limit
+        self.tests = tests
+
+
+def _tree_pids(pid: int) -> list[int]:
+    # pid and its live descendants, via /proc/<pid>/task/<tid>/children.
+    pids, stack = [], [pid]
+    while stack:
+        current = stack.pop()
+        pids.append(current)
+        try:
+            tids = os.listdir(f"/proc/{current}/task")
+        except OSError:
+            continue
+        for tid in tids:
+            try:
+                with open(f"/proc/{current}/task/{tid}/children", encoding="ascii") as fh:
+                    stack.extend(int(child) for child in fh.read().split())
+            except OSError:
+                continue
+    return pids
+
+
+def _tree_usage(pid: int) -> tuple[float, int] | None:
+    # (CPU seconds, RSS bytes) of a process tree, or None without /proc.
+    cpu_ticks = rss_pages = 0
+    seen = False
+    for current in _tree_pids(pid):
+        try:
+            with open(f"/proc/{current}/stat", encoding="ascii", errors="replace") as fh:
+                stat = fh.read()
+        except OSError:
+            continue
+        seen = True
+        # Fields after the parenthesised command name, starting at "state".
+        fields = stat[stat.rfind(")") + 2 :].split()
+        cpu_ticks += sum(int(value) for value in fields[11:15])  # utime stime cutime cstime
+        rss_pages += int(fields[21])
+    if not seen:
+        return None
+    return cpu_ticks / _CLOCK_TICKS, rss_pages * _PAGE_SIZE
+
+
+def _kill_group(pgid: int) -> None:
+    try:
+        os.killpg(pgid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def _watch(
+    pid: int,
+    wait: Callable[[float], int | None],
+    limits: CheckLimits,
+    outputs: tuple[Path, Path],
+) -> tuple[int, str | None]:
+    # Waits for a check that leads its own process group (pgid == pid),
+    # killing the whole group when a limit is exceeded. `wait(timeout)` returns
+    # the exit code, or None if the check is still running after `timeout`.
+    # Returns (returncode, limit hit or None).
+    start = time.monotonic()
+    limit = None
+    try:
+        while True:
+            returncode = wait(LIMIT_POLL_SECONDS)
+            if returncode is not None:
+                return returncode, limit
+            if limit is not None:
+                # Again, in case the group did not exist yet (a fork server
+                # child killed before its setsid).
+                _kill_group(pid)
+                continue
+            if limits.wall_seconds is not None and time.monotonic() - start > limits.wall_seconds:
+                limit = "wall"
+            elif limits.output_bytes is not None and sum(p.stat().st_size for p in outputs) > limits.output_bytes:
+                limit = "output"
+            elif limits.cpu_seconds is not None or limits.memory_mb is not None:
+                usage = _tree_usage(pid)
+                if usage is not None:
+                    cpu_seconds, rss_bytes = usage
+                    if limits.cpu_seconds is not None and cpu_seconds > limits.cpu_seconds:
+                        limit = "cpu"
+                    elif limits.memory_mb is not None and rss_bytes > limits.memory_mb * 1024 * 1024:
+                        limit = "memory"
+            if limit is not None:
+                _kill_group(pid)
+    finally:
+        # Background processes the check left behind go with it.
+        _kill_group(pid)
+
+
+def _read_output(path: Path, limit: int | None) -> str:
+    with path.open("rb") as fh:
+        data = fh.read() if limit is None else fh.read(limit + 1)
+    text = data.decode("utf-8", errors="replace")
+    if limit is not None and len(data) > limit:
+        text = text[:limit] + f"\n[output truncated at {limit} bytes]\n"
+    return text
+
+
+def _junit_args(tmp: str, junit: bool) -> list[str]:
+    # The report is written next to the captured output, outside the workspace.
+    return [f"--junitxml={Path(tmp) / 'report.xml'}"] if junit else []
+
+
+def _tests(tmp: str, cwd: Path, junit: bool) -> dict[str, Any] | None:
+    return parse_junit(Path(tmp) / "report.xml", cwd) if junit else None
+
+
+class SubprocessCheckRunner:
+    def run(
+        self,
+        cmd: list[str],
+        cwd: Path,
+        limits: CheckLimits = DEFAULT_CHECK_LIMITS,
+        junit: bool = False,
+    ) -> LimitedProcess:
+        # Output goes to files, so a runaway writer cannot stall on a full pipe
+        # and its size can be checked without reading it. junit: add a JUnit
+        # report to the (pytest) command and return its per-test results.
+        with tempfile.TemporaryDirectory(prefix="agent_lab_check_") as tmp:
+            outputs = (Path(tmp) / "stdout", Path(tmp) / "stderr")
+            with outputs[0].open("wb") as out, outputs[1].open("wb") as err:
+                proc = subprocess.Popen(
+                    [*cmd, *_junit_args(tmp, junit)],
+                    cwd=str(cwd),
+                    stdout=out,
+                    stderr=err,
+                    start_new_session=True,
+                )
+
+            def wait(timeout: float) -> int | None:
+                try:
+                    return proc.wait(timeout=timeout)
+                except subprocess.TimeoutExpired:
+                    return None
+
+            returncode, limit = _watch(proc.pid, wait, limits, outputs)
+            return LimitedProcess(
+                cmd,
+                returncode,
+                _read_output(outputs[0], limits.output_bytes),
+                _read_output(outputs[1], limits.output_bytes),
+                limit,
+                _tests(tmp, cwd, junit),
+            )
+
+    def close(self) -> None:
+        return None
+
+
+class _PytestServer:
+    def __init__(self) -> None:
+        self._proc = subprocess.Popen(
+            [sys.executable, str(_SERVER_SCRIPT)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            bufsize=1,
+        )
+        ready = self._read()
+        if not ready.get("ready"):
+            raise RuntimeError("pytest fork server failed to start")
+
+    def _read(self) -> dict[str, Any]:
+        assert self._proc.stdout is not None
+        line = self._proc.stdout.readline()
+        if not line:
+            raise RuntimeError("pytest fork server exited unexpectedly")
+        return json.loads(line)
+
+    def request(
+        self, args: list[str], cwd: Path, outputs: tuple[Path, Path], limits: CheckLimits
+    ) -> tuple[int, str | None]:
+        # The server answers with the forked child's pid, then with its exit
+        # code once it has reaped it; the child is watched from this side.
+        assert self._proc.stdin is not None
+        request = {"args": args, "cwd": str(cwd), "stdout": str(outputs[0]), "stderr": str(outputs[1])}
+        self._proc.stdin.write(json.dumps(request) + "\n")
+        self._proc.stdin.flush()
+        pid = int(self._read()["pid"])
+        done: Future[dict[str, Any]] = Future()
+
+        def read_done() -> None:
+            try:
+                done.set_result(self._read())
+            except BaseException as exc:
+                done.set_exception(exc)
+
+        threading.Thread(target=read_done, name="agent_lab_forkserver_wait", daemon=True).start()
+
+        def wait(timeout: float) -> int | None:
+            try:
+                return int(done.result(timeout=timeout)["returncode"])
+            except FutureTimeout:
+                return None
+
+        return _watch(pid, wait, limits, outputs)
+
+    def close(self) -> None:
+        if self._proc.stdin is not None:
+            try:
+                self._proc.stdin.close()
+            except OSError:
+                pass
+        try:
+            self._proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self._proc.kill()
+            self._proc.wait()
+
+
+class ForkServerCheckRunner:
+    # Keeps `size` warm server processes with pytest and its plugins imported.
+    # Each check forks a fresh child from a server, in its own session, so no
+    # module state from one workspace can leak into the next.
+
+    def __init__(self, size: int = 1) -> None:
+        self._idle: queue.Queue[_PytestServer] = queue.Queue()
+        self._servers: list[_PytestServer] = []
+        self._lock = threading.Lock()
+        for _ in range(size):
+            self._add_server()
+
+    def _add_server(self) -> _PytestServer:
+        server = _PytestServer()
+        with self._lock:
+            self._servers.append(server)
+        self._idle.put(server)
+        return server
+
+    def _replace(self, server: _PytestServer) -> None:
+        # A server interrupted mid-request may be out of step with the
+        # protocol; it is never reused.
+        with self._lock:
+            if server in self._servers:
+                self._servers.remove(server)
+        try:
+            server.close()
+        finally:
+            self._add_server()
+
+    def run(
+        self,
+        cmd: list[str],
+        cwd: Path,
+        limits: CheckLimits = DEFAULT_CHECK_LIMITS,
+        junit: bool = False,
+    ) -> LimitedProcess:
+        if not cmd or cmd[0] != "pytest":
+            raise ValueError(f"Fork server only runs pytest checks: {cmd}")
+        server = self._idle.get()
+        with tempfile.TemporaryDirectory(prefix="agent_lab_check_") as tmp:
+            outputs = (Path(tmp) / "stdout", Path(tmp) / "stderr")
+            # Every server taken from the idle queue goes back to it or is replaced.
+            try:
+                returncode, limit = server.request([*cmd[1:], *_junit_args(tmp, junit)], cwd, outputs, limits)
+            except BaseException:
+                self._replace(server)
+                raise
+            self._idle.put(server)
+            return LimitedProcess(
+                cmd,
+                returncode,
+                _read_output(outputs[0], limits.output_bytes),
+                _read_output(outputs[1], limits.output_bytes),
+                limit,
+                _tests(tmp, cwd, junit),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            servers, self._servers = self._servers, []
+        for server in servers:
+            server.close()
+
+
+CheckRunner = SubprocessCheckRunner | ForkServerCheckRunner
+
+
+def make_check_runner(name: str, size: int = 1) -> CheckRunner:
+    if name == "subprocess":
+        return SubprocessCheckRunner()
+    if name == "forkserver":
+        return ForkServerCheckRunner(size=size)
+    raise ValueError(f"Unknown check runner: {name}")
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+from pathlib import Path
+from typing import Iterable
+
+IGNORED_NAMES = frozenset({"__pycache__", ".pytest_cache", ".mypy_cache", ".ruff_cache"})
+_CHUNK_SIZE = 1 << 20
+
+
+def _iter_tree_files(root: Path, ignored: frozenset[str]) -> Iterable[Path]:
+    for path in sorted(root.rglob("*")):
+        rel_parts = path.relative_to(root).parts
+        if any(part in ignored for part in rel_parts):
+            continue
+        if path.is_file():
+            yield path
+
+
+def hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as fh:
+        for chunk in iter(lambda: fh.read(_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class FileHashMemo:
+    # Remembers file digests by inode identity. Hardlinked workspace files share
+    # an inode with their fixture snapshot, so only files a patch rewrote are read.
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._digests: dict[tuple[int, int, int, int], str] = {}
+
+    def hash_file(self, path: Path) -> str:
+        st = path.stat()
+        key = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+        with self._lock:
+            cached = self._digests.get(key)
+        if cached is not None:
+            return cached
+        digest = hash_file(path)
+        with self._lock:
+            self._digests[key] = digest
+        return digest
+
+
+def tree_entries(
+    root: Path,
+    ignored: frozenset[str] = IGNORED_NAMES,
+    memo: FileHashMemo | None = None,
+) -> list[tuple[str, bool, str]]:
+    entries = []
+    for path in _iter_tree_files(root, ignored):
+        rel = path.relative_to(root).as_posix()
+        executable = bool(path.stat().st_mode & 0o111)
+        file_digest = memo.hash_file(path) if memo is not None else hash_file(path)
+        entries.append((rel, executable, file_digest))
+    return entries
+
+
+def digest_tree_entries(entries: Iterable[tuple[str, bool, str]]) -> str:
+    digest = hashlib.sha256()
+    for rel, executable, file_digest in entries:
+        digest.update(f"{rel}\0{int(executable)}\0{file_digest}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def hash_tree(
+    root: Path,
+    ignored: frozenset[str] = IGNORED_NAMES,
+    memo: FileHashMemo | None = None,
+) -> str:
+    return digest_tree_entries(tree_entries(root, ignored, memo))
+
+
+def hash_parts(parts: Iterable[str]) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any
+from xml.etree.ElementTree import Element, ParseError, iterparse
+
+# One letter per test in a task record's "tests": {"ids": [node id, ...],
+# "outcomes": "ppfs...", "ms": [duration, ...]}, so thousands of tests cost a
+# few bytes each in results.json and trace.jsonl.
+OUTCOME_LETTERS = {"passed": "p", "failed": "f", "error": "e", "skipped": "s"}
+
+
+def _node_id(classname: str, name: str, root: Path) -> str:
+    # JUnit names tests by dotted classname; map the longest prefix that is a
+    # module under root back to a file so ids match pytest node ids, e.g.
+    # "tests.test_core.TestX" + "test_y" -> "tests/test_core.py::TestX::test_y".
+    parts = classname.split(".") if classname else []
+    for i in range(len(parts), 0, -1):
+        rel = "/".join(parts[:i]) + ".py"
+        if (root / rel).is_file():
+            return "::".join([rel, *parts[i:], name])
+    return "::".join([*parts, name]) if parts else name
+
+
+def _outcome(testcase: Element) -> str:
+    letter = "p"
+    for child in testcase:
+        if child.tag == "failure":
+            return "f"
+        if child.tag == "error":
+            letter = "e"
+        elif child.tag == "skipped" and letter == "p":
+            letter = "s"
+    return letter
+
+
+def parse_junit(path: Path, root: Path) -> dict[str, Any] | None:
+    # Streams a pytest --junitxml report; finished testcases are dropped from
+    # the tree as soon as they are read. None when the report is missing or
+    # unreadable (e.g. the check was killed before pytest wrote it).
+    ids: list[str] = []
+    outcomes: list[str] = []
+    ms: list[int] = []
+    parents: list[Element] = []
+    try:
+        for event, elem in iterparse(path, events=("start", "end")):
+            if event == "start":
+                parents.append(elem)
+                continue
+            parents.pop()
+            if elem.tag != "testcase":
+                continue
+            ids.append(_node_id(elem.get("classname", ""), elem.get("name", ""), root))
+            outcomes.append(_outcome(elem))
+            ms.append(round(float(elem.get("time", 0.0)) * 1000))
+            if parents:
+                parents[-1].remove(elem)
+    except (OSError, ParseError):
+        return None
+    return {"ids": ids, "outcomes": "".join(outcomes), "ms": ms}
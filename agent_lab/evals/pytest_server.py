@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+# Warm pytest fork server. Started by check_runner.ForkServerCheckRunner as a
+# plain script (not a package module) so the forked checks see the same
+# sys.path a fresh `pytest` process would. Protocol: one JSON request per line
+# on stdin ({"args", "cwd", "stdout", "stderr"}, the last two being files the
+# check's output goes to); two JSON lines per request on stdout: {"pid"} as soon
+# as the check is forked, so the client can watch and kill its process group,
+# then {"returncode"} once it has been reaped.
+
+import importlib.metadata
+import json
+import os
+import sys
+from typing import Callable
+
+import pytest
+import _pytest.config  # noqa: F401  (pre-import the bulk of pytest's internals)
+import _pytest.python  # noqa: F401
+
+
+def _preload_plugins() -> None:
+    for entry_point in importlib.metadata.entry_points(group="pytest11"):
+        try:
+            entry_point.load()
+        except Exception:
+            continue
+
+
+def _run_child(args: list[str], cwd: str, stdout_fd: int, stderr_fd: int) -> None:
+    try:
+        os.setsid()
+        os.chdir(cwd)
+        os.dup2(stdout_fd, 1)
+        os.dup2(stderr_fd, 2)
+        sys.path.pop(0)
+        sys.argv = ["pytest", *args]
+        code = int(pytest.main(args))
+        sys.stdout.flush()
+        sys.stderr.flush()
+    except BaseException:
+        code = 3
+    os._exit(code)
+
+
+def _handle(request: dict, send: Callable[[dict], None]) -> None:
+    with open(request["stdout"], "wb") as out, open(request["stderr"], "wb") as err:
+        pid = os.fork()
+        if pid == 0:
+            _run_child(request["args"], request["cwd"], out.fileno(), err.fileno())
+    send({"pid": pid})
+    _, status = os.waitpid(pid, 0)
+    send({"returncode": os.waitstatus_to_exitcode(status)})
+
+
+def main() -> None:
+    _preload_plugins()
+    protocol_out = os.fdopen(os.dup(1), "w", encoding="utf-8")
+    # Nothing but protocol messages may reach the parent on the original stdout.
+    os.dup2(2, 1)
+
+    def send(message: dict) -> None:
+        protocol_out.write(json.dumps(message) + "\n")
+        protocol_out.flush()
+
+    send({"ready": True})
+    for line in sys.stdin:
+        if line.strip():
+            _handle(json.loads(line), send)
+
+
+if __name__ == "__main__":
+    main()
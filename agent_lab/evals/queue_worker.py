@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import argparse
+import os
+import socket
+import threading
+import time
+from pathlib import Path
+
+from agent_lab.evals.check_runner import CheckLimits
+from agent_lab.evals.run_evals import QUEUE_POLL_SECONDS, TaskHarness
+from agent_lab.evals.task_queue import TaskQueue
+
+
+class _Leases:
+    # Seqs this process holds, with the owner each was claimed as; a heartbeat
+    # thread renews them every third of the lease, so leases only lapse when
+    # the whole worker dies or hangs.
+
+    def __init__(self, queue: TaskQueue, lease_seconds: float) -> None:
+        self._queue = queue
+        self._lease_seconds = lease_seconds
+        self._lock = threading.Lock()
+        self._held: dict[int, str] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._renew_loop, name="agent_lab_lease", daemon=True)
+        self._thread.start()
+
+    def hold(self, seq: int, owner: str) -> None:
+        with self._lock:
+            self._held[seq] = owner
+
+    def drop(self, seq: int) -> None:
+        with self._lock:
+            self._held.pop(seq, None)
+
+    def _renew_loop(self) -> None:
+        while not self._stop.wait(self._lease_seconds / 3):
+            by_owner: dict[str, list[int]] = {}
+            with self._lock:
+                for seq, owner in self._held.items():
+                    by_owner.setdefault(owner, []).append(seq)
+            for owner, seqs in by_owner.items():
+                self._queue.renew(sorted(seqs), owner, self._lease_seconds)
+
+    def close(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+def work(queue_path: Path, threads: int | None = None) -> int:
+    # Runs tasks from the queue until none are pending or leased. Returns the
+    # number of tasks this process completed.
+    queue = TaskQueue(queue_path)
+    config = queue.config()
+    threads = threads or int(config["workers"])
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+    leases = _Leases(queue, float(config["lease_seconds"]))
+    completed = 0
+    completed_lock = threading.Lock()
+
+    harness = TaskHarness(
+        Path(config["agent_dir"]),
+        Path(config["output_dir"]),
+        fixtures_root=Path(config["fixtures_root"]),
+        workers=threads,
+        workspace_mode=config["workspace_mode"],
+        check_runner=config["check_runner"],
+        dedupe_checks=bool(config["dedupe_checks"]),
+        agent_options=config["agent_options"],
+        max_inline_output=int(config["max_inline_output"]),
+        agent_timeout=float(config["agent_timeout"]),
+        check_limits=CheckLimits(**config["check_limits"]),
+        select_tests=config.get("select_tests"),
+    )
+
+    def loop(slot: int) -> None:
+        nonlocal completed
+        slot_owner = f"{owner}:{slot}"
+        while True:
+            claimed = queue.claim(slot_owner, float(config["lease_seconds"]), int(config["max_attempts"]))
+            if claimed is None:
+                # Leased tasks may still come back if their worker dies.
+                if not queue.unfinished():
+                    return
+                time.sleep(QUEUE_POLL_SECONDS)
+                continue
+            seq, task = claimed
+            leases.hold(seq, slot_owner)
+            try:
+                result = harness.run_task(task)
+            except Exception as exc:
+                # Harness errors (bad check spec, disallowed command) are not
+                # worth retrying elsewhere.
+                queue.fail(seq, f"{type(exc).__name__}: {exc}")
+            else:
+                queue.complete(seq, result)
+                with completed_lock:
+                    completed += 1
+            finally:
+                leases.drop(seq)
+
+    try:
+        with harness:
+            pool = [threading.Thread(target=loop, args=(k,), name=f"agent_lab_queue_{k}") for k in range(threads)]
+            for thread in pool:
+                thread.start()
+            for thread in pool:
+                thread.join()
+    finally:
+        leases.close()
+    return completed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run eval tasks from a run_evals --queue SQLite queue")
+    parser.add_argument("queue", help="Queue file, e.g. <output-dir>/queue.sqlite; must be on a shared filesystem.")
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=None,
+        help="Tasks to run at once in this process (default: the posting run's --workers).",
+    )
+    args = parser.parse_args()
+    work(Path(args.queue), threads=args.threads)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any
+
+from agent_lab.evals.hashing import hash_file, hash_parts, hash_tree
+
+CACHED_ARTIFACTS = ("results.json", "trace.jsonl", "progress.json", "blobs")
+
+
+def _harness_fingerprint() -> str:
+    evals_dir = Path(__file__).resolve().parent
+    return hash_parts(f"{p.name}:{hash_file(p)}" for p in sorted(evals_dir.glob("*.py")))
+
+
+def eval_cache_key(
+    agent_dir: Path,
+    tasks_path: Path,
+    fixtures_root: Path,
+    tasks: list[dict[str, Any]],
+    options: dict[str, Any] | None = None,
+) -> str:
+    fixtures = sorted({str(task["fixture"]) for task in tasks})
+    parts = [
+        "agent:" + hash_tree(agent_dir),
+        "tasks:" + hash_file(tasks_path),
+        "harness:" + _harness_fingerprint(),
+        "llm:" + str(bool(os.environ.get("OPENAI_API_KEY"))),
+        "options:" + json.dumps(options or {}, sort_keys=True),
+    ]
+    parts.extend(f"fixture:{name}:{hash_tree(fixtures_root / name)}" for name in fixtures)
+    return hash_parts(parts)
+
+
+class ResultCache:
+    def __init__(self, root: Path) -> None:
+        self.root = root
+
+    def _entry(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def restore(self, key: str, output_dir: Path) -> dict[str, Any] | None:
+        entry = self._entry(key)
+        results_path = entry / "results.json"
+        if not results_path.exists():
+            return None
+        output_dir.mkdir(parents=True, exist_ok=True)
+        for name in CACHED_ARTIFACTS:
+            source = entry / name
+            if source.is_dir():
+                shutil.copytree(source, output_dir / name, dirs_exist_ok=True)
+            elif source.exists():
+                shutil.copy2(source, output_dir / name)
+        return json.loads(results_path.read_text(encoding="utf-8"))
+
+    def store(self, key: str, output_dir: Path) -> None:
+        entry = self._entry(key)
+        if entry.exists():
+            return
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(prefix=f".{key[:12]}_", dir=entry.parent))
+        try:
+            for name in CACHED_ARTIFACTS:
+                source = output_dir / name
+                if source.is_dir():
+                    shutil.copytree(source, staging / name)
+                elif source.exists():
+                    shutil.copy2(source, staging / name)
+            # Publish the entry with a single rename so readers never see a partial entry.
+            os.replace(staging, entry)
+        except OSError:
+            shutil.rmtree(staging, ignore_errors=True)
+            if not entry.exists():
+                raise
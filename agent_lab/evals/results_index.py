@@ -0,0 +1,365 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator
+
+from agent_lab.evals.check_runner import LIMIT_OUTCOMES
+
+DEFAULT_INDEX_PATH = Path(__file__).resolve().parents[1] / "logs" / "index.sqlite"
+
+# One row per eval output directory (a run_evals call), one per task result in
+# it, and one per parent iteration. Evals made by run_iteration carry its
+# run_id and their role ("baseline", "candidate", "candidate_<k>"); standalone
+# run_evals calls have neither. Cache-hit evals are copies of an earlier eval,
+# so the per-task aggregates leave them out.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS evals (
+    eval_id INTEGER PRIMARY KEY,
+    output_dir TEXT NOT NULL UNIQUE,
+    results_mtime_ns INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    run_id TEXT,
+    role TEXT,
+    agent_tree TEXT,
+    score INTEGER NOT NULL,
+    total INTEGER NOT NULL,
+    stopped_early INTEGER NOT NULL,
+    cache_hit INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS evals_run ON evals (run_id);
+CREATE INDEX IF NOT EXISTS evals_created ON evals (created_at);
+CREATE TABLE IF NOT EXISTS task_results (
+    eval_id INTEGER NOT NULL REFERENCES evals (eval_id) ON DELETE CASCADE,
+    task_id TEXT NOT NULL,
+    passed INTEGER NOT NULL,
+    returncode INTEGER,
+    elapsed_seconds REAL NOT NULL,
+    error_kind TEXT,
+    PRIMARY KEY (eval_id, task_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS task_results_task ON task_results (task_id, eval_id);
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    iteration INTEGER,
+    created_at REAL NOT NULL,
+    promoted INTEGER NOT NULL,
+    baseline_tree TEXT,
+    candidate_tree TEXT,
+    baseline_total INTEGER,
+    candidate_total INTEGER,
+    summary TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_created ON runs (created_at);
+"""
+
+_ERROR_KINDS = ("patch_error", "agent_error", "select_error", "queue_error", "workspace_error")
+
+
+def _error_kind(task: dict[str, Any]) -> str | None:
+    # A limit outcome ("timeout", "oom", "output_limit") or which error kept
+    # the check from running.
+    if task.get("outcome") in LIMIT_OUTCOMES:
+        return task["outcome"]
+    for key in _ERROR_KINDS:
+        if task.get(key):
+            return key.removesuffix("_error")
+    return None
+
+
+class ResultsIndex:
+    # SQLite index over eval outputs and run summaries under logs/. It only
+    # points at the output directories; results.json and trace.jsonl stay the
+    # source of truth, and `backfill` rebuilds any row from them. WAL mode:
+    # the index lives next to the logs on a local disk, and readers (the query
+    # CLI) should not block a running loop.
+
+    def __init__(self, path: Path = DEFAULT_INDEX_PATH) -> None:
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _connect(self, immediate: bool = False) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+        try:
+            conn.execute("PRAGMA busy_timeout=30000")
+            conn.execute("PRAGMA foreign_keys=ON")
+            conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    def record_eval(
+        self,
+        output_dir: Path,
+        results: dict[str, Any] | None = None,
+        agent_tree: str | None = None,
+        created_at: float | None = None,
+    ) -> bool:
+        # Indexes (or re-indexes) one eval output directory. Returns False when
+        # its results.json is already indexed as is.
+        output_dir = output_dir.resolve()
+        results_path = output_dir / "results.json"
+        mtime_ns = results_path.stat().st_mtime_ns
+        if results is None:
+            results = json.loads(results_path.read_text(encoding="utf-8"))
+        with self._connect(immediate=True) as conn:
+            row = conn.execute(
+                "SELECT eval_id, results_mtime_ns, agent_tree FROM evals WHERE output_dir = ?", (str(output_dir),)
+            ).fetchone()
+            if row is not None and row[1] == mtime_ns:
+                if agent_tree and row[2] != agent_tree:
+                    conn.execute("UPDATE evals SET agent_tree = ? WHERE eval_id = ?", (agent_tree, row[0]))
+                return False
+            if row is not None:
+                # Replaced results (the directory was reused by a new run).
+                conn.execute("DELETE FROM evals WHERE eval_id = ?", (row[0],))
+            cursor = conn.execute(
+                "INSERT INTO evals (output_dir, results_mtime_ns, created_at, agent_tree, score, total,"
+                " stopped_early, cache_hit) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    str(output_dir),
+                    mtime_ns,
+                    created_at if created_at is not None else time.time(),
+                    agent_tree,
+                    int(results.get("score", 0)),
+                    int(results.get("total", 0)),
+                    int(bool(results.get("stopped_early", False))),
+                    int(bool(results.get("cache_hit", False))),
+                ),
+            )
+            eval_id = cursor.lastrowid
+            conn.executemany(
+                "INSERT OR REPLACE INTO task_results (eval_id, task_id, passed, returncode, elapsed_seconds,"
+                " error_kind) VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    (
+                        eval_id,
+                        str(task["id"]),
+                        int(bool(task.get("passed", False))),
+                        task.get("returncode"),
+                        float(task.get("elapsed_seconds", 0.0)),
+                        _error_kind(task),
+                    )
+                    for task in results.get("tasks", [])
+                ),
+            )
+        return True
+
+    def record_run(self, run_dir: Path, summary: dict[str, Any], created_at: float | None = None) -> None:
+        # Indexes a parent iteration and tags the evals under run_dir with its
+        # run_id, role, agent tree and cache hit (results.json on disk does not
+        # record it). Eval rows missing (e.g. an iteration that ran without an
+        # index) are indexed from disk first.
+        run_dir = run_dir.resolve()
+        cache_hits = summary.get("cache_hits", {})
+        trees = {"baseline": summary.get("baseline_tree"), "candidate": summary.get("candidate_tree")}
+        hits = {"baseline": cache_hits.get("baseline", False), "candidate": cache_hits.get("candidate", False)}
+        for k, candidate in enumerate(summary.get("candidates", [])):
+            trees[f"candidate_{k}"] = candidate.get("tree")
+            hits[f"candidate_{k}"] = candidate.get("cache_hit", False)
+        for role, tree in trees.items():
+            if (run_dir / role / "results.json").exists():
+                self.record_eval(run_dir / role, agent_tree=tree, created_at=created_at)
+        comparison = summary.get("comparison", {})
+        with self._connect(immediate=True) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO runs (run_id, iteration, created_at, promoted, baseline_tree,"
+                " candidate_tree, baseline_total, candidate_total, summary) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    run_dir.name,
+                    summary.get("iteration"),
+                    created_at if created_at is not None else time.time(),
+                    int(bool(summary.get("promoted", False))),
+                    summary.get("baseline_tree"),
+                    summary.get("candidate_tree"),
+                    comparison.get("baseline_total"),
+                    comparison.get("candidate_total"),
+                    json.dumps(summary),
+                ),
+            )
+            conn.executemany(
+                "UPDATE evals SET run_id = ?, role = ?, cache_hit = ? WHERE output_dir = ?",
+                ((run_dir.name, role, int(bool(hits[role])), str(run_dir / role)) for role in trees),
+            )
+
+    def backfill(self, logs_dir: Path) -> dict[str, int]:
+        # Indexes every run directory (and stray eval output) under logs_dir
+        # that is new or changed since the last backfill. Unchanged evals cost
+        # one stat each.
+        counts = {"runs": 0, "evals": 0}
+        with self._connect() as conn:
+            known_runs = {row[0] for row in conn.execute("SELECT run_id FROM runs")}
+        for run_dir in sorted(p for p in logs_dir.iterdir() if p.is_dir()):
+            summary_path = run_dir / "summary.json"
+            if summary_path.exists():
+                created_at = summary_path.stat().st_mtime
+                for results_path in sorted(run_dir.glob("*/results.json")):
+                    counts["evals"] += self.record_eval(results_path.parent, created_at=created_at)
+                if run_dir.name not in known_runs:
+                    summary = json.loads(summary_path.read_text(encoding="utf-8"))
+                    self.record_run(run_dir, summary, created_at=created_at)
+                    counts["runs"] += 1
+            elif (run_dir / "results.json").exists():
+                created_at = (run_dir / "results.json").stat().st_mtime
+                counts["evals"] += self.record_eval(run_dir, created_at=created_at)
+        return counts
+
+    def runs(self, limit: int = 20) -> list[dict[str, Any]]:
+        # Most recent iterations first, with the pass rates of their evals.
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT r.run_id, r.iteration, r.created_at, r.promoted, r.baseline_total, r.candidate_total,"
+                " b.score, b.total, c.score, c.total"
+                " FROM runs r"
+                " LEFT JOIN evals b ON b.run_id = r.run_id AND b.role = 'baseline'"
+                " LEFT JOIN evals c ON c.run_id = r.run_id AND c.role IN ('candidate', 'candidate_0')"
+                " ORDER BY r.created_at DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [
+            {
+                "run_id": run_id,
+                "iteration": iteration,
+                "created_at": created_at,
+                "promoted": bool(promoted),
+                "baseline_pass_rate": b_score / b_total if b_total else None,
+                "candidate_pass_rate": c_score / c_total if c_total else None,
+                "baseline_total": baseline_total,
+                "candidate_total": candidate_total,
+            }
+            for (
+                run_id,
+                iteration,
+                created_at,
+                promoted,
+                baseline_total,
+                candidate_total,
+                b_score,
+                b_total,
+                c_score,
+                c_total,
+            ) in rows
+        ]
+
+    def task_stats(self, since: float | None = None) -> list[dict[str, Any]]:
+        # Per task: attempts, pass rate, mean latency, flaky agent trees (trees
+        # that both passed and failed the task) and the latest regression (a
+        # failing baseline eval right after a passing one).
+        where, params = "WHERE NOT e.cache_hit", []
+        if since is not None:
+            where += " AND e.created_at >= ?"
+            params.append(since)
+        with self._connect() as conn:
+            stats = conn.execute(
+                "SELECT t.task_id, COUNT(*), SUM(t.passed), AVG(t.elapsed_seconds), MAX(e.created_at)"
+                f" FROM task_results t JOIN evals e ON e.eval_id = t.eval_id {where}"
+                " GROUP BY t.task_id ORDER BY t.task_id",
+                params,
+            ).fetchall()
+            flaky = dict(
+                conn.execute(
+                    "SELECT task_id, COUNT(*) FROM ("
+                    "  SELECT t.task_id FROM task_results t JOIN evals e ON e.eval_id = t.eval_id"
+                    f"  {where} AND e.agent_tree IS NOT NULL"
+                    "  GROUP BY t.task_id, e.agent_tree HAVING MIN(t.passed) != MAX(t.passed)"
+                    ") GROUP BY task_id",
+                    params,
+                ).fetchall()
+            )
+            regressed = dict(
+                conn.execute(
+                    "SELECT task_id, MAX(created_at) FROM ("
+                    "  SELECT t.task_id, e.created_at, t.passed,"
+                    "   LAG(t.passed) OVER (PARTITION BY t.task_id ORDER BY e.created_at) AS prev_passed"
+                    "  FROM task_results t JOIN evals e ON e.eval_id = t.eval_id"
+                    f"  {where} AND e.role = 'baseline'"
+                    ") WHERE passed = 0 AND prev_passed = 1 GROUP BY task_id",
+                    params,
+                ).fetchall()
+            )
+        return [
+            {
+                "task_id": task_id,
+                "attempts": attempts,
+                "pass_rate": passes / attempts,
+                "mean_elapsed_seconds": mean_elapsed,
+                "flaky_trees": flaky.get(task_id, 0),
+                "last_regressed_at": regressed.get(task_id),
+                "last_seen_at": last_seen,
+            }
+            for task_id, attempts, passes, mean_elapsed, last_seen in stats
+        ]
+
+    def task_history(self, task_id: str, limit: int = 50) -> list[dict[str, Any]]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT e.created_at, e.run_id, e.role, e.agent_tree, e.cache_hit, t.passed, t.returncode,"
+                " t.elapsed_seconds, t.error_kind, e.output_dir"
+                " FROM task_results t JOIN evals e ON e.eval_id = t.eval_id"
+                " WHERE t.task_id = ? ORDER BY e.created_at DESC LIMIT ?",
+                (task_id, limit),
+            ).fetchall()
+        keys = (
+            "created_at",
+            "run_id",
+            "role",
+            "agent_tree",
+            "cache_hit",
+            "passed",
+            "returncode",
+            "elapsed_seconds",
+            "error_kind",
+            "output_dir",
+        )
+        history = [dict(zip(keys, row)) for row in rows]
+        for entry in history:
+            entry["cache_hit"] = bool(entry["cache_hit"])
+            entry["passed"] = bool(entry["passed"])
+        return history
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Query or backfill the results index over logs/")
+    parser.add_argument("--index", default=str(DEFAULT_INDEX_PATH), help="Index database file.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    backfill = sub.add_parser("backfill", help="Index run and eval directories not indexed yet.")
+    backfill.add_argument("logs_dir", nargs="?", default=str(DEFAULT_INDEX_PATH.parent))
+    runs = sub.add_parser("runs", help="Recent iterations with baseline/candidate pass rates.")
+    runs.add_argument("--limit", type=int, default=20)
+    tasks = sub.add_parser("tasks", help="Per-task pass rate, latency, flakiness and last regression.")
+    tasks.add_argument("--days", type=float, default=None, help="Only evals from the last N days.")
+    task = sub.add_parser("task", help="One task's results, most recent first.")
+    task.add_argument("task_id")
+    task.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+
+    index = ResultsIndex(Path(args.index))
+    if args.command == "backfill":
+        output: Any = index.backfill(Path(args.logs_dir))
+    elif args.command == "runs":
+        output = index.runs(limit=args.limit)
+    elif args.command == "tasks":
+        output = index.task_stats(since=time.time() - args.days * 86400 if args.days is not None else None)
+    else:
+        output = index.task_history(args.task_id, limit=args.limit)
+    print(json.dumps(output, indent=2))
+
+
+if __name__ == "__main__":
+    main()
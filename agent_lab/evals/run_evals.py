@@ -1,20 +1,62 @@
 from __future__ import annotations
 
 import argparse
-import importlib.util
-import sys
+import os
 import json
-import shutil
+import signal
 import subprocess
+import sys
 import tempfile
+import threading
 import time
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Iterable, Iterator
+
+from agent_lab.evals.agent_worker import DEFAULT_AGENT_TIMEOUT, AgentWorker, AgentWorkerError, AgentWorkerPool
+from agent_lab.evals.blobs import DEFAULT_MAX_INLINE_BYTES, BlobStore
+from agent_lab.evals.check_runner import (
+    CHECK_RUNNERS,
+    DEFAULT_CHECK_LIMITS,
+    CheckLimits,
+    CheckRunner,
+    SubprocessCheckRunner,
+    make_check_runner,
+)
+from agent_lab.evals.hashing import FileHashMemo, hash_parts, hash_tree
+from agent_lab.evals.patching import PatchError, apply_patch
+from agent_lab.evals.result_cache import ResultCache, eval_cache_key
+from agent_lab.evals.results_index import ResultsIndex
+from agent_lab.evals.sharding import parse_shard, select_shard
+from agent_lab.evals.selection import (
+    COLLECT_COMMAND,
+    SELECT_MODES,
+    SelectionError,
+    TestIndex,
+    is_node_id,
+    parse_collected,
+)
+from agent_lab.evals.task_queue import DEFAULT_LEASE_SECONDS, DEFAULT_MAX_ATTEMPTS, TaskQueue
+from agent_lab.evals.workspace import WORKSPACE_MODES, WorkspaceProvisioner
+
+LLM_CACHE_MODES = ("off", "readwrite", "record", "replay")
+_INLINE_OUTPUT_KEYS = ("stdout", "stderr")
+DEFAULT_FIXTURES_ROOT = Path(__file__).resolve().parent / "fixtures"
+QUEUE_POLL_SECONDS = 0.2
+WORKSPACE_ATTEMPTS = 2
+_REPO_ROOT = Path(__file__).resolve().parents[2]
 
 ALLOWED_COMMANDS = [
     ["pytest", "-q"],
+    COLLECT_COMMAND,
     ["python", "-m", "evals.run_evals"],
 ]
+# Commands that may be followed by validated test node ids (see selection.is_node_id).
+SELECTABLE_COMMANDS = [
+    ["pytest", "-q"],
+]
 
 
 def _load_tasks(tasks_path: Path) -> list[dict[str, Any]]:
@@ -26,136 +68,617 @@ def _load_tasks(tasks_path: Path) -> list[dict[str, Any]]:
 
 
 def _is_allowed_command(cmd: list[str]) -> bool:
-    return any(cmd == allowed for allowed in ALLOWED_COMMANDS)
+    if any(cmd == allowed for allowed in ALLOWED_COMMANDS):
+        return True
+    return any(
+        cmd[: len(allowed)] == allowed and all(is_node_id(arg) for arg in cmd[len(allowed) :])
+        for allowed in SELECTABLE_COMMANDS
+    )
 
 
-def _run_command(cmd: list[str], cwd: Path) -> subprocess.CompletedProcess[str]:
+def _run_command(
+    cmd: list[str],
+    cwd: Path,
+    runner: Any = None,
+    limits: CheckLimits = DEFAULT_CHECK_LIMITS,
+    junit: bool = False,
+) -> subprocess.CompletedProcess[str]:
+    # junit: the runner adds a --junitxml report of its own choosing to an
+    # allowlisted pytest command and returns per-test results.
     if not _is_allowed_command(cmd):
         raise ValueError(f"Command not allowlisted: {cmd}")
-    return subprocess.run(cmd, cwd=str(cwd), text=True, capture_output=True, check=False)
+    if runner is None or cmd[0] != "pytest":
+        runner = SubprocessCheckRunner()
+    return runner.run(cmd, cwd, limits, junit=junit and cmd[0] == "pytest")
 
 
 def _apply_unified_patch(diff_text: str, workspace: Path) -> int:
-    patched_files = 0
-    lines = diff_text.splitlines()
-    i = 0
-
-    while i < len(lines):
-        line = lines[i]
-        if not line.startswith("--- a/"):
-            i += 1
-            continue
-        i += 1
-        if i >= len(lines) or not lines[i].startswith("+++ b/"):
-            raise ValueError("Malformed unified diff: missing +++ line")
-
-        rel = lines[i].removeprefix("+++ b/").strip()
-        target = (workspace / rel).resolve()
-        workspace_resolved = workspace.resolve()
-        if workspace_resolved not in target.parents and target != workspace_resolved:
-            raise ValueError("Patch writes outside workspace")
-
-        original = target.read_text(encoding="utf-8").splitlines() if target.exists() else []
-        output: list[str] = []
-        src_idx = 0
-        i += 1
-
-        while i < len(lines) and not lines[i].startswith("--- a/"):
-            if not lines[i].startswith("@@"):
-                i += 1
+    return len(apply_patch(diff_text, workspace))
+
+
+class _CheckMemo:
+    # Runs each distinct (post-patch workspace, check spec) once per eval run.
+    # Concurrent tasks with the same key wait for the first one's result.
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._results: dict[str, Future[dict[str, Any]]] = {}
+        self.file_hashes = FileHashMemo()
+
+    def key(self, fixture_name: str, generation: int, workspace: Path, cmd: list[str], limits: CheckLimits) -> str:
+        # Nothing is ignored here: a patch could plant bytecode caches that change behaviour.
+        # generation: of the fixture snapshot the workspace links into. File
+        # digests are memoized by inode, so results from a snapshot later found
+        # modified must not be reused by workspaces of its replacement.
+        tree = hash_tree(workspace, ignored=frozenset(), memo=self.file_hashes)
+        limits_json = json.dumps(limits.to_dict(), sort_keys=True)
+        return hash_parts([fixture_name, str(generation), json.dumps(cmd), limits_json, tree])
+
+    def run(self, key: str, run_check: Callable[[], dict[str, Any]]) -> tuple[dict[str, Any], bool]:
+        with self._lock:
+            future = self._results.get(key)
+            owner = future is None
+            if future is None:
+                future = Future()
+                self._results[key] = future
+        if owner:
+            try:
+                future.set_result(run_check())
+            except BaseException as exc:
+                future.set_exception(exc)
+        return future.result(), not owner
+
+
+def _write_json_atomic(path: Path, data: dict[str, Any]) -> None:
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _classify(returncode: int, limit: str | None) -> str:
+    # The task's "outcome". A SIGKILL we did not send comes from the kernel
+    # OOM killer.
+    if limit in ("wall", "cpu"):
+        return "timeout"
+    if limit == "memory" or (limit is None and returncode == -signal.SIGKILL):
+        return "oom"
+    if limit == "output":
+        return "output_limit"
+    return "passed" if returncode == 0 else "failed"
+
+
+def _check_outcome(proc: subprocess.CompletedProcess[str], blobs: BlobStore) -> dict[str, Any]:
+    limit = getattr(proc, "limit", None)
+    outcome: dict[str, Any] = {
+        "returncode": proc.returncode,
+        "outcome": _classify(proc.returncode, limit),
+        "limit": limit,
+        "tests": getattr(proc, "tests", None),
+    }
+    outcome.update(blobs.externalize("stdout", proc.stdout or ""))
+    outcome.update(blobs.externalize("stderr", proc.stderr or ""))
+    return outcome
+
+
+class _PhaseTimer:
+    # Monotonic per-phase spans for one task, in seconds.
+
+    def __init__(self) -> None:
+        self.spans: dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.spans[name] = self.spans.get(name, 0.0) + time.perf_counter() - start
+
+
+def _failed_record(
+    task: dict[str, Any],
+    patch_error: str | None = None,
+    agent_error: str | None = None,
+    queue_error: str | None = None,
+    select_error: str | None = None,
+) -> dict[str, Any]:
+    # A task whose check never ran. queue_error only appears on tasks a queue
+    # gave up on (see task_queue.TaskQueue), select_error only on tasks whose
+    # check.select is invalid.
+    record: dict[str, Any] = {
+        "id": task["id"],
+        "passed": False,
+        "outcome": "error",
+        "limit": None,
+        "tests": None,
+        "returncode": None,
+        "elapsed_seconds": 0.0,
+        "num_patches": 0,
+        "num_test_runs": 0,
+        "check_cache_hit": False,
+        "patch_error": patch_error,
+        "agent_error": agent_error,
+        "num_selected_tests": None,
+        "stdout": "",
+        "stderr": "",
+    }
+    if queue_error is not None:
+        record["queue_error"] = queue_error
+    if select_error is not None:
+        record["select_error"] = select_error
+    return record
+
+
+def _record_outcome(
+    agent: AgentWorker,
+    task: dict[str, Any],
+    passed: bool,
+    elapsed_seconds: float,
+    patch: str,
+    timeout: float,
+) -> None:
+    # Best effort: an agent that fails to record still gets its result scored.
+    try:
+        agent.record_task_result(task, passed, elapsed_seconds, patch, timeout=timeout)
+    except AgentWorkerError:
+        pass
+
+
+def _attempt_task(
+    task: dict[str, Any],
+    agent: AgentWorker,
+    provisioner: WorkspaceProvisioner,
+    check_runner: Any,
+    blobs: BlobStore,
+    check_memo: _CheckMemo | None,
+    agent_timeout: float,
+    test_index: TestIndex | None,
+    check_limits: CheckLimits,
+) -> tuple[dict[str, Any], str | None, bool]:
+    # One run of a task, the agent's patch (None if it produced none), and
+    # whether its workspace stayed true to the fixture (see WorkspaceProvisioner.release).
+    start = time.perf_counter()
+    timer = _PhaseTimer()
+    fixture_name = task["fixture"]
+    check = task.get("check", {})
+    if check.get("type") != "pytest":
+        raise ValueError("Only pytest checks are supported")
+    limits = check_limits.merged(check.get("limits"))
+    tmp = tempfile.TemporaryDirectory(prefix=f"agent_lab_{task['id']}_")
+    snapshot = None
+    try:
+        workspace = Path(tmp.name) / fixture_name
+        with timer.phase("provision"):
+            snapshot = provisioner.materialize(fixture_name, workspace)
+
+        patch: str | None = None
+        try:
+            with timer.phase("check"):
+                # Up front: a task with an invalid selection never reaches the agent.
+                selected = test_index.select(task) if test_index is not None else None
+            with timer.phase("generate"):
+                patch = agent.generate_task_patch(task, workspace, timeout=agent_timeout)
+            with timer.phase("apply"):
+                num_patches = _apply_unified_patch(patch, workspace)
+        except SelectionError as exc:
+            result = _failed_record(task, select_error=str(exc))
+        except AgentWorkerError as exc:
+            # A crashed, hung or raising agent, or a patch that does not apply,
+            # fails only this task; the check is not run.
+            result = _failed_record(task, agent_error=str(exc))
+        except PatchError as exc:
+            result = _failed_record(task, patch_error=str(exc))
+        else:
+            with timer.phase("check"):
+                cmd = ["pytest", *check.get("args", ["-q"])]
+                if selected:
+                    cmd.extend(selected)
+
+                def run_check() -> dict[str, Any]:
+                    proc = _run_command(cmd, cwd=workspace, runner=check_runner, limits=limits, junit=True)
+                    return _check_outcome(proc, blobs)
+
+                if check_memo is None:
+                    outcome, cache_hit = run_check(), False
+                else:
+                    generation = snapshot.generation if snapshot is not None else 0
+                    key = check_memo.key(fixture_name, generation, workspace, cmd, limits)
+                    outcome, cache_hit = check_memo.run(key, run_check)
+            result = {
+                "id": task["id"],
+                "passed": outcome["outcome"] == "passed",
+                "outcome": outcome["outcome"],
+                "limit": outcome["limit"],
+                "tests": outcome["tests"],
+                "returncode": outcome["returncode"],
+                "elapsed_seconds": 0.0,
+                "num_patches": num_patches,
+                "num_test_runs": 0 if cache_hit else 1,
+                "check_cache_hit": cache_hit,
+                "patch_error": None,
+                "agent_error": None,
+                "num_selected_tests": len(selected) if selected else None,
+            }
+            result.update((k, v) for k, v in outcome.items() if k not in ("returncode", "outcome", "limit", "tests"))
+    finally:
+        with timer.phase("teardown"):
+            intact = provisioner.release(fixture_name, snapshot)
+            tmp.cleanup()
+    result["elapsed_seconds"] = time.perf_counter() - start
+    result["phases"] = timer.spans
+    return result, patch, intact
+
+
+def _run_task(
+    task: dict[str, Any],
+    agent: AgentWorker,
+    provisioner: WorkspaceProvisioner,
+    check_runner: Any,
+    blobs: BlobStore,
+    check_memo: _CheckMemo | None = None,
+    agent_timeout: float = DEFAULT_AGENT_TIMEOUT,
+    test_index: TestIndex | None = None,
+    check_limits: CheckLimits = DEFAULT_CHECK_LIMITS,
+) -> dict[str, Any]:
+    # Phases: provision (workspace), generate (agent), apply (patch), check
+    # (test selection, done before generate, and pytest, or waiting on a
+    # deduplicated check) and teardown (integrity check and workspace removal).
+    # Phases a task never reached are absent from its "phases". A task whose
+    # linked workspace overlapped a write into the fixture snapshot is re-run on
+    # a fresh snapshot; if that happens on every attempt it fails with
+    # workspace_error.
+    # The outcome of a generated patch is fed back to the agent
+    # (record_task_result) for its task history, once, from the attempt whose
+    # result is returned; a run invalidated by the snapshot check is not.
+    for _ in range(WORKSPACE_ATTEMPTS):
+        result, patch, intact = _attempt_task(
+            task, agent, provisioner, check_runner, blobs, check_memo, agent_timeout, test_index, check_limits
+        )
+        if intact:
+            if patch is not None:
+                _record_outcome(agent, task, result["passed"], result["elapsed_seconds"], patch, agent_timeout)
+            return result
+    result.update(
+        passed=False,
+        outcome="error",
+        workspace_error="The fixture snapshot was modified through a workspace link while this task ran",
+    )
+    return result
+
+
+class TaskHarness:
+    # Everything needed to run single tasks for one agent: its worker process,
+    # fixture workspaces, the check runner, check dedupe and the test index.
+    # Used by run_evals and by queue workers.
+
+    def __init__(
+        self,
+        agent_dir: Path,
+        output_dir: Path,
+        fixtures_root: Path = DEFAULT_FIXTURES_ROOT,
+        workers: int = 1,
+        workspace_mode: str = "auto",
+        check_runner: str = "subprocess",
+        dedupe_checks: bool = True,
+        agent_options: dict[str, Any] | None = None,
+        max_inline_output: int = DEFAULT_MAX_INLINE_BYTES,
+        agent_timeout: float = DEFAULT_AGENT_TIMEOUT,
+        agent_pool: AgentWorkerPool | None = None,
+        check_limits: CheckLimits = DEFAULT_CHECK_LIMITS,
+        select_tests: str | None = None,
+        warm_runner: CheckRunner | None = None,
+    ) -> None:
+        self._own_pool = agent_pool is None
+        self._pool = AgentWorkerPool(options=agent_options) if agent_pool is None else agent_pool
+        self._agent = self._pool.get(agent_dir)
+        self._provisioner = WorkspaceProvisioner(fixtures_root, mode=workspace_mode)
+        self._own_runner = warm_runner is None
+        self._runner = make_check_runner(check_runner, size=workers) if warm_runner is None else warm_runner
+        self._check_memo = _CheckMemo() if dedupe_checks else None
+        self._blobs = BlobStore(output_dir, max_inline_bytes=max_inline_output)
+        self._test_index = TestIndex(self._collect_tests, default_select=select_tests)
+        self._agent_timeout = agent_timeout
+        self._check_limits = check_limits
+
+    def _collect_tests(self, fixture_name: str) -> list[str]:
+        # Collected from a pristine workspace; an index that fails to collect is
+        # empty, so goal selection falls back to the whole suite.
+        with tempfile.TemporaryDirectory(prefix=f"agent_lab_collect_{fixture_name}_") as tmp:
+            workspace = Path(tmp) / fixture_name
+            snapshot = self._provisioner.materialize(fixture_name, workspace)
+            try:
+                proc = _run_command(COLLECT_COMMAND, cwd=workspace, runner=self._runner, limits=self._check_limits)
+            finally:
+                self._provisioner.release(fixture_name, snapshot)
+        return parse_collected(proc.stdout or "") if proc.returncode == 0 else []
+
+    def run_task(self, task: dict[str, Any]) -> dict[str, Any]:
+        return _run_task(
+            task,
+            self._agent,
+            self._provisioner,
+            self._runner,
+            self._blobs,
+            self._check_memo,
+            self._agent_timeout,
+            self._test_index,
+            self._check_limits,
+        )
+
+    def close(self) -> None:
+        if self._own_runner:
+            self._runner.close()
+        self._provisioner.close()
+        if self._own_pool:
+            self._pool.close()
+
+    def __enter__(self) -> "TaskHarness":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+def _iter_results_in_order(
+    tasks: Iterable[dict[str, Any]],
+    run_task: Callable[[dict[str, Any]], dict[str, Any]],
+    workers: int,
+) -> Iterator[dict[str, Any]]:
+    if workers <= 1:
+        for task in tasks:
+            yield run_task(task)
+        return
+
+    # Keep a bounded window of in-flight tasks and yield strictly in task order,
+    # so trace.jsonl and results.json are identical to a serial run.
+    pending_tasks = iter(tasks)
+    in_flight: deque[Future[dict[str, Any]]] = deque()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="agent_lab_eval") as pool:
+        try:
+            for task in pending_tasks:
+                in_flight.append(pool.submit(run_task, task))
+                if len(in_flight) >= 2 * workers:
+                    break
+            while in_flight:
+                result = in_flight.popleft().result()
+                next_task = next(pending_tasks, None)
+                if next_task is not None:
+                    in_flight.append(pool.submit(run_task, next_task))
+                yield result
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+
+def _iter_local_results(
+    tasks: list[dict[str, Any]],
+    workers: int,
+    make_harness: Callable[[], TaskHarness],
+) -> Iterator[dict[str, Any]]:
+    # The harness is only built once the first result is requested.
+    with make_harness() as harness:
+        yield from _iter_results_in_order(tasks, harness.run_task, workers)
+
+
+def _iter_queue_results(
+    tasks: list[dict[str, Any]],
+    queue: TaskQueue,
+    config: dict[str, Any],
+    local_workers: int,
+    poll_seconds: float = QUEUE_POLL_SECONDS,
+) -> Iterator[dict[str, Any]]:
+    # Posts the tasks, starts `local_workers` queue worker processes (other
+    # hosts may run more against the same file), and yields results in task
+    # order as workers finish them. A local worker that exits while work
+    # remains is replaced, up to max_attempts times per worker slot.
+    queue.post(tasks, config)
+    cmd = [sys.executable, "-m", "agent_lab.evals.queue_worker", str(queue.path)]
+
+    def spawn() -> subprocess.Popen[bytes]:
+        return subprocess.Popen(cmd, cwd=str(_REPO_ROOT), stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL)
+
+    procs = [spawn() for _ in range(local_workers)]
+    respawns_left = local_workers * config["max_attempts"]
+    last_seq = -1
+    try:
+        while last_seq < len(tasks) - 1:
+            progressed = False
+            for seq, state, result, error in queue.finished_after(last_seq):
+                if seq != last_seq + 1:
+                    break
+                last_seq = seq
+                progressed = True
+                if state == "done" and result is not None:
+                    yield result
+                else:
+                    yield _failed_record(tasks[seq], queue_error=error or "Task failed in the queue")
+            if progressed:
                 continue
-            header = lines[i]
-            match = __import__('re').match(r"@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@", header)
-            if not match:
-                raise ValueError(f"Malformed hunk header: {header}")
-            old_start = int(match.group(1))
-
-            while src_idx < old_start - 1 and src_idx < len(original):
-                output.append(original[src_idx])
-                src_idx += 1
-
-            i += 1
-            while i < len(lines) and not lines[i].startswith("@@") and not lines[i].startswith("--- a/"):
-                hline = lines[i]
-                if hline.startswith("+"):
-                    output.append(hline[1:])
-                elif hline.startswith("-"):
-                    src_idx += 1
-                elif hline.startswith(" "):
-                    if src_idx < len(original):
-                        output.append(original[src_idx])
-                        src_idx += 1
-                i += 1
-
-        while src_idx < len(original):
-            output.append(original[src_idx])
-            src_idx += 1
-
-        target.parent.mkdir(parents=True, exist_ok=True)
-        target.write_text("\n".join(output) + "\n", encoding="utf-8")
-        patched_files += 1
-
-    return patched_files
-
-
-def _load_agent_module(agent_dir: Path):
-    agent_file = agent_dir / "agent.py"
-    sys.path.insert(0, str(agent_dir.resolve()))
-    spec = importlib.util.spec_from_file_location("candidate_agent", agent_file)
-    if spec is None or spec.loader is None:
-        raise RuntimeError(f"Unable to load agent module from {agent_file}")
-    module = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(module)
-    return module
-
-
-def run_evals(tasks_path: Path, agent_dir: Path, output_dir: Path) -> dict[str, Any]:
+            if not queue.unfinished():
+                # The last tasks may have finished since finished_after ran.
+                finished = queue.finished_after(last_seq)
+                if finished and finished[0][0] == last_seq + 1:
+                    continue
+                raise RuntimeError(f"Queue {queue.path} has no work left but results are missing")
+            for k, proc in enumerate(procs):
+                if proc.poll() is not None and respawns_left > 0:
+                    respawns_left -= 1
+                    procs[k] = spawn()
+            time.sleep(poll_seconds)
+    finally:
+        queue.cancel_pending()
+        for proc in procs:
+            try:
+                proc.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+
+
+def run_evals(
+    tasks_path: Path,
+    agent_dir: Path,
+    output_dir: Path,
+    workers: int = 1,
+    cache_dir: Path | None = None,
+    workspace_mode: str = "auto",
+    check_runner: str = "subprocess",
+    dedupe_checks: bool = True,
+    agent_options: dict[str, Any] | None = None,
+    max_inline_output: int = DEFAULT_MAX_INLINE_BYTES,
+    task_order: list[str] | None = None,
+    stop_when: Callable[[list[dict[str, Any]], int], bool] | None = None,
+    agent_pool: AgentWorkerPool | None = None,
+    agent_timeout: float = DEFAULT_AGENT_TIMEOUT,
+    fixtures_root: Path | None = None,
+    shard: tuple[int, int] | None = None,
+    queue_path: Path | None = None,
+    queue_workers: int = 1,
+    index_path: Path | None = None,
+    check_limits: CheckLimits = DEFAULT_CHECK_LIMITS,
+    select_tests: str | None = None,
+    warm_runner: CheckRunner | None = None,
+) -> dict[str, Any]:
+    # shard: (i, n) runs only the tasks sharding.shard_of assigns to shard i;
+    # merge the per-shard outputs with `python -m agent_lab.evals.sharding`.
+    # task_order: task ids to run first, in that order; other tasks follow in file order.
+    # stop_when(completed_results, remaining): checked after every task, in order;
+    # returning True skips the remaining tasks (the result then has "stopped_early").
+    # agent_pool: shared worker processes (built with the same agent_options); a
+    # private pool is used and stopped when none is given.
+    # warm_runner: a check runner the caller keeps across runs (make_check_runner),
+    # so forkserver workers stay warm; it replaces check_runner and is left open.
+    # queue_path: post the tasks to this SQLite queue instead of running them
+    # here; `queue_workers` local queue worker processes (each running up to
+    # `workers` tasks at once) are started, and workers on other hosts sharing
+    # the file may join. agent_pool and warm_runner are not used in this mode.
+    # index_path: add the finished eval (cached or not) to this results index.
+    # check_limits: defaults for every check; a task's check "limits" override them.
+    # select_tests: check.select mode (see schema.md) for tasks that set none;
+    # None runs their whole suite.
+    if workers < 1:
+        raise ValueError("workers must be >= 1")
     output_dir.mkdir(parents=True, exist_ok=True)
-    fixtures_root = Path(__file__).resolve().parent / "fixtures"
+    fixtures_root = fixtures_root or DEFAULT_FIXTURES_ROOT
     tasks = _load_tasks(tasks_path)
-    agent_module = _load_agent_module(agent_dir)
-
+    if shard is not None:
+        tasks = select_shard(tasks, shard)
+    if task_order:
+        rank = {task_id: i for i, task_id in enumerate(task_order)}
+        tasks = sorted(tasks, key=lambda t: rank.get(t["id"], len(rank)))
+
+    # An agent with a memory log may replay remembered patches, so its results
+    # depend on a log every run appends to (and a live worker may still hold
+    # unflushed records): such runs are neither served from nor stored in the cache.
+    remembers = bool((agent_options or {}).get("memory_path"))
+    cache = ResultCache(cache_dir) if cache_dir is not None and not remembers else None
+    cache_key = ""
+    if cache is not None:
+        cache_key = eval_cache_key(
+            agent_dir,
+            tasks_path,
+            fixtures_root,
+            tasks,
+            options={
+                "agent": agent_options,
+                "shard": shard,
+                "check_limits": check_limits.to_dict(),
+                "select_tests": select_tests,
+                # Results keep run order, so a reordered run is its own entry.
+                "task_order": [task["id"] for task in tasks] if task_order else None,
+            },
+        )
+        cached = cache.restore(cache_key, output_dir)
+        if cached is not None:
+            cached["cache_hit"] = True
+            if index_path is not None:
+                ResultsIndex(index_path).record_eval(output_dir, cached, agent_tree=hash_tree(agent_dir))
+            return cached
+
+    if queue_path is None:
+        results_iter = _iter_local_results(
+            tasks,
+            workers,
+            lambda: TaskHarness(
+                agent_dir,
+                output_dir,
+                fixtures_root=fixtures_root,
+                workers=workers,
+                workspace_mode=workspace_mode,
+                check_runner=check_runner,
+                dedupe_checks=dedupe_checks,
+                agent_options=agent_options,
+                max_inline_output=max_inline_output,
+                agent_timeout=agent_timeout,
+                agent_pool=agent_pool,
+                check_limits=check_limits,
+                select_tests=select_tests,
+                warm_runner=warm_runner,
+            ),
+        )
+    else:
+        # Everything a worker on any host needs to rebuild the same TaskHarness.
+        config = {
+            "agent_dir": str(agent_dir.resolve()),
+            "output_dir": str(output_dir.resolve()),
+            "fixtures_root": str(fixtures_root.resolve()),
+            "workers": workers,
+            "workspace_mode": workspace_mode,
+            "check_runner": check_runner,
+            "dedupe_checks": dedupe_checks,
+            "agent_options": agent_options,
+            "max_inline_output": max_inline_output,
+            "agent_timeout": agent_timeout,
+            "check_limits": check_limits.to_dict(),
+            "select_tests": select_tests,
+            "lease_seconds": DEFAULT_LEASE_SECONDS,
+            "max_attempts": DEFAULT_MAX_ATTEMPTS,
+        }
+        results_iter = _iter_queue_results(tasks, TaskQueue(queue_path), config, queue_workers)
+
+    # trace.jsonl holds the full record for each task as soon as it finishes, in
+    # task order; results.json only keeps the compact record (no inline output),
+    # and progress.json is a running summary that can be read mid-run.
     task_results: list[dict[str, Any]] = []
+    score = 0
+    stopped_early = False
     trace_path = output_dir / "trace.jsonl"
-    with trace_path.open("w", encoding="utf-8") as trace_file:
-        for task in tasks:
-            start = time.time()
-            fixture_name = task["fixture"]
-            fixture_source = fixtures_root / fixture_name
-            with tempfile.TemporaryDirectory(prefix=f"agent_lab_{task['id']}_") as tmp:
-                workspace = Path(tmp) / fixture_name
-                shutil.copytree(fixture_source, workspace)
-
-                patch = agent_module.generate_task_patch(task, workspace)
-                num_patches = _apply_unified_patch(patch, workspace)
-
-                check = task.get("check", {})
-                if check.get("type") != "pytest":
-                    raise ValueError("Only pytest checks are supported")
-                cmd = ["pytest", *check.get("args", ["-q"])]
-                proc = _run_command(cmd, cwd=workspace)
-                passed = proc.returncode == 0
-
-                elapsed = time.time() - start
-                task_result = {
-                    "id": task["id"],
-                    "passed": passed,
-                    "returncode": proc.returncode,
-                    "elapsed_seconds": elapsed,
-                    "num_patches": num_patches,
-                    "num_test_runs": 1,
-                    "stdout": proc.stdout,
-                    "stderr": proc.stderr,
-                }
-                task_results.append(task_result)
+    progress_path = output_dir / "progress.json"
+    _write_json_atomic(progress_path, {"completed": 0, "total": len(tasks), "score": 0, "done": False})
+    try:
+        with trace_path.open("w", encoding="utf-8") as trace_file:
+            for task, task_result in zip(tasks, results_iter):
                 trace_file.write(json.dumps({"task": task, "result": task_result}) + "\n")
-
-    results = {
+                trace_file.flush()
+                task_results.append({k: v for k, v in task_result.items() if k not in _INLINE_OUTPUT_KEYS})
+                score += 1 if task_result["passed"] else 0
+                _write_json_atomic(
+                    progress_path,
+                    {"completed": len(task_results), "total": len(tasks), "score": score, "done": False},
+                )
+                remaining = len(tasks) - len(task_results)
+                if remaining and stop_when is not None and stop_when(task_results, remaining):
+                    stopped_early = True
+                    break
+    finally:
+        results_iter.close()
+
+    results: dict[str, Any] = {
         "tasks": task_results,
-        "score": sum(1 for t in task_results if t["passed"]),
+        "score": score,
         "total": len(task_results),
     }
+    if shard is not None:
+        results["shard"] = {"index": shard[0], "count": shard[1]}
+    if stopped_early:
+        results["stopped_early"] = True
+        results["skipped"] = [t["id"] for t in tasks[len(task_results) :]]
     (output_dir / "results.json").write_text(json.dumps(results, indent=2), encoding="utf-8")
+    _write_json_atomic(progress_path, {"completed": len(task_results), "total": len(tasks), "score": score, "done": True})
+    if cache is not None and not stopped_early:
+        cache.store(cache_key, output_dir)
+    if index_path is not None:
+        ResultsIndex(index_path).record_eval(output_dir, results, agent_tree=hash_tree(agent_dir))
     return results
 
 
@@ -163,13 +686,167 @@ def main() -> None:
     parser = argparse.ArgumentParser(description="Run local JSONL eval tasks")
     parser.add_argument("--tasks", default=str(Path(__file__).resolve().parent / "tasks.jsonl"))
     parser.add_argument("--agent-dir", required=True)
+    parser.add_argument(
+        "--fixtures-root",
+        default=str(DEFAULT_FIXTURES_ROOT),
+        help="Directory holding the fixtures tasks refer to by name.",
+    )
     parser.add_argument("--output-dir", required=True)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of tasks to run concurrently, each in its own workspace.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help="Reuse stored results when the agent tree, tasks and fixtures are unchanged.",
+    )
+    parser.add_argument(
+        "--workspace-mode",
+        choices=WORKSPACE_MODES,
+        default="auto",
+        help=(
+            "Build task workspaces from links into a read-only fixture snapshot, or full copies. "
+            "'auto' uses reflinks where supported and copies otherwise; 'link' also falls back to hardlinks."
+        ),
+    )
+    parser.add_argument(
+        "--check-runner",
+        choices=CHECK_RUNNERS,
+        default="subprocess",
+        help="'forkserver' forks each pytest check from warm workers with pytest pre-imported.",
+    )
+    parser.add_argument(
+        "--no-dedupe-checks",
+        action="store_true",
+        help="Run every task's check even when its patched workspace matches an earlier task.",
+    )
+    parser.add_argument(
+        "--llm-cache",
+        choices=LLM_CACHE_MODES,
+        default="off",
+        help="LLM response cache mode; 'replay' serves only cached responses and never calls the API.",
+    )
+    parser.add_argument("--llm-cache-dir", default=None)
+    parser.add_argument(
+        "--llm-capabilities-path",
+        default=None,
+        help="JSON file persisting which models and reasoning efforts the API accepted.",
+    )
+    parser.add_argument(
+        "--agent-memory",
+        default=None,
+        help="Task outcome log the agent reads and appends to (see child_agent/memory.py); shareable across runs.",
+    )
+    parser.add_argument(
+        "--max-inline-output",
+        type=int,
+        default=DEFAULT_MAX_INLINE_BYTES,
+        help="Bytes of stdout/stderr kept inline per task; longer output goes to compressed blobs.",
+    )
+    parser.add_argument(
+        "--agent-timeout",
+        type=float,
+        default=DEFAULT_AGENT_TIMEOUT,
+        help="Seconds to wait for the agent worker to produce a task patch before failing the task.",
+    )
+    parser.add_argument(
+        "--check-limit",
+        action="append",
+        default=[],
+        metavar="NAME=VALUE",
+        help=(
+            "Default limit for every check (wall_seconds, cpu_seconds, memory_mb, output_bytes; 'none' disables);"
+            " repeatable. Tasks override them with check.limits."
+        ),
+    )
+    parser.add_argument(
+        "--select-tests",
+        choices=SELECT_MODES,
+        default=None,
+        help="Run only the tests covering each task's goal.target, for tasks whose check sets no select.",
+    )
+    parser.add_argument(
+        "--shard",
+        default=None,
+        help="Run only shard i of n (e.g. 0/4), assigned by a stable hash of the task id.",
+    )
+    parser.add_argument(
+        "--queue",
+        nargs="?",
+        const="",
+        default=None,
+        help="Post tasks to a SQLite queue (default <output-dir>/queue.sqlite) and run them in queue workers.",
+    )
+    parser.add_argument(
+        "--index",
+        default=None,
+        help="Results index to add this eval to (e.g. agent_lab/logs/index.sqlite; see evals.results_index).",
+    )
+    parser.add_argument(
+        "--queue-workers",
+        type=int,
+        default=1,
+        help="Local queue worker processes to start with --queue; 0 leaves the work to external workers.",
+    )
     args = parser.parse_args()
 
+    queue_path = None
+    if args.queue is not None:
+        queue_path = Path(args.queue) if args.queue else Path(args.output_dir) / "queue.sqlite"
+
+    shard = None
+    if args.shard:
+        try:
+            shard = parse_shard(args.shard)
+        except ValueError as exc:
+            parser.error(str(exc))
+
+    limit_overrides: dict[str, Any] = {}
+    for spec in args.check_limit:
+        name, _, value = spec.partition("=")
+        try:
+            limit_overrides[name] = None if value == "none" else (int if name == "output_bytes" else float)(value)
+        except ValueError:
+            parser.error(f"Bad --check-limit value: {spec!r}")
+    try:
+        check_limits = DEFAULT_CHECK_LIMITS.merged(limit_overrides)
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    agent_options: dict[str, Any] = {}
+    if args.llm_cache != "off":
+        if not args.llm_cache_dir:
+            parser.error("--llm-cache-dir is required with --llm-cache")
+        agent_options.update(
+            {"llm_cache_mode": args.llm_cache, "llm_cache_dir": str(Path(args.llm_cache_dir).resolve())}
+        )
+    if args.llm_capabilities_path:
+        agent_options["llm_capabilities_path"] = str(Path(args.llm_capabilities_path).resolve())
+    if args.agent_memory:
+        agent_options["memory_path"] = str(Path(args.agent_memory).resolve())
+
     results = run_evals(
         tasks_path=Path(args.tasks),
         agent_dir=Path(args.agent_dir),
         output_dir=Path(args.output_dir),
+        workers=args.workers,
+        cache_dir=Path(args.cache_dir) if args.cache_dir else None,
+        workspace_mode=args.workspace_mode,
+        check_runner=args.check_runner,
+        dedupe_checks=not args.no_dedupe_checks,
+        agent_options=agent_options or None,
+        max_inline_output=args.max_inline_output,
+        agent_timeout=args.agent_timeout,
+        fixtures_root=Path(args.fixtures_root),
+        shard=shard,
+        queue_path=queue_path,
+        queue_workers=args.queue_workers,
+        index_path=Path(args.index) if args.index else None,
+        check_limits=check_limits,
+        select_tests=args.select_tests,
     )
     print(json.dumps(results, indent=2))
 
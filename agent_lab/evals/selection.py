@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import re
+import threading
+from typing import Any, Callable
+
+COLLECT_COMMAND = ["pytest", "--collect-only", "-q"]
+SELECT_MODES = ("goal",)
+
+# Node ids the check allowlist accepts after `pytest -q`: a relative .py path
+# with no ".." parts, optional ::Class::function parts, and an optional simple
+# parametrize id. Anything that could be read as a pytest option is rejected.
+_NODE_ID = re.compile(r"^(?!-)(?!/)[\w.-]+(?:/[\w.-]+)*\.py(?:::\w+)*(?:\[[\w.,=+-]*\])?$")
+
+
+class SelectionError(ValueError):
+    pass
+
+
+def is_node_id(arg: str) -> bool:
+    return bool(_NODE_ID.match(arg)) and ".." not in arg.split("::", 1)[0].split("/")
+
+
+def parse_collected(stdout: str) -> list[str]:
+    # `pytest --collect-only -q` prints one node id per line, then a summary.
+    return [line.strip() for line in stdout.splitlines() if "::" in line and not line.startswith(" ")]
+
+
+def nodes_for_target(nodes: list[str], target: str) -> list[str]:
+    # A goal target `foo` covers test functions named `test_foo` or `test_foo_*`.
+    # Parametrize ids are dropped, so the selection runs every case of a test.
+    prefix = f"test_{target}"
+    selected: list[str] = []
+    for node in nodes:
+        base = node.split("[", 1)[0]
+        name = base.rsplit("::", 1)[-1]
+        if (name == prefix or name.startswith(prefix + "_")) and base not in selected and is_node_id(base):
+            selected.append(base)
+    return selected
+
+
+class TestIndex:
+    # Collected node ids per fixture, gathered once per eval run on first use.
+    # default_select: the select mode for tasks whose check has none of its own.
+
+    def __init__(self, collect: Callable[[str], list[str]], default_select: str | None = None) -> None:
+        if default_select is not None and default_select not in SELECT_MODES:
+            raise ValueError(f"Unknown check select mode: {default_select!r}")
+        self._collect = collect
+        self.default_select = default_select
+        self._lock = threading.Lock()
+        self._nodes: dict[str, list[str]] = {}
+
+    def nodes(self, fixture_name: str) -> list[str]:
+        with self._lock:
+            if fixture_name not in self._nodes:
+                self._nodes[fixture_name] = self._collect(fixture_name)
+            return self._nodes[fixture_name]
+
+    def select(self, task: dict[str, Any]) -> list[str] | None:
+        # Node ids to pass to pytest, or None to run the whole suite.
+        select = task.get("check", {}).get("select", self.default_select)
+        if select is None:
+            return None
+        if isinstance(select, list):
+            nodes = [str(node) for node in select]
+            bad = [node for node in nodes if not is_node_id(node)]
+            if bad:
+                raise SelectionError(f"Not a test node id: {bad[0]!r}")
+            return nodes or None
+        if select not in SELECT_MODES:
+            raise SelectionError(f"Unknown check select mode: {select!r}")
+        target = task.get("goal", {}).get("target")
+        if not target or target == "all":
+            return None
+        # A target no collected test covers falls back to the whole suite.
+        return nodes_for_target(self.nodes(task["fixture"]), str(target)) or None
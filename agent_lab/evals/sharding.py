@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import heapq
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Iterator
+
+
+def parse_shard(spec: str) -> tuple[int, int]:
+    # "i/n" with 0 <= i < n.
+    try:
+        index_text, count_text = spec.split("/", 1)
+        index, count = int(index_text), int(count_text)
+    except ValueError:
+        raise ValueError(f"Shard must look like i/n, got {spec!r}") from None
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Shard index must satisfy 0 <= i < n, got {spec!r}")
+    return index, count
+
+
+def shard_of(task_id: str, count: int) -> int:
+    # Stable across hosts, Python versions and task file reordering.
+    return int(hashlib.sha256(task_id.encode("utf-8")).hexdigest()[:16], 16) % count
+
+
+def select_shard(tasks: list[dict[str, Any]], shard: tuple[int, int]) -> list[dict[str, Any]]:
+    index, count = shard
+    return [task for task in tasks if shard_of(str(task["id"]), count) == index]
+
+
+def _iter_trace(path: Path, rank: dict[str, int]) -> Iterator[tuple[int, str]]:
+    with path.open("r", encoding="utf-8") as fh:
+        for line in fh:
+            if line.strip():
+                task_id = str(json.loads(line)["task"]["id"])
+                yield rank.get(task_id, len(rank)), line if line.endswith("\n") else line + "\n"
+
+
+def _copy_blobs(source: Path, target: Path) -> None:
+    # Blobs are content-addressed, so shards never disagree about a name.
+    for path in source.rglob("*.gz"):
+        dest = target / path.relative_to(source)
+        if dest.exists():
+            continue
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.link(path, dest)
+        except OSError:
+            shutil.copy2(path, dest)
+
+
+def merge_results(shard_dirs: list[Path], output_dir: Path, task_ids: list[str] | None = None) -> dict[str, Any]:
+    # Combines per-shard run_evals outputs into one results.json / trace.jsonl /
+    # blobs set, ordered like `task_ids` (the tasks file) when given. Each shard
+    # index must appear exactly once.
+    shards = [
+        (shard_dir, json.loads((shard_dir / "results.json").read_text(encoding="utf-8"))) for shard_dir in shard_dirs
+    ]
+    # Unsharded outputs count as shard 0/1.
+    specs = [results.get("shard", {"index": 0, "count": 1}) for _, results in shards]
+    counts = {spec["count"] for spec in specs}
+    if len(counts) != 1:
+        raise ValueError(f"Shards come from different shard counts: {sorted(counts)}")
+    count = counts.pop()
+    indexes = sorted(spec["index"] for spec in specs)
+    if indexes != list(range(count)):
+        raise ValueError(f"Expected shards 0..{count - 1} exactly once, got {indexes}")
+
+    rank = {task_id: i for i, task_id in enumerate(task_ids or [])}
+    tasks: list[dict[str, Any]] = []
+    skipped: list[str] = []
+    for _, results in shards:
+        tasks.extend(results.get("tasks", []))
+        skipped.extend(results.get("skipped", []))
+    seen: set[str] = set()
+    for task in tasks:
+        if task["id"] in seen:
+            raise ValueError(f"Task {task['id']} appears in more than one shard")
+        seen.add(task["id"])
+    tasks.sort(key=lambda task: rank.get(str(task["id"]), len(rank)))
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    # Each shard's trace is already in task order, so a k-way merge streams it.
+    with (output_dir / "trace.jsonl").open("w", encoding="utf-8") as out:
+        streams = [_iter_trace(shard_dir / "trace.jsonl", rank) for shard_dir, _ in shards]
+        for _, line in heapq.merge(*streams, key=lambda item: item[0]):
+            out.write(line)
+    for shard_dir, _ in shards:
+        if (shard_dir / "blobs").is_dir():
+            _copy_blobs(shard_dir / "blobs", output_dir / "blobs")
+
+    score = sum(1 for task in tasks if task.get("passed", False))
+    merged: dict[str, Any] = {"tasks": tasks, "score": score, "total": len(tasks), "shards": count}
+    if skipped:
+        merged["stopped_early"] = True
+        merged["skipped"] = skipped
+    (output_dir / "results.json").write_text(json.dumps(merged, indent=2), encoding="utf-8")
+    progress = {"completed": len(tasks), "total": len(tasks) + len(skipped), "score": score, "done": True}
+    (output_dir / "progress.json").write_text(json.dumps(progress, indent=2), encoding="utf-8")
+    return merged
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Merge per-shard run_evals outputs")
+    parser.add_argument("shard_dirs", nargs="+", help="Output directories of `run_evals --shard i/n`.")
+    parser.add_argument("--output-dir", required=True)
+    parser.add_argument(
+        "--tasks",
+        default=str(Path(__file__).resolve().parent / "tasks.jsonl"),
+        help="Tasks file the shards ran; the merged output follows its order.",
+    )
+    args = parser.parse_args()
+
+    task_ids = []
+    tasks_path = Path(args.tasks)
+    if tasks_path.exists():
+        for line in tasks_path.read_text(encoding="utf-8").splitlines():
+            if line.strip():
+                task_ids.append(str(json.loads(line)["id"]))
+    merged = merge_results([Path(d) for d in args.shard_dirs], Path(args.output_dir), task_ids=task_ids)
+    print(json.dumps({k: v for k, v in merged.items() if k != "tasks"}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import argparse
+import json
+import random
+from dataclasses import dataclass
+from pathlib import Path
+
+FIXTURE_NAME = "synthetic"
+
+# Deterministic stand-in for the child agent: every synthetic task carries its
+# reference patch, so benchmarks measure the harness without any network.
+_BENCH_AGENT = '''from __future__ import annotations
+
+from pathlib import Path
+from typing import Any
+
+
+def generate_task_patch(task: dict[str, Any], workspace_path: Path) -> str:
+    return task["bench"]["patch"]
+
+
+def self_improve(candidate_workspace: Path, objective: str) -> bool:
+    return False
+'''
+
+_CONFTEST = '''import sys
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+sys.path.insert(0, str(SRC))
+'''
+
+_PYPROJECT = '''[project]
+name = "synthetic-fixture"
+version = "0.1.0"
+requires-python = ">=3.11"
+
+[tool.pytest.ini_options]
+testpaths = ["tests"]
+'''
+
+
+@dataclass(frozen=True)
+class SuiteSpec:
+    files: int = 20
+    functions_per_file: int = 10
+    lines_per_file: int = 300
+    patch_lines: int = 4
+    tasks: int = 50
+    seed: int = 0
+
+    @property
+    def num_tests(self) -> int:
+        return self.files * self.functions_per_file
+
+
+def _function_name(f: int, j: int) -> str:
+    return f"f_{f:04d}_{j:03d}"
+
+
+def _module_lines(f: int, spec: SuiteSpec, broken: set[str]) -> tuple[list[str], dict[str, int]]:
+    # Each function adds 1..patch_lines to its argument one line at a time; a
+    # broken function subtracts instead. Returns the lines and, per function,
+    # the index of its first changeable line.
+    lines: list[str] = []
+    body_start: dict[str, int] = {}
+    for j in range(spec.functions_per_file):
+        name = _function_name(f, j)
+        op = "-" if name in broken else "+"
+        lines.append(f"def {name}(x):")
+        lines.append("    acc = x")
+        body_start[name] = len(lines)
+        lines.extend(f"    acc = acc {op} {n}" for n in range(1, spec.patch_lines + 1))
+        lines.append("    return acc")
+        lines.extend(["", ""])
+    lines.extend(f"_PAD_{n:06d} = {n}" for n in range(max(spec.lines_per_file - len(lines), 0)))
+    return lines, body_start
+
+
+def _test_lines(f: int, spec: SuiteSpec) -> list[str]:
+    names = [_function_name(f, j) for j in range(spec.functions_per_file)]
+    expected = spec.patch_lines * (spec.patch_lines + 1) // 2
+    lines = [f"from synthetic.mod_{f:04d} import {', '.join(names)}", "", ""]
+    for name in names:
+        lines.extend([f"def test_{name}():", f"    assert {name}(0) == {expected}", "", ""])
+    return lines
+
+
+def _fix_patch(rel: str, lines: list[str], start: int, patch_lines: int) -> str:
+    before = lines[max(start - 3, 0) : start]
+    changed = lines[start : start + patch_lines]
+    after = lines[start + patch_lines : start + patch_lines + 3]
+    first = start - len(before) + 1
+    count = len(before) + len(changed) + len(after)
+    out = [f"--- a/{rel}", f"+++ b/{rel}", f"@@ -{first},{count} +{first},{count} @@"]
+    out.extend(f" {line}" for line in before)
+    out.extend(f"-{line}" for line in changed)
+    out.extend(f"+{line.replace(' - ', ' + ')}" for line in changed)
+    out.extend(f" {line}" for line in after)
+    return "\n".join(out) + "\n"
+
+
+def generate_suite(out_dir: Path, spec: SuiteSpec) -> dict[str, Path]:
+    # Writes <out>/fixtures/synthetic/, <out>/tasks.jsonl and a bench agent in
+    # <out>/agent/. Each task breaks one function and fixes it with a
+    # `patch_lines`-line patch; its check runs only that function's test.
+    if spec.tasks > spec.num_tests:
+        raise ValueError(f"tasks ({spec.tasks}) cannot exceed files * functions_per_file ({spec.num_tests})")
+    rng = random.Random(spec.seed)
+    all_names = [_function_name(f, j) for f in range(spec.files) for j in range(spec.functions_per_file)]
+    targets = sorted(rng.sample(all_names, spec.tasks))
+    broken = set(targets)
+
+    fixture = out_dir / "fixtures" / FIXTURE_NAME
+    package = fixture / "src" / "synthetic"
+    tests = fixture / "tests"
+    package.mkdir(parents=True, exist_ok=True)
+    tests.mkdir(parents=True, exist_ok=True)
+    (fixture / "pyproject.toml").write_text(_PYPROJECT, encoding="utf-8")
+    (package / "__init__.py").write_text("", encoding="utf-8")
+    (tests / "conftest.py").write_text(_CONFTEST, encoding="utf-8")
+
+    patches: dict[str, str] = {}
+    for f in range(spec.files):
+        lines, body_start = _module_lines(f, spec, broken)
+        rel = f"src/synthetic/mod_{f:04d}.py"
+        (fixture / rel).write_text("\n".join(lines) + "\n", encoding="utf-8")
+        (tests / f"test_mod_{f:04d}.py").write_text("\n".join(_test_lines(f, spec)), encoding="utf-8")
+        for name, start in body_start.items():
+            if name in broken:
+                patches[name] = _fix_patch(rel, lines, start, spec.patch_lines)
+
+    tasks_path = out_dir / "tasks.jsonl"
+    with tasks_path.open("w", encoding="utf-8") as fh:
+        for name in targets:
+            task = {
+                "id": f"task_{name}",
+                "instruction": f"Make {name}(x) add 1..{spec.patch_lines} to x.",
+                "fixture": FIXTURE_NAME,
+                "check": {"type": "pytest", "args": ["-q"], "select": "goal"},
+                "goal": {"type": "tests_pass", "target": name},
+                "bench": {"patch": patches[name]},
+            }
+            fh.write(json.dumps(task, separators=(",", ":")) + "\n")
+
+    agent_dir = out_dir / "agent"
+    agent_dir.mkdir(parents=True, exist_ok=True)
+    (agent_dir / "agent.py").write_text(_BENCH_AGENT, encoding="utf-8")
+    return {"fixtures_root": out_dir / "fixtures", "tasks_path": tasks_path, "agent_dir": agent_dir}
+
+
+def add_spec_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = SuiteSpec()
+    parser.add_argument("--files", type=int, default=defaults.files)
+    parser.add_argument("--functions-per-file", type=int, default=defaults.functions_per_file)
+    parser.add_argument("--lines-per-file", type=int, default=defaults.lines_per_file)
+    parser.add_argument("--patch-lines", type=int, default=defaults.patch_lines)
+    parser.add_argument("--tasks", type=int, default=defaults.tasks)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+
+
+def spec_from_args(args: argparse.Namespace) -> SuiteSpec:
+    return SuiteSpec(
+        files=args.files,
+        functions_per_file=args.functions_per_file,
+        lines_per_file=args.lines_per_file,
+        patch_lines=args.patch_lines,
+        tasks=args.tasks,
+        seed=args.seed,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate a synthetic fixture, tasks.jsonl and bench agent")
+    parser.add_argument("--out", required=True)
+    add_spec_arguments(parser)
+    args = parser.parse_args()
+    paths = generate_suite(Path(args.out), spec_from_args(args))
+    print(json.dumps({k: str(v) for k, v in paths.items()}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator
+
+DEFAULT_LEASE_SECONDS = 60.0
+DEFAULT_MAX_ATTEMPTS = 3
+
+# pending -> leased -> done | failed. A lease that is not renewed expires and
+# the task becomes claimable again; a task claimed more than max_attempts
+# times is failed. cancelled: skipped after an early stop.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS tasks (
+    seq INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    task TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    result TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS tasks_state ON tasks (state, seq);
+"""
+
+
+class TaskQueue:
+    # Durable task queue in one SQLite file, shared by the posting run_evals
+    # process and any number of queue workers. Leases use wall-clock time, so
+    # hosts sharing the file need roughly synchronized clocks. Every call opens
+    # its own connection, so one TaskQueue can be used from many threads.
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+    @contextmanager
+    def _connect(self, immediate: bool = False) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+        try:
+            # The default rollback journal, not WAL: WAL needs shared memory,
+            # which hosts sharing the file over a network filesystem do not have.
+            conn.execute("PRAGMA busy_timeout=30000")
+            conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    def post(self, tasks: list[dict[str, Any]], config: dict[str, Any]) -> None:
+        # Replaces whatever an earlier run left in this file.
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+        try:
+            conn.executescript(_SCHEMA)
+        finally:
+            conn.close()
+        with self._connect(immediate=True) as conn:
+            conn.execute("DELETE FROM meta")
+            conn.execute("DELETE FROM tasks")
+            conn.execute("INSERT INTO meta (key, value) VALUES ('config', ?)", (json.dumps(config),))
+            conn.executemany(
+                "INSERT INTO tasks (seq, id, task) VALUES (?, ?, ?)",
+                ((seq, str(task["id"]), json.dumps(task)) for seq, task in enumerate(tasks)),
+            )
+
+    def config(self) -> dict[str, Any]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'config'").fetchone()
+        if row is None:
+            raise RuntimeError(f"No tasks were posted to {self.path}")
+        return json.loads(row[0])
+
+    def claim(
+        self,
+        owner: str,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    ) -> tuple[int, dict[str, Any]] | None:
+        # Lowest pending (or lease-expired) task first, so results finish
+        # roughly in task order and the collector can stream them.
+        now = time.time()
+        with self._connect(immediate=True) as conn:
+            while True:
+                row = conn.execute(
+                    "SELECT seq, task, attempts FROM tasks"
+                    " WHERE state = 'pending' OR (state = 'leased' AND lease_expires < ?)"
+                    " ORDER BY seq LIMIT 1",
+                    (now,),
+                ).fetchone()
+                if row is None:
+                    return None
+                seq, task_json, attempts = row
+                if attempts >= max_attempts:
+                    conn.execute(
+                        "UPDATE tasks SET state = 'failed', lease_owner = NULL, error = ? WHERE seq = ?",
+                        (f"Gave up after {attempts} attempts; the last worker stopped renewing its lease", seq),
+                    )
+                    continue
+                conn.execute(
+                    "UPDATE tasks SET state = 'leased', attempts = attempts + 1, lease_owner = ?, lease_expires = ?"
+                    " WHERE seq = ?",
+                    (owner, now + lease_seconds, seq),
+                )
+                return seq, json.loads(task_json)
+
+    def renew(self, seqs: list[int], owner: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> None:
+        if not seqs:
+            return
+        with self._connect(immediate=True) as conn:
+            conn.executemany(
+                "UPDATE tasks SET lease_expires = ? WHERE seq = ? AND state = 'leased' AND lease_owner = ?",
+                ((time.time() + lease_seconds, seq, owner) for seq in seqs),
+            )
+
+    def complete(self, seq: int, result: dict[str, Any]) -> None:
+        # First result wins: a worker whose lease expired may still finish, and
+        # its result is as good as the retry's.
+        with self._connect(immediate=True) as conn:
+            conn.execute(
+                "UPDATE tasks SET state = 'done', lease_owner = NULL, result = ?"
+                " WHERE seq = ? AND state IN ('pending', 'leased')",
+                (json.dumps(result), seq),
+            )
+
+    def fail(self, seq: int, error: str) -> None:
+        with self._connect(immediate=True) as conn:
+            conn.execute(
+                "UPDATE tasks SET state = 'failed', lease_owner = NULL, error = ?"
+                " WHERE seq = ? AND state IN ('pending', 'leased')",
+                (error, seq),
+            )
+
+    def cancel_pending(self) -> None:
+        with self._connect(immediate=True) as conn:
+            conn.execute("UPDATE tasks SET state = 'cancelled' WHERE state IN ('pending', 'leased')")
+
+    def unfinished(self) -> int:
+        with self._connect() as conn:
+            return int(conn.execute("SELECT COUNT(*) FROM tasks WHERE state IN ('pending', 'leased')").fetchone()[0])
+
+    def finished_after(self, seq: int) -> list[tuple[int, str, dict[str, Any] | None, str | None]]:
+        # (seq, state, result, error) for done/failed tasks past `seq`, in order.
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT seq, state, result, error FROM tasks WHERE seq > ? AND state IN ('done', 'failed') ORDER BY seq",
+                (seq,),
+            ).fetchall()
+        return [(s, state, json.loads(result) if result else None, error) for s, state, result, error in rows]
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import errno
+import fcntl
+import os
+import shutil
+import stat
+import tempfile
+import threading
+from pathlib import Path
+
+from agent_lab.evals.hashing import hash_file
+
+WORKSPACE_MODES = ("auto", "link", "copy")
+
+# Linux FICLONE ioctl: share extents copy-on-write on btrfs/xfs/bcachefs.
+_FICLONE = 0x40049409
+_READ_ONLY = stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH
+
+
+def _reflink(source: Path, target: Path) -> bool:
+    try:
+        with source.open("rb") as src, target.open("wb") as dst:
+            fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+    except OSError:
+        target.unlink(missing_ok=True)
+        return False
+    shutil.copystat(source, target)
+    return True
+
+
+def reflink_supported(directory: Path) -> bool:
+    # Whether files in `directory` can be cloned copy-on-write.
+    with tempfile.TemporaryDirectory(prefix="agent_lab_reflink_", dir=directory) as tmp:
+        source = Path(tmp) / "source"
+        source.write_bytes(b"x")
+        return _reflink(source, Path(tmp) / "clone")
+
+
+class _Snapshot:
+    def __init__(self, source: Path, root: Path, generation: int) -> None:
+        self.root = root
+        self.generation = generation
+        # Set once a write through a link is found; every workspace built from
+        # this snapshot until then may have seen it.
+        self.contaminated = False
+        shutil.copytree(source, root)
+        self.files: dict[Path, list] = {}
+        for path in root.rglob("*"):
+            if path.is_file():
+                path.chmod(_READ_ONLY)
+                st = path.stat()
+                self.files[path.relative_to(root)] = [
+                    st.st_ino,
+                    st.st_size,
+                    st.st_mtime_ns,
+                    st.st_ctime_ns,
+                    hash_file(path),
+                ]
+
+    def intact(self) -> bool:
+        # chmod and utime cannot restore st_ctime_ns, so a file with unchanged
+        # ctime was not written. Hardlinking bumps ctime too, so a changed ctime
+        # is settled by re-hashing the content.
+        for rel, expected in self.files.items():
+            path = self.root / rel
+            try:
+                st = path.lstat()
+            except FileNotFoundError:
+                return False
+            ino, size, mtime_ns, ctime_ns, digest = expected
+            if (st.st_ino, st.st_size, st.st_mtime_ns) != (ino, size, mtime_ns) or st.st_mode & 0o222:
+                return False
+            if st.st_ctime_ns != ctime_ns:
+                if hash_file(path) != digest:
+                    return False
+                expected[3] = st.st_ctime_ns
+        return True
+
+
+class WorkspaceProvisioner:
+    # "link": each fixture is copied once into a private read-only snapshot and
+    # task workspaces are built from reflinks or hardlinks into it. Directories are
+    # always real, so new files (__pycache__, .pytest_cache) stay private. The
+    # snapshot is verified after every task and rebuilt if anything wrote through
+    # a link; release() then reports every workspace built from it as tainted.
+    # "copy": plain shutil.copytree per task. "auto": "link" restricted to
+    # reflinks (copy-on-write, so nothing can write through) where the temp
+    # filesystem supports them, else "copy".
+
+    def __init__(self, fixtures_root: Path, mode: str = "auto") -> None:
+        if mode not in WORKSPACE_MODES:
+            raise ValueError(f"Unknown workspace mode: {mode}")
+        self.fixtures_root = fixtures_root
+        self._hardlinks = mode == "link"
+        if mode == "auto":
+            mode = "link" if reflink_supported(Path(tempfile.gettempdir())) else "copy"
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._snapshots: dict[str, _Snapshot] = {}
+        self._generation = 0
+        self._reflink_supported = True
+        self._tmp = tempfile.TemporaryDirectory(prefix="agent_lab_fixtures_") if mode == "link" else None
+
+    def __enter__(self) -> "WorkspaceProvisioner":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._tmp is not None:
+            for path in Path(self._tmp.name).rglob("*"):
+                if path.is_file():
+                    path.chmod(stat.S_IRUSR | stat.S_IWUSR)
+            self._tmp.cleanup()
+            self._tmp = None
+
+    def _snapshot(self, fixture_name: str) -> _Snapshot:
+        with self._lock:
+            snapshot = self._snapshots.get(fixture_name)
+            if snapshot is None:
+                assert self._tmp is not None
+                self._generation += 1
+                root = Path(self._tmp.name) / f"{self._generation}" / fixture_name
+                snapshot = _Snapshot(self.fixtures_root / fixture_name, root, self._generation)
+                self._snapshots[fixture_name] = snapshot
+            return snapshot
+
+    def _link_file(self, source: Path, target: Path) -> None:
+        if self._reflink_supported:
+            if _reflink(source, target):
+                return
+            self._reflink_supported = False
+        if not self._hardlinks:
+            shutil.copy2(source, target)
+            target.chmod(stat.S_IRUSR | stat.S_IWUSR | stat.S_IRGRP | stat.S_IROTH)
+            return
+        try:
+            os.link(source, target)
+        except OSError as exc:
+            if exc.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP):
+                raise
+            shutil.copy2(source, target)
+            target.chmod(stat.S_IRUSR | stat.S_IWUSR | stat.S_IRGRP | stat.S_IROTH)
+
+    def materialize(self, fixture_name: str, workspace: Path) -> _Snapshot | None:
+        # Returns the snapshot the workspace links into (None for copies), to
+        # hand back to release().
+        if self.mode == "copy":
+            shutil.copytree(self.fixtures_root / fixture_name, workspace)
+            return None
+        snapshot = self._snapshot(fixture_name)
+        workspace.mkdir(parents=True)
+        for dirpath, dirnames, filenames in os.walk(snapshot.root):
+            rel = Path(dirpath).relative_to(snapshot.root)
+            for name in dirnames:
+                (workspace / rel / name).mkdir()
+            for name in filenames:
+                self._link_file(Path(dirpath) / name, workspace / rel / name)
+        return snapshot
+
+    def release(self, fixture_name: str, snapshot: _Snapshot | None) -> bool:
+        # False if the snapshot was found modified while this workspace used
+        # it, so the workspace may not have matched the fixture.
+        if snapshot is None:
+            return True
+        with self._lock:
+            if not snapshot.contaminated and not snapshot.intact():
+                snapshot.contaminated = True
+                # Drop it; the next task gets a fresh copy.
+                if self._snapshots.get(fixture_name) is snapshot:
+                    del self._snapshots[fixture_name]
+            return not snapshot.contaminated
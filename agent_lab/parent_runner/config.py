@@ -10,8 +10,14 @@ class Settings:
     sandbox_dir: Path
     baseline_dir: Path
     candidates_dir: Path
+    store_dir: Path
     logs_dir: Path
     tasks_path: Path
+    cache_dir: Path
+    llm_cache_dir: Path
+    llm_capabilities_path: Path
+    agent_memory_path: Path
+    results_index_path: Path
 
 
 def load_settings() -> Settings:
@@ -19,13 +25,25 @@ def load_settings() -> Settings:
     sandbox_dir = root / "sandbox"
     baseline_dir = sandbox_dir / "baseline"
     candidates_dir = sandbox_dir / "candidates"
+    store_dir = sandbox_dir / "store"
     logs_dir = root / "logs"
     tasks_path = root / "evals" / "tasks.jsonl"
+    cache_dir = sandbox_dir / "cache" / "results"
+    llm_cache_dir = sandbox_dir / "cache" / "llm"
+    llm_capabilities_path = sandbox_dir / "cache" / "llm_capabilities.json"
+    agent_memory_path = sandbox_dir / "memory" / "agent_memory.jsonl"
+    results_index_path = logs_dir / "index.sqlite"
     return Settings(
         root=root,
         sandbox_dir=sandbox_dir,
         baseline_dir=baseline_dir,
         candidates_dir=candidates_dir,
+        store_dir=store_dir,
         logs_dir=logs_dir,
         tasks_path=tasks_path,
+        cache_dir=cache_dir,
+        llm_cache_dir=llm_cache_dir,
+        llm_capabilities_path=llm_capabilities_path,
+        agent_memory_path=agent_memory_path,
+        results_index_path=results_index_path,
     )
@@ -1,78 +1,219 @@
 from __future__ import annotations
 
 import argparse
-import importlib.util
 import json
 import shutil
-import sys
+import tempfile
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import closing
+from dataclasses import dataclass
 from datetime import datetime, UTC
 from pathlib import Path
+from typing import Iterator
 
-from agent_lab.parent_runner.config import load_settings
+from agent_lab.parent_runner.config import Settings, load_settings
 from agent_lab.parent_runner.promote import promote_candidate
-from agent_lab.parent_runner.scoring import compare
-from agent_lab.evals.run_evals import run_evals
+from agent_lab.parent_runner.scoring import Comparison, compare, early_exit_plan, slowest_tests
+from agent_lab.parent_runner.snapshots import SnapshotStore
+from agent_lab.evals.agent_worker import DEFAULT_AGENT_TIMEOUT, AgentWorker, AgentWorkerError, AgentWorkerPool
+from agent_lab.evals.check_runner import CHECK_RUNNERS, CheckRunner, make_check_runner
+from agent_lab.evals.results_index import ResultsIndex
+from agent_lab.evals.run_evals import LLM_CACHE_MODES, run_evals
 
 
-def _bootstrap_baseline(settings_root: Path, baseline_dir: Path, reset_baseline: bool = False) -> None:
-    if baseline_dir.exists() and not reset_baseline:
-        return
-    if baseline_dir.exists() and reset_baseline:
+def _bootstrap_baseline(settings_root: Path, baseline_dir: Path, store: SnapshotStore, reset_baseline: bool = False) -> str:
+    tree_hash = None if reset_baseline else store.get_ref("baseline")
+    if baseline_dir.is_dir() and not baseline_dir.is_symlink():
+        # Pre-store layout: adopt a real baseline directory into the store.
+        if tree_hash is None and not reset_baseline:
+            tree_hash = store.snapshot(baseline_dir)
         shutil.rmtree(baseline_dir)
-    baseline_dir.parent.mkdir(parents=True, exist_ok=True)
-    source = settings_root / "child_agent"
-    shutil.copytree(source, baseline_dir)
+    if tree_hash is None:
+        tree_hash = store.snapshot(settings_root / "child_agent")
+    promote_candidate(store, tree_hash, baseline_dir)
+    return tree_hash
 
 
-def _copy_candidate(baseline_dir: Path, candidates_dir: Path) -> Path:
+def _checkout_candidate(store: SnapshotStore, tree_hash: str, candidates_dir: Path, suffix: str = "") -> Path:
+    # Writable scratch copy for self-improvement; it is snapshotted and removed
+    # before evaluation, so candidates/ only holds in-flight work.
     ts = datetime.now(UTC).strftime("%Y%m%dT%H%M%SZ")
-    target = candidates_dir / ts
     candidates_dir.mkdir(parents=True, exist_ok=True)
-    shutil.copytree(baseline_dir, target)
-    return target
+    target = Path(tempfile.mkdtemp(prefix=f"{ts}{suffix}_", dir=candidates_dir))
+    return store.checkout(tree_hash, target)
 
 
-def _run_self_improve(agent_dir: Path, objective: str) -> None:
-    agent_file = agent_dir / "agent.py"
-    sys.path.insert(0, str(agent_dir.resolve()))
-    spec = importlib.util.spec_from_file_location("candidate_agent_self", agent_file)
-    if spec is None or spec.loader is None:
-        raise RuntimeError(f"Unable to load agent module from {agent_file}")
-    module = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(module)
-    module.self_improve(candidate_workspace=agent_dir, objective=objective)
+def _run_self_improve(agent: AgentWorker, workspace: Path, objective: str, timeout: float) -> None:
+    # The baseline's own worker improves a scratch checkout of that same tree.
+    # A crash, hang or error in the agent is ignored; whether the candidate
+    # changed is read from the tree afterwards.
+    try:
+        agent.self_improve(workspace, objective, timeout=timeout)
+    except AgentWorkerError:
+        pass
 
 
-def run_iteration(iteration: int, reset_baseline: bool = False) -> dict:
-    settings = load_settings()
-    _bootstrap_baseline(settings.root, settings.baseline_dir, reset_baseline=reset_baseline)
-    candidate_dir = _copy_candidate(settings.baseline_dir, settings.candidates_dir)
+def _agent_options(settings: Settings, llm_cache: str) -> dict:
+    options = {
+        "llm_capabilities_path": str(settings.llm_capabilities_path),
+        "memory_path": str(settings.agent_memory_path),
+    }
+    if llm_cache != "off":
+        options.update({"llm_cache_mode": llm_cache, "llm_cache_dir": str(settings.llm_cache_dir)})
+    return options
+
+
+OBJECTIVE = "Improve eval task pass rate safely."
+
+
+def _candidate_objective(index: int, population: int) -> str:
+    if population == 1:
+        return OBJECTIVE
+    # Distinct objectives keep population members (and their LLM cache keys) apart.
+    return f"{OBJECTIVE} Explore variant {index + 1} of {population}."
+
+
+def _select_candidate(comparisons: list[Comparison]) -> int | None:
+    # Best promotable candidate: highest score, ties broken by lowest index.
+    eligible = [i for i, cmp in enumerate(comparisons) if cmp.improved and cmp.no_regressions]
+    if not eligible:
+        return None
+    return min(eligible, key=lambda i: (-comparisons[i].candidate.total, i))
+
+
+@dataclass
+class _Candidates:
+    # Self-improved candidate trees of one baseline tree.
+    baseline_tree: str
+    trees: list[str]
+    self_improved: list[bool]
+
+
+def _generate_candidates(
+    settings: Settings,
+    store: SnapshotStore,
+    agent_pool: AgentWorkerPool,
+    baseline_tree: str,
+    population: int,
+    agent_timeout: float,
+) -> _Candidates:
+    work_dirs = [
+        _checkout_candidate(store, baseline_tree, settings.candidates_dir, suffix=f"_c{k}" if population > 1 else "")
+        for k in range(population)
+    ]
+    baseline_agent = agent_pool.get(store.tree_path(baseline_tree))
+    with ThreadPoolExecutor(max_workers=population, thread_name_prefix="agent_lab_population") as pool:
+        try:
+            list(
+                pool.map(
+                    lambda k: _run_self_improve(
+                        baseline_agent,
+                        work_dirs[k],
+                        objective=_candidate_objective(k, population),
+                        timeout=agent_timeout,
+                    ),
+                    range(population),
+                )
+            )
+            # Judged by content, not by self_improve's return value: older
+            # agents edit the tree and return None.
+            trees = [store.snapshot(work_dir) for work_dir in work_dirs]
+            self_improved = [tree != baseline_tree for tree in trees]
+        finally:
+            for work_dir in work_dirs:
+                shutil.rmtree(work_dir, ignore_errors=True)
+    return _Candidates(baseline_tree=baseline_tree, trees=trees, self_improved=self_improved)
+
+
+def _evaluate_candidates(
+    iteration: int,
+    settings: Settings,
+    store: SnapshotStore,
+    agent_pool: AgentWorkerPool,
+    candidates: _Candidates,
+    workers: int,
+    use_cache: bool,
+    check_runner: str,
+    agent_options: dict,
+    early_exit: bool,
+    agent_timeout: float,
+    per_test: bool,
+    keep_trees: tuple[str, ...] = (),
+    pipeline: dict | None = None,
+    warm_runner: CheckRunner | None = None,
+) -> dict:
+    # Evaluates the baseline and every candidate, promotes the best one and
+    # writes summary.json. keep_trees: baseline trees whose agent workers are
+    # still in use elsewhere (speculative generation in daemon mode).
+    # pipeline: daemon-mode stats, stored in the summary as "pipeline".
+    # warm_runner: a check runner kept across iterations, used by every eval.
+    population = len(candidates.trees)
+    baseline_tree = candidates.baseline_tree
+    candidate_trees = candidates.trees
+    self_improved = candidates.self_improved
+    cache_dir = settings.cache_dir if use_cache else None
+    candidate_dirs = [store.tree_path(tree_hash) for tree_hash in candidate_trees]
 
     run_id = datetime.now(UTC).strftime("run_%Y%m%dT%H%M%SZ") + f"_i{iteration}"
     run_log_dir = settings.logs_dir / run_id
     run_log_dir.mkdir(parents=True, exist_ok=True)
 
-    _run_self_improve(candidate_dir, objective="Improve eval task pass rate safely.")
-
-    baseline_results = run_evals(
-        tasks_path=settings.tasks_path,
-        agent_dir=settings.baseline_dir,
-        output_dir=run_log_dir / "baseline",
-    )
-    candidate_results = run_evals(
-        tasks_path=settings.tasks_path,
-        agent_dir=candidate_dir,
-        output_dir=run_log_dir / "candidate",
-    )
+    with ThreadPoolExecutor(max_workers=population, thread_name_prefix="agent_lab_population") as pool:
+        # One baseline run is shared by every candidate comparison.
+        baseline_results = run_evals(
+            tasks_path=settings.tasks_path,
+            agent_dir=store.tree_path(baseline_tree),
+            output_dir=run_log_dir / "baseline",
+            workers=workers,
+            cache_dir=cache_dir,
+            check_runner=check_runner,
+            agent_options=agent_options,
+            agent_pool=agent_pool,
+            agent_timeout=agent_timeout,
+            index_path=settings.results_index_path,
+            warm_runner=warm_runner,
+        )
+        task_order, stop_when = early_exit_plan(baseline_results, per_test=per_test) if early_exit else (None, None)
+        candidate_results = list(
+            pool.map(
+                lambda k: run_evals(
+                    tasks_path=settings.tasks_path,
+                    agent_dir=candidate_dirs[k],
+                    output_dir=run_log_dir / ("candidate" if population == 1 else f"candidate_{k}"),
+                    workers=workers,
+                    cache_dir=cache_dir,
+                    check_runner=check_runner,
+                    agent_options=agent_options,
+                    task_order=task_order,
+                    stop_when=stop_when,
+                    agent_pool=agent_pool,
+                    agent_timeout=agent_timeout,
+                    index_path=settings.results_index_path,
+                    warm_runner=warm_runner,
+                ),
+                range(population),
+            )
+        )
 
-    cmp = compare(baseline_results, candidate_results)
-    promoted = cmp.improved and cmp.no_regressions
-    if promoted:
-        promote_candidate(candidate_dir, settings.baseline_dir)
+    comparisons = [compare(baseline_results, results, per_test=per_test) for results in candidate_results]
+    selected = _select_candidate(comparisons)
+    promoted = selected is not None
+    if selected is not None:
+        promote_candidate(store, candidate_trees[selected], settings.baseline_dir)
+    # Only the (possibly new) baseline's worker is useful to the next iteration.
+    current = store.get_ref("baseline") or baseline_tree
+    agent_pool.retain([store.tree_path(tree_hash) for tree_hash in {current, *keep_trees}])
 
+    # "comparison" describes the promoted candidate, or the first one if none was.
+    shown = selected if selected is not None else 0
+    cmp = comparisons[shown]
     summary = {
         "iteration": iteration,
         "promoted": promoted,
+        "self_improve_applied": self_improved[shown],
+        "baseline_tree": baseline_tree,
+        "candidate_tree": candidate_trees[shown],
         "comparison": {
             "improved": cmp.improved,
             "no_regressions": cmp.no_regressions,
@@ -80,25 +221,288 @@ def run_iteration(iteration: int, reset_baseline: bool = False) -> dict:
             "candidate_total": cmp.candidate.total,
             "baseline_metrics": cmp.baseline.metrics,
             "candidate_metrics": cmp.candidate.metrics,
+            "test_regressions": cmp.test_regressions,
+        },
+        "slowest_tests": slowest_tests(baseline_results),
+        "candidate_stopped_early": bool(candidate_results[shown].get("stopped_early", False)),
+        "cache_hits": {
+            "baseline": bool(baseline_results.get("cache_hit", False)),
+            "candidate": bool(candidate_results[shown].get("cache_hit", False)),
         },
     }
+    if population > 1:
+        summary["promoted_candidate"] = candidate_trees[selected] if selected is not None else None
+        summary["candidates"] = [
+            {
+                "tree": candidate_trees[k],
+                "self_improve_applied": self_improved[k],
+                "improved": comparisons[k].improved,
+                "no_regressions": comparisons[k].no_regressions,
+                "candidate_total": comparisons[k].candidate.total,
+                "candidate_metrics": comparisons[k].candidate.metrics,
+                "test_regressions": comparisons[k].test_regressions,
+                "stopped_early": bool(candidate_results[k].get("stopped_early", False)),
+                "cache_hit": bool(candidate_results[k].get("cache_hit", False)),
+            }
+            for k in range(population)
+        ]
+    if pipeline is not None:
+        summary["pipeline"] = pipeline
     (run_log_dir / "summary.json").write_text(json.dumps(summary, indent=2), encoding="utf-8")
+    ResultsIndex(settings.results_index_path).record_run(run_log_dir, summary)
     return summary
 
 
+def run_iteration(
+    iteration: int,
+    reset_baseline: bool = False,
+    workers: int = 1,
+    use_cache: bool = True,
+    check_runner: str = "subprocess",
+    llm_cache: str = "off",
+    early_exit: bool = False,
+    population: int = 1,
+    agent_timeout: float = DEFAULT_AGENT_TIMEOUT,
+    agent_pool: AgentWorkerPool | None = None,
+    per_test: bool = False,
+) -> dict:
+    # agent_pool: agent worker processes kept across iterations; it must be built
+    # with the same options this iteration uses (see _agent_options).
+    if population < 1:
+        raise ValueError("population must be >= 1")
+    settings = load_settings()
+    agent_options = _agent_options(settings, llm_cache)
+    if agent_pool is None:
+        with AgentWorkerPool(options=agent_options) as pool:
+            return run_iteration(
+                iteration,
+                reset_baseline=reset_baseline,
+                workers=workers,
+                use_cache=use_cache,
+                check_runner=check_runner,
+                llm_cache=llm_cache,
+                early_exit=early_exit,
+                population=population,
+                agent_timeout=agent_timeout,
+                agent_pool=pool,
+                per_test=per_test,
+            )
+    store = SnapshotStore(settings.store_dir)
+    baseline_tree = _bootstrap_baseline(settings.root, settings.baseline_dir, store, reset_baseline=reset_baseline)
+    candidates = _generate_candidates(settings, store, agent_pool, baseline_tree, population, agent_timeout)
+    return _evaluate_candidates(
+        iteration,
+        settings,
+        store,
+        agent_pool,
+        candidates,
+        workers=workers,
+        use_cache=use_cache,
+        check_runner=check_runner,
+        agent_options=agent_options,
+        early_exit=early_exit,
+        agent_timeout=agent_timeout,
+        per_test=per_test,
+    )
+
+
+def iter_daemon(
+    iterations: int | None = None,
+    reset_baseline: bool = False,
+    workers: int = 1,
+    use_cache: bool = True,
+    check_runner: str = "subprocess",
+    llm_cache: str = "off",
+    early_exit: bool = False,
+    population: int = 1,
+    agent_timeout: float = DEFAULT_AGENT_TIMEOUT,
+    per_test: bool = False,
+) -> Iterator[dict]:
+    # Pipelined loop, yielding each iteration's summary. Settings, the snapshot
+    # store and the agent worker pool are set up once. While iteration i is
+    # evaluated, the candidates for i+1 are generated from the same baseline in
+    # the background. If iteration i promotes, the baseline has moved and that
+    # speculative generation is discarded and redone. Summaries gain "pipeline":
+    # generations discarded before this iteration, and how long evaluation had
+    # to wait for its candidates. iterations=None runs until interrupted. One
+    # check runner serves every eval, so forkserver workers stay warm; it has a
+    # server per task slot of the baseline or of all candidates at once.
+    if population < 1:
+        raise ValueError("population must be >= 1")
+    settings = load_settings()
+    agent_options = _agent_options(settings, llm_cache)
+    store = SnapshotStore(settings.store_dir)
+    baseline_tree = _bootstrap_baseline(settings.root, settings.baseline_dir, store, reset_baseline=reset_baseline)
+
+    with (
+        AgentWorkerPool(options=agent_options) as agent_pool,
+        closing(make_check_runner(check_runner, size=workers * population)) as warm_runner,
+    ):
+        generator = ThreadPoolExecutor(max_workers=1, thread_name_prefix="agent_lab_speculate")
+
+        def generate(tree_hash: str) -> Future[_Candidates]:
+            return generator.submit(
+                _generate_candidates, settings, store, agent_pool, tree_hash, population, agent_timeout
+            )
+
+        try:
+            pending = generate(baseline_tree)
+            iteration = 1
+            discarded = 0
+            waited = 0.0
+            while iterations is None or iteration <= iterations:
+                start = time.perf_counter()
+                candidates = pending.result()
+                waited += time.perf_counter() - start
+                if candidates.baseline_tree != baseline_tree:
+                    # Generated from a baseline that has since been replaced.
+                    discarded += 1
+                    pending = generate(baseline_tree)
+                    continue
+                speculating = iterations is None or iteration < iterations
+                if speculating:
+                    pending = generate(baseline_tree)
+                summary = _evaluate_candidates(
+                    iteration,
+                    settings,
+                    store,
+                    agent_pool,
+                    candidates,
+                    workers=workers,
+                    use_cache=use_cache,
+                    check_runner=check_runner,
+                    agent_options=agent_options,
+                    early_exit=early_exit,
+                    agent_timeout=agent_timeout,
+                    per_test=per_test,
+                    # The speculative generation still uses this baseline's worker.
+                    keep_trees=(baseline_tree,) if speculating else (),
+                    pipeline={"discarded_generations": discarded, "waited_for_candidates_seconds": waited},
+                    warm_runner=warm_runner,
+                )
+                discarded = 0
+                waited = 0.0
+                new_baseline = store.get_ref("baseline") or baseline_tree
+                if new_baseline != baseline_tree:
+                    baseline_tree = new_baseline
+                    # Not started yet: nothing to discard.
+                    if speculating and pending.cancel():
+                        pending = generate(baseline_tree)
+                yield summary
+                iteration += 1
+        finally:
+            # Drop a generation that has not started and wait for one in flight
+            # (each self-improve call is bounded by agent_timeout), so it neither
+            # loses its worker to the closing pool nor leaves scratch checkouts.
+            generator.shutdown(wait=True, cancel_futures=True)
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(description="Run parent self-improvement loop.")
-    parser.add_argument("--iterations", type=int, default=1)
+    parser.add_argument(
+        "--iterations",
+        type=int,
+        default=None,
+        help="Iterations to run (default 1, or unbounded with --daemon).",
+    )
     parser.add_argument(
         "--reset-baseline",
         action="store_true",
         help="Rebuild sandbox/baseline from agent_lab/child_agent before running.",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of eval tasks to run concurrently.",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always re-run evals instead of reusing results for unchanged agent trees.",
+    )
+    parser.add_argument(
+        "--check-runner",
+        choices=CHECK_RUNNERS,
+        default="subprocess",
+        help="'forkserver' runs pytest checks from warm pre-forked workers.",
+    )
+    parser.add_argument(
+        "--llm-cache",
+        choices=LLM_CACHE_MODES,
+        default="off",
+        help="Cache LLM responses under sandbox/cache/llm; 'record' then 'replay' reproduces a run offline.",
+    )
+    parser.add_argument(
+        "--early-exit",
+        action="store_true",
+        help="Stop evaluating the candidate as soon as it regresses or can no longer beat the baseline.",
+    )
+    parser.add_argument(
+        "--population",
+        type=int,
+        default=1,
+        help="Candidates generated and evaluated per iteration; the best non-regressing one is promoted.",
+    )
+    parser.add_argument(
+        "--agent-timeout",
+        type=float,
+        default=DEFAULT_AGENT_TIMEOUT,
+        help="Seconds an agent worker may spend on one task patch or self-improvement call.",
+    )
+    parser.add_argument(
+        "--per-test",
+        action="store_true",
+        help="Compare per test: any regressed test blocks promotion, and more passing tests break task-score ties.",
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Keep running with warm state, generating the next candidate while the current one is evaluated.",
+    )
     args = parser.parse_args()
 
-    for i in range(1, args.iterations + 1):
-        summary = run_iteration(i, reset_baseline=args.reset_baseline)
-        print(json.dumps(summary, indent=2))
+    if args.daemon:
+        summaries = iter_daemon(
+            iterations=args.iterations,
+            reset_baseline=args.reset_baseline,
+            workers=args.workers,
+            use_cache=not args.no_cache,
+            check_runner=args.check_runner,
+            llm_cache=args.llm_cache,
+            early_exit=args.early_exit,
+            population=args.population,
+            agent_timeout=args.agent_timeout,
+            per_test=args.per_test,
+        )
+        try:
+            for summary in summaries:
+                print(json.dumps(summary, indent=2), flush=True)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            summaries.close()
+        return
+
+    agent_pool = AgentWorkerPool(options=_agent_options(load_settings(), args.llm_cache))
+    try:
+        for i in range(1, (args.iterations or 1) + 1):
+            summary = run_iteration(
+                i,
+                reset_baseline=args.reset_baseline,
+                workers=args.workers,
+                use_cache=not args.no_cache,
+                check_runner=args.check_runner,
+                llm_cache=args.llm_cache,
+                early_exit=args.early_exit,
+                population=args.population,
+                agent_timeout=args.agent_timeout,
+                agent_pool=agent_pool,
+                per_test=args.per_test,
+            )
+            print(json.dumps(summary, indent=2))
+    finally:
+        agent_pool.close()
 
 
 if __name__ == "__main__":
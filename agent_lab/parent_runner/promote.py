@@ -1,10 +1,12 @@
 from __future__ import annotations
 
-import shutil
 from pathlib import Path
 
+from agent_lab.parent_runner.snapshots import SnapshotStore, point_link
 
-def promote_candidate(candidate_dir: Path, baseline_dir: Path) -> None:
-    if baseline_dir.exists():
-        shutil.rmtree(baseline_dir)
-    shutil.copytree(candidate_dir, baseline_dir)
+
+def promote_candidate(store: SnapshotStore, tree_hash: str, baseline_dir: Path) -> None:
+    # The ref is the source of truth; the baseline symlink follows it. Both are
+    # replaced atomically, so there is never a moment without a baseline.
+    store.set_ref("baseline", tree_hash)
+    point_link(baseline_dir, store.tree_path(tree_hash))
@@ -1,7 +1,9 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Any
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from agent_lab.evals.check_runner import LIMIT_OUTCOMES
 
 
 @dataclass
@@ -17,6 +19,29 @@ class Comparison:
     no_regressions: bool
     baseline: ScoreSummary
     candidate: ScoreSummary
+    # "<task id>::<node id>" of tests that passed in the baseline and not in
+    # the candidate; only filled in per-test mode.
+    test_regressions: list[str] = field(default_factory=list)
+
+
+PERCENTILES = (50, 90, 99)
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    # Linear interpolation between closest ranks.
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    rank = (len(sorted_values) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+def _percentiles(name: str, values: list[float]) -> dict[str, float]:
+    if not values:
+        return {}
+    ordered = sorted(values)
+    return {f"{name}_p{pct}": _percentile(ordered, pct) for pct in PERCENTILES}
 
 
 def summarize_results(results: dict[str, Any]) -> ScoreSummary:
@@ -25,28 +50,94 @@ def summarize_results(results: dict[str, Any]) -> ScoreSummary:
     total_seconds = 0.0
     total_test_runs = 0
     total_patches = 0
+    task_seconds: list[float] = []
+    phase_seconds: dict[str, list[float]] = {}
+    outcome_counts = dict.fromkeys(LIMIT_OUTCOMES, 0)
+    tests_passed = tests_failed = tests_total = 0
 
     for task in results.get("tasks", []):
         passed = 1 if task.get("passed", False) else 0
         task_id = str(task.get("id", "unknown"))
         by_task[task_id] = passed
         total += passed
-        total_seconds += float(task.get("elapsed_seconds", 0.0))
+        elapsed = float(task.get("elapsed_seconds", 0.0))
+        total_seconds += elapsed
+        task_seconds.append(elapsed)
         total_test_runs += int(task.get("num_test_runs", 0))
         total_patches += int(task.get("num_patches", 0))
+        if task.get("outcome") in outcome_counts:
+            outcome_counts[task["outcome"]] += 1
+        outcomes = (task.get("tests") or {}).get("outcomes", "")
+        tests_passed += outcomes.count("p")
+        tests_failed += outcomes.count("f") + outcomes.count("e")
+        tests_total += len(outcomes) - outcomes.count("s")
+        for phase, seconds in (task.get("phases") or {}).items():
+            phase_seconds.setdefault(phase, []).append(float(seconds))
 
-    return ScoreSummary(
-        total=total,
-        by_task=by_task,
-        metrics={
-            "elapsed_seconds": total_seconds,
-            "num_test_runs": float(total_test_runs),
-            "num_patches": float(total_patches),
-        },
+    metrics = {
+        "elapsed_seconds": total_seconds,
+        "num_test_runs": float(total_test_runs),
+        "num_patches": float(total_patches),
+    }
+    metrics.update((f"num_{outcome}", float(count)) for outcome, count in outcome_counts.items())
+    # Per-test counts (skips excluded); zero for results without per-test data.
+    metrics.update(
+        {"tests_passed": float(tests_passed), "tests_failed": float(tests_failed), "tests_total": float(tests_total)}
     )
+    metrics.update(_percentiles("elapsed_seconds", task_seconds))
+    # Results from older cache entries have no per-phase spans.
+    for phase, values in phase_seconds.items():
+        metrics[f"{phase}_seconds"] = sum(values)
+        metrics.update(_percentiles(f"{phase}_seconds", values))
+    return ScoreSummary(total=total, by_task=by_task, metrics=metrics)
+
+
+def _test_outcomes(task: dict[str, Any]) -> dict[str, str] | None:
+    tests = task.get("tests")
+    if not tests:
+        return None
+    return dict(zip(tests["ids"], tests["outcomes"]))
+
 
+def test_regressions(baseline_results: dict[str, Any], candidate_results: dict[str, Any]) -> list[str]:
+    # Tests that passed in a baseline task and failed, errored, were skipped
+    # or did not run in the same candidate task. Tasks without per-test results
+    # on the baseline side have nothing to compare.
+    candidate_tasks = {str(task.get("id")): task for task in candidate_results.get("tasks", [])}
+    regressions = []
+    for task in baseline_results.get("tasks", []):
+        task_id = str(task.get("id"))
+        base = _test_outcomes(task)
+        if base is None or task_id not in candidate_tasks:
+            continue
+        cand = _test_outcomes(candidate_tasks[task_id]) or {}
+        regressions.extend(
+            f"{task_id}::{node}" for node, outcome in base.items() if outcome == "p" and cand.get(node) != "p"
+        )
+    return regressions
 
-def compare(baseline_results: dict[str, Any], candidate_results: dict[str, Any]) -> Comparison:
+
+def slowest_tests(results: dict[str, Any], limit: int = 10) -> list[dict[str, Any]]:
+    # Fixture tests by total time across all tasks' checks, slowest first.
+    totals: dict[str, list[float]] = {}
+    for task in results.get("tasks", []):
+        tests = task.get("tests") or {}
+        for node, ms in zip(tests.get("ids", []), tests.get("ms", [])):
+            entry = totals.setdefault(node, [0.0, 0])
+            entry[0] += ms / 1000
+            entry[1] += 1
+    ranked = sorted(totals.items(), key=lambda item: item[1][0], reverse=True)[:limit]
+    return [{"test": node, "seconds": seconds, "runs": runs} for node, (seconds, runs) in ranked]
+
+
+def compare(
+    baseline_results: dict[str, Any],
+    candidate_results: dict[str, Any],
+    per_test: bool = False,
+) -> Comparison:
+    # per_test: any test that regresses (see test_regressions) blocks
+    # promotion, and with equal task scores more passing tests counts as an
+    # improvement.
     base = summarize_results(baseline_results)
     cand = summarize_results(candidate_results)
 
@@ -58,9 +149,48 @@ def compare(baseline_results: dict[str, Any], candidate_results: dict[str, Any])
             break
 
     improved = cand.total > base.total
+    regressed_tests: list[str] = []
+    if per_test:
+        regressed_tests = test_regressions(baseline_results, candidate_results)
+        no_regressions = no_regressions and not regressed_tests
+        improved = improved or (
+            cand.total == base.total and cand.metrics["tests_passed"] > base.metrics["tests_passed"]
+        )
     return Comparison(
         improved=improved,
         no_regressions=no_regressions,
         baseline=base,
         candidate=cand,
+        test_regressions=regressed_tests,
     )
+
+
+def early_exit_plan(
+    baseline_results: dict[str, Any],
+    per_test: bool = False,
+) -> tuple[list[str], Callable[[list[dict[str, Any]], int], bool]]:
+    # Candidate task order plus a stop rule for run_evals. Tasks the baseline
+    # passed run first, since one failure there already rules out promotion.
+    # The run stops on the first such regression, or once the candidate can no
+    # longer beat base.total even if every remaining task passes. per_test (as
+    # in compare): a regressed test also stops the run, and a candidate that
+    # can still tie base.total keeps going, since more passing tests may win.
+    base = summarize_results(baseline_results)
+    base_tasks = {str(task.get("id")): task for task in baseline_results.get("tasks", [])}
+    order = [task_id for task_id, score in base.by_task.items() if score] + [
+        task_id for task_id, score in base.by_task.items() if not score
+    ]
+
+    def stop_when(completed: list[dict[str, Any]], remaining: int) -> bool:
+        last = completed[-1]
+        if base.by_task.get(str(last.get("id")), 0) and not last.get("passed", False):
+            return True
+        passed = sum(1 for task in completed if task.get("passed", False))
+        if not per_test:
+            return passed + remaining <= base.total
+        base_task = base_tasks.get(str(last.get("id")))
+        if base_task is not None and test_regressions({"tasks": [base_task]}, {"tasks": [last]}):
+            return True
+        return passed + remaining < base.total
+
+    return order, stop_when
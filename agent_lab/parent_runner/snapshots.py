@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import stat
+import tempfile
+from pathlib import Path
+
+from agent_lab.evals.hashing import digest_tree_entries, tree_entries
+from agent_lab.parent_runner.config import load_settings
+
+_READ_ONLY = stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH
+_EXECUTABLE = _READ_ONLY | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH
+
+
+class SnapshotStore:
+    # Content-addressed store for agent trees:
+    #   objects/<aa>/<sha>[.x]   deduplicated, read-only file blobs (.x = executable)
+    #   manifests/<tree>.json    rel path -> blob for one snapshot
+    #   trees/<tree>/            materialized snapshot, hardlinked to objects
+    #   refs/<name>              tree hash a name points at (e.g. "baseline")
+    # Tree hashes match evals.hashing.hash_tree, so they double as eval cache keys.
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self.objects_dir = root / "objects"
+        self.manifests_dir = root / "manifests"
+        self.trees_dir = root / "trees"
+        self.refs_dir = root / "refs"
+
+    def _object_path(self, digest: str, executable: bool) -> Path:
+        return self.objects_dir / digest[:2] / (f"{digest}.x" if executable else digest)
+
+    def _store_object(self, source: Path, digest: str, executable: bool) -> None:
+        target = self._object_path(digest, executable)
+        if target.exists():
+            return
+        target.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(prefix=".obj_", dir=target.parent)
+        os.close(fd)
+        shutil.copyfile(source, tmp_name)
+        os.chmod(tmp_name, _EXECUTABLE if executable else _READ_ONLY)
+        os.replace(tmp_name, target)
+
+    def snapshot(self, source: Path) -> str:
+        entries = tree_entries(source)
+        tree_hash = digest_tree_entries(entries)
+        manifest_path = self.manifests_dir / f"{tree_hash}.json"
+        if manifest_path.exists():
+            return tree_hash
+        for rel, executable, digest in entries:
+            self._store_object(source / rel, digest, executable)
+        manifest = {"files": {rel: {"sha256": digest, "executable": executable} for rel, executable, digest in entries}}
+        _write_atomic(manifest_path, json.dumps(manifest, indent=2, sort_keys=True))
+        return tree_hash
+
+    def manifest(self, tree_hash: str) -> dict[str, dict]:
+        path = self.manifests_dir / f"{tree_hash}.json"
+        if not path.exists():
+            raise KeyError(f"Unknown snapshot: {tree_hash}")
+        return json.loads(path.read_text(encoding="utf-8"))["files"]
+
+    def tree_path(self, tree_hash: str) -> Path:
+        # Read-only materialization made of hardlinks into objects/. Directories
+        # stay writable so interpreters can drop __pycache__ next to the sources.
+        target = self.trees_dir / tree_hash
+        if target.exists():
+            return target
+        files = self.manifest(tree_hash)
+        self.trees_dir.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(prefix=f".{tree_hash[:12]}_", dir=self.trees_dir))
+        for rel, entry in files.items():
+            dest = staging / rel
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            os.link(self._object_path(entry["sha256"], entry["executable"]), dest)
+        try:
+            os.replace(staging, target)
+        except OSError:
+            # Another process materialized the same tree first.
+            shutil.rmtree(staging, ignore_errors=True)
+            if not target.exists():
+                raise
+        return target
+
+    def checkout(self, tree_hash: str, dest: Path) -> Path:
+        # Private writable copy, e.g. a candidate about to self-improve.
+        for rel, entry in self.manifest(tree_hash).items():
+            target = dest / rel
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(self._object_path(entry["sha256"], entry["executable"]), target)
+            target.chmod(0o755 if entry["executable"] else 0o644)
+        return dest
+
+    def get_ref(self, name: str) -> str | None:
+        path = self.refs_dir / name
+        if not path.exists():
+            return None
+        return path.read_text(encoding="utf-8").strip() or None
+
+    def set_ref(self, name: str, tree_hash: str) -> None:
+        self.manifest(tree_hash)
+        _write_atomic(self.refs_dir / name, tree_hash + "\n")
+
+    def list_snapshots(self) -> list[str]:
+        return sorted(p.stem for p in self.manifests_dir.glob("*.json"))
+
+    def gc(self, keep: set[str] | None = None) -> dict[str, int]:
+        # Drops every snapshot not named by a ref (or in `keep`), then every
+        # object no surviving manifest uses. Not safe to run while an iteration
+        # is writing to the store.
+        referenced = set(keep or ())
+        if self.refs_dir.exists():
+            for ref in self.refs_dir.iterdir():
+                if ref.is_file() and not ref.name.startswith("."):
+                    referenced.add(ref.read_text(encoding="utf-8").strip())
+        removed_snapshots = 0
+        live_objects: set[Path] = set()
+        for tree_hash in self.list_snapshots():
+            if tree_hash in referenced:
+                live_objects.update(
+                    self._object_path(e["sha256"], e["executable"]) for e in self.manifest(tree_hash).values()
+                )
+                continue
+            (self.manifests_dir / f"{tree_hash}.json").unlink()
+            shutil.rmtree(self.trees_dir / tree_hash, ignore_errors=True)
+            removed_snapshots += 1
+        removed_objects = 0
+        for obj in self.objects_dir.glob("*/*"):
+            if obj not in live_objects and not obj.name.startswith("."):
+                obj.unlink()
+                removed_objects += 1
+        return {"snapshots_removed": removed_snapshots, "objects_removed": removed_objects}
+
+
+def _write_atomic(path: Path, text: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", dir=path.parent)
+    with os.fdopen(fd, "w", encoding="utf-8") as fh:
+        fh.write(text)
+    os.replace(tmp_name, path)
+
+
+def point_link(link: Path, target: Path) -> None:
+    # Atomically (re)point a symlink: build it under a temp name, then rename over.
+    link.parent.mkdir(parents=True, exist_ok=True)
+    tmp_link = link.with_name(f".{link.name}.{os.getpid()}.tmp")
+    tmp_link.unlink(missing_ok=True)
+    os.symlink(os.path.relpath(target, link.parent), tmp_link, target_is_directory=True)
+    os.replace(tmp_link, link)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Inspect or garbage-collect the agent snapshot store.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="List snapshots and refs.")
+    sub.add_parser("gc", help="Delete snapshots and objects not reachable from any ref.")
+    args = parser.parse_args()
+
+    settings = load_settings()
+    store = SnapshotStore(settings.store_dir)
+    if args.command == "list":
+        refs = {}
+        if store.refs_dir.exists():
+            refs = {p.name: p.read_text(encoding="utf-8").strip() for p in store.refs_dir.iterdir() if p.is_file()}
+        print(json.dumps({"refs": refs, "snapshots": store.list_snapshots()}, indent=2))
+    else:
+        print(json.dumps(store.gc(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import time
+from pathlib import Path
+
+import pytest
+
+from agent_lab.evals.agent_worker import AgentWorker, AgentWorkerError, AgentWorkerPool
+
+_AGENT = """\
+import os
+import time
+from pathlib import Path
+
+
+def generate_task_patch(task, workspace):
+    time.sleep(task.get("sleep", 0))
+    return f"{task['id']}:{os.getpid()}"
+
+
+def self_improve(candidate_workspace, objective):
+    time.sleep(float(objective))
+    (Path(candidate_workspace) / "late.txt").write_text("written after the timeout")
+    return True
+"""
+
+
+@pytest.fixture
+def agent_dir(tmp_path: Path) -> Path:
+    root = tmp_path / "agent"
+    root.mkdir()
+    (root / "agent.py").write_text(_AGENT)
+    return root
+
+
+def test_worker_process_is_reused(agent_dir: Path) -> None:
+    with AgentWorker(agent_dir) as worker:
+        first = worker.generate_task_patch({"id": "a"}, agent_dir)
+        second = worker.generate_task_patch({"id": "b"}, agent_dir)
+    assert first.split(":")[1] == second.split(":")[1]
+
+
+def test_timeout_kills_and_restarts_the_worker(agent_dir: Path) -> None:
+    with AgentWorker(agent_dir) as worker:
+        pid = worker.generate_task_patch({"id": "a"}, agent_dir).split(":")[1]
+        with pytest.raises(AgentWorkerError, match="timed out"):
+            worker.generate_task_patch({"id": "slow", "sleep": 30}, agent_dir, timeout=0.5)
+        again = worker.generate_task_patch({"id": "b"}, agent_dir, timeout=30)
+    assert again.split(":")[1] != pid
+
+
+def test_timed_out_self_improve_stops_editing(agent_dir: Path, tmp_path: Path) -> None:
+    candidate = tmp_path / "candidate"
+    candidate.mkdir()
+    with AgentWorker(agent_dir) as worker:
+        with pytest.raises(AgentWorkerError):
+            worker.self_improve(candidate, objective="1.5", timeout=0.3)
+        time.sleep(2.0)
+    assert not (candidate / "late.txt").exists()
+
+
+def test_pool_shares_workers_by_tree(agent_dir: Path, tmp_path: Path) -> None:
+    twin = tmp_path / "twin"
+    twin.mkdir()
+    (twin / "agent.py").write_text(_AGENT)
+    with AgentWorkerPool() as pool:
+        assert pool.get(agent_dir) is pool.get(twin)
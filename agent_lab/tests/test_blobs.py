@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from agent_lab.evals.blobs import BlobStore, read_blob
+
+
+def test_put_is_content_addressed(tmp_path: Path) -> None:
+    store = BlobStore(tmp_path)
+    rel = store.put("hello\n")
+    data = (tmp_path / rel).read_bytes()
+    assert store.put("hello\n") == rel
+    assert (tmp_path / rel).read_bytes() == data
+    assert store.put("other\n") != rel
+    assert read_blob(tmp_path, rel) == "hello\n"
+    assert not list(tmp_path.rglob(".blob_*"))
+
+
+def test_externalize_keeps_short_text_inline(tmp_path: Path) -> None:
+    store = BlobStore(tmp_path, max_inline_bytes=16)
+    assert store.externalize("stdout", "short") == {"stdout": "short"}
+    assert not (tmp_path / "blobs").exists()
+
+
+def test_externalize_keeps_the_tail_of_long_text(tmp_path: Path) -> None:
+    store = BlobStore(tmp_path, max_inline_bytes=8)
+    text = "x" * 100 + "1 passed"
+    record = store.externalize("stdout", text)
+    assert record["stdout"] == "1 passed"
+    assert record["stdout_truncated"] and record["stdout_bytes"] == len(text)
+    assert read_blob(tmp_path, record["stdout_blob"]) == text
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+from agent_lab.evals.check_runner import CheckLimits, ForkServerCheckRunner, SubprocessCheckRunner
+
+_NO_LIMITS = CheckLimits(wall_seconds=None, cpu_seconds=None, memory_mb=None, output_bytes=None)
+
+
+@pytest.fixture
+def project(tmp_path: Path) -> Path:
+    root = tmp_path / "proj"
+    (root / "tests").mkdir(parents=True)
+    (root / "tests" / "test_x.py").write_text(
+        "import pytest\n\n"
+        "def test_ok():\n    assert True\n\n"
+        "def test_bad():\n    assert False\n\n"
+        "@pytest.mark.skip\ndef test_skipped():\n    pass\n"
+    )
+    return root
+
+
+def test_merged_rejects_unknown_limits() -> None:
+    assert CheckLimits().merged({"wall_seconds": 5}).wall_seconds == 5
+    with pytest.raises(ValueError):
+        CheckLimits().merged({"wall": 5})
+
+
+def test_wall_limit_kills_the_check(tmp_path: Path) -> None:
+    limits = _NO_LIMITS.merged({"wall_seconds": 0.3})
+    proc = SubprocessCheckRunner().run([sys.executable, "-c", "import time; time.sleep(30)"], tmp_path, limits)
+    assert proc.limit == "wall" and proc.returncode != 0
+
+
+def test_output_limit_truncates(tmp_path: Path) -> None:
+    limits = _NO_LIMITS.merged({"output_bytes": 1000})
+    cmd = [sys.executable, "-c", "import sys\nwhile True: sys.stdout.write('x' * 4096)"]
+    proc = SubprocessCheckRunner().run(cmd, tmp_path, limits)
+    assert proc.limit == "output"
+    assert proc.stdout.endswith("[output truncated at 1000 bytes]\n")
+
+
+@pytest.mark.parametrize("runner_name", ["subprocess", "forkserver"])
+def test_pytest_check_with_junit(project: Path, runner_name: str) -> None:
+    runner = SubprocessCheckRunner() if runner_name == "subprocess" else ForkServerCheckRunner()
+    try:
+        proc = runner.run(["pytest", "-q", "-p", "no:cacheprovider"], project, junit=True)
+    finally:
+        if isinstance(runner, ForkServerCheckRunner):
+            runner.close()
+    assert proc.returncode == 1 and proc.limit is None
+    outcomes = dict(zip(proc.tests["ids"], proc.tests["outcomes"]))
+    assert outcomes == {
+        "tests/test_x.py::test_ok": "p",
+        "tests/test_x.py::test_bad": "f",
+        "tests/test_x.py::test_skipped": "s",
+    }
+
+
+def test_forkserver_replaces_a_server_after_any_error(project: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    runner = ForkServerCheckRunner(size=1)
+    try:
+        [server] = runner._servers
+
+        def broken(*args: object) -> None:
+            raise KeyError("unexpected")
+
+        monkeypatch.setattr(server, "request", broken)
+        with pytest.raises(KeyError):
+            runner.run(["pytest", "-q"], project)
+        assert server not in runner._servers and len(runner._servers) == 1
+
+        result: list[int] = []
+        thread = threading.Thread(
+            target=lambda: result.append(runner.run(["pytest", "-q", "-p", "no:cacheprovider"], project).returncode),
+            daemon=True,
+        )
+        thread.start()
+        thread.join(timeout=60)
+        assert result == [1]
+    finally:
+        runner.close()
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import dataclasses
+import json
+from pathlib import Path
+
+import pytest
+
+from agent_lab.evals import run_evals
+from agent_lab.parent_runner import main
+from agent_lab.parent_runner.config import load_settings
+
+_REPO_TASKS = Path(__file__).resolve().parents[1] / "evals" / "tasks.jsonl"
+
+
+@pytest.fixture
+def settings(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    # The real child agent against a private sandbox; without an API key every
+    # self-improvement is a no-op, so nothing is promoted.
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    tasks_path = tmp_path / "tasks.jsonl"
+    tasks_path.write_text("".join(_REPO_TASKS.read_text().splitlines(keepends=True)[:2]))
+    sandbox = tmp_path / "sandbox"
+    settings = dataclasses.replace(
+        load_settings(),
+        sandbox_dir=sandbox,
+        baseline_dir=sandbox / "baseline",
+        candidates_dir=sandbox / "candidates",
+        store_dir=sandbox / "store",
+        logs_dir=tmp_path / "logs",
+        tasks_path=tasks_path,
+        cache_dir=sandbox / "cache" / "results",
+        llm_cache_dir=sandbox / "cache" / "llm",
+        llm_capabilities_path=sandbox / "cache" / "llm_capabilities.json",
+        agent_memory_path=sandbox / "memory" / "agent_memory.jsonl",
+        results_index_path=tmp_path / "logs" / "index.sqlite",
+    )
+    monkeypatch.setattr(main, "load_settings", lambda: settings)
+    return settings
+
+
+def test_daemon_runs_each_iteration_against_the_baseline(settings) -> None:
+    summaries = list(main.iter_daemon(iterations=2, reset_baseline=True))
+    assert [summary["iteration"] for summary in summaries] == [1, 2]
+    assert not any(summary["promoted"] for summary in summaries)
+    assert summaries[0]["baseline_tree"] == summaries[1]["baseline_tree"]
+    assert all(summary["pipeline"]["discarded_generations"] == 0 for summary in summaries)
+
+
+def test_daemon_reports_pipeline_stats(settings) -> None:
+    summaries = list(main.iter_daemon(iterations=2, reset_baseline=True))
+    assert len(summaries) == 2
+    for summary in summaries:
+        assert summary["pipeline"]["discarded_generations"] == 0
+        assert summary["pipeline"]["waited_for_candidates_seconds"] >= 0
+    written = [json.loads(path.read_text()) for path in sorted(settings.logs_dir.glob("*/summary.json"))]
+    assert [summary["pipeline"] for summary in written] == [summary["pipeline"] for summary in summaries]
+
+
+def test_daemon_keeps_one_check_runner_across_iterations(settings, monkeypatch: pytest.MonkeyPatch) -> None:
+    made: list[str] = []
+    real = main.make_check_runner
+
+    def make_check_runner(name: str, size: int = 1):
+        made.append(name)
+        return real(name, size=size)
+
+    monkeypatch.setattr(main, "make_check_runner", make_check_runner)
+    monkeypatch.setattr(run_evals, "make_check_runner", lambda *args, **kwargs: pytest.fail("per-run check runner"))
+    summaries = list(main.iter_daemon(iterations=2, reset_baseline=True, check_runner="forkserver"))
+    assert len(summaries) == 2 and made == ["forkserver"]
+
+
+def test_closing_the_daemon_waits_for_speculative_generation(settings) -> None:
+    daemon = main.iter_daemon(reset_baseline=True)
+    next(daemon)
+    daemon.close()
+    assert not any(settings.candidates_dir.iterdir())
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+from agent_lab.parent_runner.scoring import early_exit_plan
+
+
+def _results(*passed: bool) -> dict:
+    return {"tasks": [{"id": f"t{k}", "passed": p} for k, p in enumerate(passed)]}
+
+
+def test_baseline_passes_run_first() -> None:
+    order, _ = early_exit_plan(_results(False, True, False, True))
+    assert order == ["t1", "t3", "t0", "t2"]
+
+
+def test_stops_on_first_regression() -> None:
+    _, stop_when = early_exit_plan(_results(True, True, False))
+    assert not stop_when([{"id": "t0", "passed": True}], 2)
+    assert stop_when([{"id": "t0", "passed": True}, {"id": "t1", "passed": False}], 1)
+
+
+def test_stops_once_baseline_cannot_be_beaten() -> None:
+    _, stop_when = early_exit_plan(_results(True, False, False))
+    completed = [{"id": "t0", "passed": True}, {"id": "t1", "passed": False}, {"id": "t2", "passed": False}]
+    # One pass plus one task remaining could still reach 2 > 1.
+    assert not stop_when(completed[:2], 1)
+    assert stop_when(completed, 0)
+
+
+def test_per_test_keeps_going_while_a_tie_is_possible() -> None:
+    _, stop_when = early_exit_plan(_results(False, True), per_test=True)
+    completed = [{"id": "t1", "passed": True}, {"id": "t0", "passed": False}]
+    assert not stop_when(completed, 0)
+
+
+def test_per_test_stops_on_a_regressed_test() -> None:
+    baseline = {"tasks": [{"id": "t0", "passed": False, "tests": {"ids": ["a", "b"], "outcomes": "pf", "ms": [1, 1]}}]}
+    _, stop_when = early_exit_plan(baseline, per_test=True)
+    candidate = {"id": "t0", "passed": False, "tests": {"ids": ["a", "b"], "outcomes": "fp", "ms": [1, 1]}}
+    assert stop_when([candidate], 0)
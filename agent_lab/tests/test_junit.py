@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from agent_lab.evals.junit import parse_junit
+from agent_lab.parent_runner import scoring
+
+_REPORT = """\
+<?xml version="1.0" encoding="utf-8"?>
+<testsuites><testsuite name="pytest" tests="5">
+<testcase classname="tests.test_core" name="test_add" time="0.010"/>
+<testcase classname="tests.test_core.TestDivide" name="test_zero[0-1]" time="0.250">
+  <failure message="boom">trace</failure>
+</testcase>
+<testcase classname="tests.test_core" name="test_skip" time="0.000"><skipped message="no"/></testcase>
+<testcase classname="tests.test_core" name="test_err" time="0.001"><error message="setup"/></testcase>
+<testcase classname="" name="test_loose" time="1.5"/>
+</testsuite></testsuites>
+"""
+
+
+def _task(task_id: str, ids: list[str], outcomes: str, passed: bool = True) -> dict:
+    return {"id": task_id, "passed": passed, "tests": {"ids": ids, "outcomes": outcomes, "ms": [10] * len(ids)}}
+
+
+def test_parse_junit_maps_classnames_to_node_ids(tmp_path: Path) -> None:
+    (tmp_path / "tests").mkdir()
+    (tmp_path / "tests" / "test_core.py").write_text("")
+    (tmp_path / "report.xml").write_text(_REPORT)
+    tests = parse_junit(tmp_path / "report.xml", tmp_path)
+    assert tests == {
+        "ids": [
+            "tests/test_core.py::test_add",
+            "tests/test_core.py::TestDivide::test_zero[0-1]",
+            "tests/test_core.py::test_skip",
+            "tests/test_core.py::test_err",
+            "test_loose",
+        ],
+        "outcomes": "pfsep",
+        "ms": [10, 250, 0, 1, 1500],
+    }
+
+
+def test_missing_or_truncated_report_is_none(tmp_path: Path) -> None:
+    assert parse_junit(tmp_path / "missing.xml", tmp_path) is None
+    (tmp_path / "report.xml").write_text(_REPORT[:200])
+    assert parse_junit(tmp_path / "report.xml", tmp_path) is None
+
+
+def test_per_test_regressions_block_promotion() -> None:
+    baseline = {"tasks": [_task("t1", ["a", "b"], "pp"), _task("t2", ["c"], "f", passed=False)]}
+    candidate = {"tasks": [_task("t1", ["a", "b"], "pf"), _task("t2", ["c"], "p")]}
+    assert scoring.test_regressions(baseline, candidate) == ["t1::b"]
+    assert scoring.compare(baseline, candidate).improved
+    per_test = scoring.compare(baseline, candidate, per_test=True)
+    assert not per_test.no_regressions and per_test.test_regressions == ["t1::b"]
+
+
+def test_more_passing_tests_break_ties() -> None:
+    baseline = {"tasks": [_task("t1", ["a", "b"], "pf", passed=False)]}
+    candidate = {"tasks": [_task("t1", ["a", "b"], "pp", passed=False)]}
+    assert not scoring.compare(baseline, candidate).improved
+    assert scoring.compare(baseline, candidate, per_test=True).improved
+
+
+def test_slowest_tests_sum_across_tasks() -> None:
+    results = {"tasks": [_task("t1", ["a", "b"], "pp"), _task("t2", ["a"], "p")]}
+    assert scoring.slowest_tests(results, limit=1) == [{"test": "a", "seconds": 0.02, "runs": 2}]
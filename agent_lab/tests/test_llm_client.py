@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Iterator
+
+import pytest
+
+from agent_lab.child_agent import llm_client
+from agent_lab.child_agent.llm_client import MAX_IN_FLIGHT, LLMClient, ResponseCache
+
+
+class FakeResponses:
+    # Local stand-in for the Responses API: records requests and peak
+    # concurrency, and can reject models or reasoning efforts.
+
+    def __init__(self) -> None:
+        self.delay = 0.0
+        self.missing_models: set[str] = set()
+        self.rejected_efforts: set[str | None] = set()
+        self.requests: list[dict[str, Any]] = []
+        self.in_flight = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def handle(self, body: dict[str, Any]) -> tuple[int, dict[str, Any]]:
+        with self.lock:
+            self.requests.append(body)
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        try:
+            time.sleep(self.delay)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+        effort = (body.get("reasoning") or {}).get("effort")
+        if body["model"] in self.missing_models:
+            error = {"message": f"The model `{body['model']}` does not exist", "code": "model_not_found"}
+            return 404, {"error": {**error, "type": "invalid_request_error", "param": None}}
+        if effort in self.rejected_efforts:
+            error = {
+                "message": f"Unsupported value: 'reasoning.effort' does not support '{effort}'",
+                "param": "reasoning.effort",
+                "code": "unsupported_value",
+            }
+            return 400, {"error": {**error, "type": "invalid_request_error"}}
+        text = f"patch from {body['model']}/{effort}"
+        return 200, {
+            "id": "resp_1",
+            "object": "response",
+            "created_at": 0,
+            "model": body["model"],
+            "status": "completed",
+            "parallel_tool_calls": False,
+            "tool_choice": "auto",
+            "tools": [],
+            "output": [
+                {
+                    "type": "message",
+                    "id": "msg_1",
+                    "role": "assistant",
+                    "status": "completed",
+                    "content": [{"type": "output_text", "text": text, "annotations": []}],
+                }
+            ],
+        }
+
+
+@pytest.fixture
+def fake(monkeypatch: pytest.MonkeyPatch) -> Iterator[tuple[FakeResponses, str]]:
+    pytest.importorskip("openai")
+    responses = FakeResponses()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self) -> None:
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            status, payload = responses.handle(body)
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args: Any) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    llm_client.configure()
+    try:
+        yield responses, f"http://127.0.0.1:{server.server_address[1]}/v1"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def _reset_llm_state() -> Iterator[None]:
+    llm_client.configure()
+    yield
+    llm_client.configure()
+
+
+def test_generate_patch_against_fake_server(fake: tuple[FakeResponses, str]) -> None:
+    responses, base_url = fake
+    client = LLMClient(model="fake-model", base_url=base_url)
+    assert client.generate_patch("system", "user") == "patch from fake-model/high"
+    assert asyncio.run(client.agenerate_patch("system", "user")) == "patch from fake-model/high"
+    assert responses.requests[0]["input"][1] == {"role": "user", "content": "user"}
+
+
+def test_falls_back_over_missing_models_and_rejected_efforts(fake: tuple[FakeResponses, str]) -> None:
+    responses, base_url = fake
+    responses.missing_models = {"fake-model"}
+    responses.rejected_efforts = {"high", "xhigh"}
+    client = LLMClient(model="fake-model", base_url=base_url)
+    assert client.generate_patch("system", "user") == f"patch from {llm_client.DEFAULT_MODEL}/medium"
+
+    # Negotiated once: the next call goes straight to the working model and effort.
+    responses.requests.clear()
+    assert client.generate_patch("system", "again") == f"patch from {llm_client.DEFAULT_MODEL}/medium"
+    assert [(r["model"], r["reasoning"]["effort"]) for r in responses.requests] == [
+        (llm_client.DEFAULT_MODEL, "medium")
+    ]
+
+
+def test_sync_and_async_calls_share_one_in_flight_limit(fake: tuple[FakeResponses, str]) -> None:
+    responses, base_url = fake
+    responses.delay = 0.3
+    client = LLMClient(model="fake-model", base_url=base_url)
+    calls = MAX_IN_FLIGHT + 4
+
+    async def async_calls() -> list[str | None]:
+        return await asyncio.gather(*(client.agenerate_patch("s", f"async {k}") for k in range(calls)))
+
+    sync_results: list[str | None] = []
+    threads = [
+        threading.Thread(target=lambda k=k: sync_results.append(client.generate_patch("s", f"sync {k}")))
+        for k in range(calls)
+    ]
+    for thread in threads:
+        thread.start()
+    async_results = asyncio.run(async_calls())
+    for thread in threads:
+        thread.join()
+
+    assert len(responses.requests) == 2 * calls
+    assert all(async_results) and len(sync_results) == calls and all(sync_results)
+    assert responses.peak == MAX_IN_FLIGHT
+
+
+def test_cancelled_async_waiter_returns_its_slot(fake: tuple[FakeResponses, str]) -> None:
+    responses, base_url = fake
+    responses.delay = 0.2
+    client = LLMClient(model="fake-model", base_url=base_url)
+
+    async def scenario() -> None:
+        busy = [asyncio.ensure_future(client.agenerate_patch("s", f"busy {k}")) for k in range(MAX_IN_FLIGHT)]
+        await asyncio.sleep(0.05)
+        waiter = asyncio.ensure_future(client.agenerate_patch("s", "waiter"))
+        await asyncio.sleep(0.05)
+        waiter.cancel()
+        await asyncio.gather(*busy)
+        await asyncio.sleep(0.05)
+
+    asyncio.run(scenario())
+    # Every slot is free again.
+    assert all(llm_client._SLOTS.acquire(blocking=False) for _ in range(MAX_IN_FLIGHT))
+    for _ in range(MAX_IN_FLIGHT):
+        llm_client._SLOTS.release()
+
+
+def test_replay_serves_cached_responses_offline(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    llm_client.configure(cache_dir=tmp_path, mode="replay")
+    cache = ResponseCache(tmp_path)
+    cache.put(ResponseCache.key(llm_client.DEFAULT_MODEL, "high", "s", "u"), llm_client.DEFAULT_MODEL, "high", "cached")
+    client = LLMClient()
+    assert client.enabled
+    assert client.generate_patch("s", "u") == "cached"
+    assert asyncio.run(client.agenerate_patch("s", "u")) == "cached"
+    assert client.generate_patch("s", "other") is None
+
+
+def test_response_cache_evicts_least_recently_used(tmp_path: Path) -> None:
+    cache = ResponseCache(tmp_path, max_bytes=300)
+    for k in range(6):
+        cache.put(f"{k:02d}" + "0" * 62, "m", None, "x" * 40)
+        time.sleep(0.01)
+    assert cache.get("00" + "0" * 62) is None
+    assert cache.get("05" + "0" * 62) == "x" * 40
+    assert sum(p.stat().st_size for p in tmp_path.glob("*/*.json")) <= 300
+
+
+def test_capabilities_persist_across_instances(tmp_path: Path) -> None:
+    path = tmp_path / "capabilities.json"
+    first = llm_client.CapabilityCache(path)
+    first.record_rejected("k", "high")
+    first.record_accepted("k", "medium")
+    first.record_missing("gone")
+    second = llm_client.CapabilityCache(path)
+    assert second.efforts("k")[0] == "medium"
+    assert "high" not in second.efforts("k")
+    assert second.is_missing("gone")
+    assert not llm_client.CapabilityCache(path, ttl_seconds=0).is_missing("gone")
+
+
+def test_capability_writes_from_two_processes_merge(tmp_path: Path) -> None:
+    path = tmp_path / "capabilities.json"
+    here = llm_client.CapabilityCache(path)
+    script = (
+        "import sys\nfrom pathlib import Path\nfrom agent_lab.child_agent import llm_client\n"
+        "llm_client.CapabilityCache(Path(sys.argv[1])).record_missing('other')\n"
+    )
+    subprocess.run([sys.executable, "-c", script, str(path)], cwd=Path(__file__).resolve().parents[2], check=True)
+    # `here` loaded the file before the other process wrote it.
+    here.record_accepted("k", "medium")
+    reloaded = llm_client.CapabilityCache(path)
+    assert reloaded.is_missing("other")
+    assert reloaded.efforts("k")[0] == "medium"
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import multiprocessing
+import shutil
+from pathlib import Path
+
+from agent_lab.child_agent import memory
+from agent_lab.child_agent.memory import AgentMemory
+from agent_lab.evals.agent_worker import AgentWorker
+
+_CHILD_AGENT = Path(__file__).resolve().parents[1] / "child_agent"
+
+
+def test_histories_survive_reload(tmp_path: Path) -> None:
+    path = tmp_path / "memory.jsonl"
+    log = AgentMemory(path)
+    log.record("a", True, 1.0, "patch-1")
+    log.record("a", False, 2.0, "patch-2")
+    log.record("a", True, 3.0, "patch-3")
+    log.close()
+    history = AgentMemory.load(path).history("a")
+    assert (history.attempts, history.passes, history.pass_streak) == (3, 2, 1)
+    assert history.last_passing_patch == "patch-3"
+    assert history.total_elapsed_seconds == 6.0
+
+
+def test_follows_other_writers_across_compaction(tmp_path: Path) -> None:
+    path = tmp_path / "memory.jsonl"
+    writer, reader = AgentMemory(path), AgentMemory(path)
+    writer.record("a", True, 1.0, "p")
+    writer.flush()
+    reader.refresh()
+    assert reader.history("a").attempts == 1
+    writer.compact()
+    writer.record("a", True, 1.0, "p")
+    writer.flush()
+    reader.refresh()
+    assert reader.history("a").attempts == 2
+    assert len(path.read_text().splitlines()) == 2
+    writer.close()
+    reader.close()
+
+
+def test_torn_final_line_is_skipped(tmp_path: Path) -> None:
+    path = tmp_path / "memory.jsonl"
+    log = AgentMemory(path)
+    log.record("a", True, 1.0, "p")
+    log.flush()
+    with path.open("ab") as fh:
+        fh.write(b'{"kind": "outcome", "task": "a", "pas')
+    log.record("b", True, 1.0, "p")
+    log.close()
+    fresh = AgentMemory(path)
+    assert fresh.history("a").attempts == 1 and fresh.history("b").attempts == 1
+    fresh.close()
+
+
+def _append(path: str, worker: int, n: int) -> None:
+    log = AgentMemory(Path(path), compact_bytes=4096)
+    for k in range(n):
+        log.record(f"t{k % 5}", bool((worker + k) % 2), 0.1, "p" * 20)
+    log.close()
+
+
+def test_concurrent_processes_lose_nothing(tmp_path: Path) -> None:
+    path = tmp_path / "memory.jsonl"
+    procs = [multiprocessing.Process(target=_append, args=(str(path), w, 200)) for w in range(4)]
+    for proc in procs:
+        proc.start()
+    for proc in procs:
+        proc.join()
+    log = AgentMemory(path)
+    assert log.total_tasks == 800 and log.total_passed == 400
+    log.close()
+
+
+def test_one_exit_hook_for_all_instances(tmp_path: Path) -> None:
+    before = len(memory._OPEN)
+    logs = [AgentMemory(tmp_path / f"m{k}.jsonl") for k in range(3)]
+    assert len(memory._OPEN) == before + 3
+    for log in logs:
+        log.close()
+    assert len(memory._OPEN) == before
+
+
+def test_agent_reuses_patches_only_for_the_same_task(tmp_path: Path) -> None:
+    task = {"id": "task_add", "instruction": "Fix add", "fixture": "toy_project"}
+    edited = {**task, "instruction": "Fix add, differently"}
+    with AgentWorker(_CHILD_AGENT, options={"memory_path": str(tmp_path / "memory.jsonl")}) as worker:
+        for _ in range(2):
+            worker.record_task_result(task, True, 0.1, "REMEMBERED")
+        assert worker.generate_task_patch(task, tmp_path) == "REMEMBERED"
+        assert worker.generate_task_patch(edited, tmp_path) != "REMEMBERED"
+
+
+def test_each_agent_tree_keeps_its_own_history(tmp_path: Path) -> None:
+    task = {"id": "task_add", "instruction": "Fix add", "fixture": "toy_project"}
+    options = {"memory_path": str(tmp_path / "memory.jsonl")}
+    candidate = tmp_path / "candidate"
+    shutil.copytree(_CHILD_AGENT, candidate, ignore=shutil.ignore_patterns("__pycache__"))
+    (candidate / "prompts.py").write_text((candidate / "prompts.py").read_text() + "# edited\n")
+    with AgentWorker(_CHILD_AGENT, options=options) as baseline:
+        for _ in range(2):
+            baseline.record_task_result(task, True, 0.1, "REMEMBERED")
+    with AgentWorker(candidate, options=options) as worker:
+        assert worker.generate_task_patch(task, tmp_path) != "REMEMBERED"
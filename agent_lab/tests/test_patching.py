@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import stat
+from pathlib import Path
+
+import pytest
+
+from agent_lab.evals.patching import NEW_FILE_MODE, PatchError, apply_patch, parse_patch
+
+
+def _write(root: Path, rel: str, text: str) -> None:
+    path = root / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+
+
+MODIFY = """\
+--- a/pkg/core.py
++++ b/pkg/core.py
+@@ -1,3 +1,3 @@
+ def add(a, b):
+-    return a - b
++    return a + b
+ 
+"""
+
+
+def test_modifies_file(tmp_path: Path) -> None:
+    _write(tmp_path, "pkg/core.py", "def add(a, b):\n    return a - b\n\n")
+    assert apply_patch(MODIFY, tmp_path) == ["pkg/core.py"]
+    assert (tmp_path / "pkg/core.py").read_text() == "def add(a, b):\n    return a + b\n\n"
+
+
+def test_hunk_found_away_from_its_header_line(tmp_path: Path) -> None:
+    _write(tmp_path, "pkg/core.py", "# header\n" * 5 + "def add(a, b):\n    return a - b\n\n")
+    apply_patch(MODIFY, tmp_path)
+    assert "return a + b" in (tmp_path / "pkg/core.py").read_text()
+
+
+def test_creates_deletes_and_renames(tmp_path: Path) -> None:
+    _write(tmp_path, "old.py", "x = 1\n")
+    _write(tmp_path, "gone.py", "y = 2\n")
+    diff = """\
+--- /dev/null
++++ b/new.py
+@@ -0,0 +1 @@
++z = 3
+--- a/gone.py
++++ /dev/null
+@@ -1 +0,0 @@
+-y = 2
+diff --git a/old.py b/moved.py
+rename from old.py
+rename to moved.py
+"""
+    apply_patch(diff, tmp_path)
+    assert (tmp_path / "new.py").read_text() == "z = 3\n"
+    assert not (tmp_path / "gone.py").exists()
+    assert not (tmp_path / "old.py").exists()
+    assert (tmp_path / "moved.py").read_text() == "x = 1\n"
+
+
+def test_all_files_or_none(tmp_path: Path) -> None:
+    _write(tmp_path, "pkg/core.py", "def add(a, b):\n    return a - b\n\n")
+    diff = MODIFY + """\
+--- a/missing.py
++++ b/missing.py
+@@ -1 +1 @@
+-a
++b
+"""
+    with pytest.raises(PatchError):
+        apply_patch(diff, tmp_path)
+    assert "return a - b" in (tmp_path / "pkg/core.py").read_text()
+
+
+def test_rejects_paths_outside_workspace(tmp_path: Path) -> None:
+    root = tmp_path / "ws"
+    root.mkdir()
+    diff = "--- /dev/null\n+++ b/../escape.py\n@@ -0,0 +1 @@\n+x\n"
+    with pytest.raises(PatchError):
+        apply_patch(diff, root)
+    assert not (tmp_path / "escape.py").exists()
+
+
+def test_non_utf8_target_is_a_patch_error(tmp_path: Path) -> None:
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg/core.py").write_bytes(b"\xff\xfe not utf-8\n")
+    with pytest.raises(PatchError, match="Cannot read pkg/core.py"):
+        apply_patch(MODIFY, tmp_path)
+
+
+def test_keeps_file_mode_and_creates_files_0644(tmp_path: Path) -> None:
+    _write(tmp_path, "pkg/core.py", "def add(a, b):\n    return a - b\n\n")
+    (tmp_path / "pkg/core.py").chmod(0o755)
+    apply_patch(MODIFY + "--- /dev/null\n+++ b/pkg/new.py\n@@ -0,0 +1 @@\n+x = 1\n", tmp_path)
+    assert stat.S_IMODE((tmp_path / "pkg/core.py").stat().st_mode) == 0o755
+    assert stat.S_IMODE((tmp_path / "pkg/new.py").stat().st_mode) == NEW_FILE_MODE
+
+
+def test_keeps_crlf_and_a_missing_final_newline(tmp_path: Path) -> None:
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg/core.py").write_bytes(b"def add(a, b):\r\n    return a - b\r\n")
+    apply_patch(MODIFY.replace("\n \n", "\n"), tmp_path)
+    assert (tmp_path / "pkg/core.py").read_bytes() == b"def add(a, b):\r\n    return a + b\r\n"
+
+    (tmp_path / "pkg/core.py").write_bytes(b"def add(a, b):\n    return a - b")
+    apply_patch(MODIFY.replace("\n \n", "\n"), tmp_path)
+    assert (tmp_path / "pkg/core.py").read_bytes() == b"def add(a, b):\n    return a + b"
+
+
+def test_no_newline_markers_set_the_final_newline(tmp_path: Path) -> None:
+    _write(tmp_path, "a.py", "x = 1\n")
+    (tmp_path / "b.py").write_bytes(b"y = 1")
+    diff = """\
+--- a/a.py
++++ b/a.py
+@@ -1 +1 @@
+-x = 1
++x = 2
+\\ No newline at end of file
+--- a/b.py
++++ b/b.py
+@@ -1 +1 @@
+-y = 1
+\\ No newline at end of file
++y = 2
+"""
+    apply_patch(diff, tmp_path)
+    assert (tmp_path / "a.py").read_bytes() == b"x = 2"
+    assert (tmp_path / "b.py").read_bytes() == b"y = 2\n"
+
+
+def test_malformed_hunk_header() -> None:
+    with pytest.raises(PatchError):
+        parse_patch("--- a/x.py\n+++ b/x.py\n@@ nonsense @@\n-a\n+b\n")
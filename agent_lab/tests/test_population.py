@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import dataclasses
+from pathlib import Path
+
+from agent_lab.evals.agent_worker import AgentWorkerPool
+from agent_lab.parent_runner.config import load_settings
+from agent_lab.parent_runner.main import _generate_candidates, _select_candidate
+from agent_lab.parent_runner.scoring import Comparison, ScoreSummary
+from agent_lab.parent_runner.snapshots import SnapshotStore
+
+# Variant 1 claims an improvement it never made; variant 2 edits the tree and returns nothing.
+_AGENT = """\
+from pathlib import Path
+
+
+def self_improve(candidate_workspace, objective):
+    if "variant 2" in objective:
+        (Path(candidate_workspace) / "notes.txt").write_text("edited")
+        return None
+    return True
+"""
+
+
+def _comparison(total: int, improved: bool = True, no_regressions: bool = True) -> Comparison:
+    baseline = ScoreSummary(total=1, by_task={}, metrics={})
+    candidate = ScoreSummary(total=total, by_task={}, metrics={})
+    return Comparison(improved=improved, no_regressions=no_regressions, baseline=baseline, candidate=candidate)
+
+
+def test_highest_score_wins_ties_go_to_lowest_index() -> None:
+    assert _select_candidate([_comparison(2), _comparison(3), _comparison(3)]) == 1
+
+
+def test_only_promotable_candidates_are_picked() -> None:
+    comparisons = [_comparison(5, no_regressions=False), _comparison(1, improved=False), _comparison(2)]
+    assert _select_candidate(comparisons) == 2
+    assert _select_candidate(comparisons[:2]) is None
+    assert _select_candidate([]) is None
+
+
+def test_candidates_are_judged_by_their_tree(tmp_path: Path) -> None:
+    agent_dir = tmp_path / "agent"
+    agent_dir.mkdir()
+    (agent_dir / "agent.py").write_text(_AGENT)
+    store = SnapshotStore(tmp_path / "store")
+    baseline = store.snapshot(agent_dir)
+    settings = dataclasses.replace(load_settings(), candidates_dir=tmp_path / "candidates")
+    with AgentWorkerPool() as pool:
+        candidates = _generate_candidates(settings, store, pool, baseline, population=2, agent_timeout=30)
+    assert candidates.self_improved == [False, True]
+    assert candidates.trees[0] == baseline and candidates.trees[1] != baseline
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+from agent_lab.evals.result_cache import ResultCache, eval_cache_key
+from agent_lab.evals.run_evals import DEFAULT_FIXTURES_ROOT, run_evals
+
+_REPO_AGENT = Path(__file__).resolve().parents[1] / "child_agent"
+_REPO_TASKS = Path(__file__).resolve().parents[1] / "evals" / "tasks.jsonl"
+
+
+def _tasks_file(tmp_path: Path, n: int) -> Path:
+    path = tmp_path / "tasks.jsonl"
+    path.write_text("".join(_REPO_TASKS.read_text().splitlines(keepends=True)[:n]))
+    return path
+
+
+def test_store_and_restore_round_trip(tmp_path: Path) -> None:
+    out = tmp_path / "out"
+    (out / "blobs").mkdir(parents=True)
+    (out / "results.json").write_text(json.dumps({"score": 1}))
+    (out / "blobs" / "ab").write_bytes(b"blob")
+    cache = ResultCache(tmp_path / "cache")
+    assert cache.restore("k" * 64, tmp_path / "miss") is None
+    cache.store("k" * 64, out)
+    restored = tmp_path / "restored"
+    assert cache.restore("k" * 64, restored) == {"score": 1}
+    assert (restored / "blobs" / "ab").read_bytes() == b"blob"
+
+
+def test_key_depends_on_options(tmp_path: Path) -> None:
+    tasks_path = _tasks_file(tmp_path, 2)
+    tasks = [json.loads(line) for line in tasks_path.read_text().splitlines()]
+
+    def key(options: dict) -> str:
+        return eval_cache_key(_REPO_AGENT, tasks_path, DEFAULT_FIXTURES_ROOT, tasks, options=options)
+
+    assert key({"shard": None}) == key({"shard": None})
+    assert key({"shard": None}) != key({"shard": "0/2"})
+
+
+def test_reordered_run_does_not_serve_a_plain_run(tmp_path: Path) -> None:
+    tasks_path = _tasks_file(tmp_path, 3)
+    file_order = [json.loads(line)["id"] for line in tasks_path.read_text().splitlines()]
+    common = {"tasks_path": tasks_path, "agent_dir": _REPO_AGENT, "cache_dir": tmp_path / "cache"}
+
+    reordered = run_evals(output_dir=tmp_path / "reordered", task_order=file_order[::-1], **common)
+    assert [task["id"] for task in reordered["tasks"]] == file_order[::-1]
+
+    plain = run_evals(output_dir=tmp_path / "plain", **common)
+    assert not plain.get("cache_hit")
+    assert [task["id"] for task in plain["tasks"]] == file_order
+
+    again = run_evals(output_dir=tmp_path / "again", **common)
+    assert again["cache_hit"]
+    assert [task["id"] for task in again["tasks"]] == file_order
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+
+from agent_lab.evals.results_index import ResultsIndex
+
+
+def _eval_dir(root: Path, name: str, passed: dict[str, bool], extra: dict[str, dict] | None = None) -> Path:
+    out = root / name
+    out.mkdir(parents=True)
+    tasks = [
+        {"id": task_id, "passed": ok, "returncode": int(not ok), "elapsed_seconds": 1.0}
+        | (extra or {}).get(task_id, {})
+        for task_id, ok in passed.items()
+    ]
+    results = {"score": sum(passed.values()), "total": len(passed), "tasks": tasks}
+    (out / "results.json").write_text(json.dumps(results))
+    return out
+
+
+def _run(
+    logs: Path,
+    run_id: str,
+    baseline: dict[str, bool],
+    tree: str,
+    extra: dict[str, dict] | None = None,
+    created_at: float = 1.0,
+) -> None:
+    run_dir = logs / run_id
+    _eval_dir(run_dir, "baseline", baseline, extra)
+    _eval_dir(run_dir, "candidate", baseline)
+    summary = {
+        "iteration": 1,
+        "promoted": False,
+        "baseline_tree": tree,
+        "candidate_tree": tree,
+        "comparison": {"baseline_total": sum(baseline.values()), "candidate_total": sum(baseline.values())},
+        "cache_hits": {"baseline": False, "candidate": True},
+    }
+    (run_dir / "summary.json").write_text(json.dumps(summary))
+    # backfill dates a run by its summary.json.
+    os.utime(run_dir / "summary.json", (created_at, created_at))
+
+
+def test_backfill_is_incremental(tmp_path: Path) -> None:
+    logs = tmp_path / "logs"
+    _run(logs, "run_1", {"a": True, "b": False}, "t1")
+    index = ResultsIndex(tmp_path / "index.sqlite")
+    assert index.backfill(logs) == {"runs": 1, "evals": 2}
+    assert index.backfill(logs) == {"runs": 0, "evals": 0}
+    [run] = index.runs()
+    assert run["run_id"] == "run_1" and run["baseline_pass_rate"] == 0.5
+
+
+def test_task_stats_skip_cache_hits_and_find_regressions(tmp_path: Path) -> None:
+    logs = tmp_path / "logs"
+    _run(logs, "run_1", {"a": True}, "t1", created_at=1.0)
+    _run(logs, "run_2", {"a": False}, "t1", extra={"a": {"outcome": "timeout"}}, created_at=2.0)
+    index = ResultsIndex(tmp_path / "index.sqlite")
+    index.backfill(logs)
+    [stats] = index.task_stats()
+    # Only the two baseline evals count; the candidates were cache hits.
+    assert stats["attempts"] == 2 and stats["pass_rate"] == 0.5
+    assert stats["flaky_trees"] == 1
+    assert stats["last_regressed_at"] == 2.0
+    kinds = [row["error_kind"] for row in index.task_history("a") if row["role"] == "baseline"]
+    assert sorted(kinds, key=str) == [None, "timeout"]
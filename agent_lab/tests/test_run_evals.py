@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import json
+import shutil
+from pathlib import Path
+
+from agent_lab.evals import run_evals as run_evals_module
+from agent_lab.evals.blobs import BlobStore
+from agent_lab.evals.run_evals import DEFAULT_FIXTURES_ROOT, run_evals
+from agent_lab.evals.workspace import WorkspaceProvisioner
+
+_REPO_AGENT = Path(__file__).resolve().parents[1] / "child_agent"
+_REPO_TASKS = Path(__file__).resolve().parents[1] / "evals" / "tasks.jsonl"
+
+
+def _tasks(n: int) -> list[dict]:
+    return [json.loads(line) for line in _REPO_TASKS.read_text().splitlines()[:n]]
+
+
+def _write(path: Path, tasks: list[dict]) -> Path:
+    path.write_text("".join(json.dumps(task) + "\n" for task in tasks))
+    return path
+
+
+def test_workers_keep_file_order(tmp_path: Path) -> None:
+    tasks_path = _write(tmp_path / "tasks.jsonl", _tasks(6))
+    serial = run_evals(tasks_path, _REPO_AGENT, tmp_path / "serial", workers=1)
+    parallel = run_evals(tasks_path, _REPO_AGENT, tmp_path / "parallel", workers=4)
+    ids = [task["id"] for task in _tasks(6)]
+    assert [task["id"] for task in parallel["tasks"]] == ids
+    assert [task["passed"] for task in parallel["tasks"]] == [task["passed"] for task in serial["tasks"]]
+    trace = (tmp_path / "parallel" / "trace.jsonl").read_text().splitlines()
+    assert [json.loads(line)["task"]["id"] for line in trace] == ids
+
+
+def test_identical_workspaces_share_one_check(tmp_path: Path) -> None:
+    task = _tasks(1)[0]
+    tasks_path = _write(tmp_path / "tasks.jsonl", [task, {**task, "id": task["id"] + "_again"}])
+    first, again = run_evals(tasks_path, _REPO_AGENT, tmp_path / "out")["tasks"]
+    assert not first["check_cache_hit"] and again["check_cache_hit"]
+    assert again["num_test_runs"] == 0 and again["passed"] == first["passed"]
+
+    undeduped = run_evals(tasks_path, _REPO_AGENT, tmp_path / "plain", dedupe_checks=False)["tasks"]
+    assert not any(task["check_cache_hit"] for task in undeduped)
+
+
+def test_unchanged_agent_is_served_from_cache(tmp_path: Path) -> None:
+    tasks_path = _write(tmp_path / "tasks.jsonl", _tasks(2))
+    cache_dir = tmp_path / "cache"
+    first = run_evals(tasks_path, _REPO_AGENT, tmp_path / "first", cache_dir=cache_dir)
+    again = run_evals(tasks_path, _REPO_AGENT, tmp_path / "again", cache_dir=cache_dir)
+    assert not first.get("cache_hit") and again["cache_hit"]
+    assert again["score"] == first["score"]
+    assert (tmp_path / "again" / "trace.jsonl").read_text() == (tmp_path / "first" / "trace.jsonl").read_text()
+
+    agent = tmp_path / "agent"
+    shutil.copytree(_REPO_AGENT, agent, ignore=shutil.ignore_patterns("__pycache__"))
+    (agent / "notes.txt").write_text("changed\n")
+    assert not run_evals(tasks_path, agent, tmp_path / "changed", cache_dir=cache_dir).get("cache_hit")
+
+
+def test_link_and_copy_workspaces_agree(tmp_path: Path) -> None:
+    tasks_path = _write(tmp_path / "tasks.jsonl", _tasks(3))
+    linked = run_evals(tasks_path, _REPO_AGENT, tmp_path / "link", workspace_mode="link")
+    copied = run_evals(tasks_path, _REPO_AGENT, tmp_path / "copy", workspace_mode="copy")
+    assert [task["passed"] for task in linked["tasks"]] == [task["passed"] for task in copied["tasks"]]
+
+
+def test_forkserver_runner_agrees_with_subprocess(tmp_path: Path) -> None:
+    tasks_path = _write(tmp_path / "tasks.jsonl", _tasks(3))
+    forked = run_evals(tasks_path, _REPO_AGENT, tmp_path / "fork", check_runner="forkserver")
+    plain = run_evals(tasks_path, _REPO_AGENT, tmp_path / "plain", check_runner="subprocess")
+    assert [task["passed"] for task in forked["tasks"]] == [task["passed"] for task in plain["tasks"]]
+
+
+def test_invalid_selection_fails_only_its_task(tmp_path: Path) -> None:
+    first, second = _tasks(2)
+    assert "select" not in first["check"]
+    bad = {**second, "check": {**second["check"], "select": ["../outside.py"]}}
+    tasks_path = _write(tmp_path / "tasks.jsonl", [first, bad])
+    good, failed = run_evals(tasks_path, _REPO_AGENT, tmp_path / "out", select_tests="goal")["tasks"]
+    assert good["outcome"] != "error" and good["num_selected_tests"]
+    assert failed["outcome"] == "error" and "../outside.py" in failed["select_error"]
+
+
+class _RecordingAgent:
+    def __init__(self) -> None:
+        self.recorded: list[bool] = []
+
+    def generate_task_patch(self, task: dict, workspace: Path, timeout: float) -> str:
+        return ""
+
+    def record_task_result(self, task: dict, passed: bool, elapsed: float, patch: str, timeout: float) -> None:
+        self.recorded.append(passed)
+
+
+class _TaintedOnce(WorkspaceProvisioner):
+    # Reports the first task's snapshot as written through, as a racing task would.
+    tainted = 1
+
+    def release(self, fixture_name, snapshot) -> bool:
+        super().release(fixture_name, snapshot)
+        self.tainted -= 1
+        return self.tainted < 0
+
+
+def test_outcome_is_recorded_once_for_the_returned_attempt(tmp_path: Path) -> None:
+    agent = _RecordingAgent()
+    with _TaintedOnce(DEFAULT_FIXTURES_ROOT, mode="copy") as provisioner:
+        result = run_evals_module._run_task(_tasks(1)[0], agent, provisioner, None, BlobStore(tmp_path))
+    assert "workspace_error" not in result
+    assert agent.recorded == [result["passed"]]
+
+
+def test_runs_with_agent_memory_bypass_the_result_cache(tmp_path: Path) -> None:
+    tasks_path = _write(tmp_path / "tasks.jsonl", _tasks(1))
+    options = {"memory_path": str(tmp_path / "memory.jsonl")}
+    for name in ("first", "again"):
+        results = run_evals(
+            tasks_path, _REPO_AGENT, tmp_path / name, cache_dir=tmp_path / "cache", agent_options=options
+        )
+        assert not results.get("cache_hit")
+    assert not (tmp_path / "cache").exists()
@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+import pytest
+
+from agent_lab.parent_runner.scoring import summarize_results
+
+
+def test_phase_totals_and_percentiles() -> None:
+    tasks = [
+        {"id": f"t{k}", "passed": True, "elapsed_seconds": float(k), "phases": {"check": float(k), "generate": 1.0}}
+        for k in range(1, 6)
+    ]
+    metrics = summarize_results({"tasks": tasks}).metrics
+    assert metrics["elapsed_seconds"] == 15.0
+    assert metrics["elapsed_seconds_p50"] == 3.0
+    assert metrics["elapsed_seconds_p90"] == pytest.approx(4.6)
+    assert metrics["check_seconds"] == 15.0 and metrics["check_seconds_p99"] == pytest.approx(4.96)
+    assert metrics["generate_seconds"] == 5.0 and metrics["generate_seconds_p50"] == 1.0
+
+
+def test_results_without_phases_have_no_phase_metrics() -> None:
+    metrics = summarize_results({"tasks": [{"id": "t", "passed": False, "elapsed_seconds": 2.0}]}).metrics
+    assert metrics["elapsed_seconds_p50"] == metrics["elapsed_seconds_p99"] == 2.0
+    assert not any(name.startswith(("check_", "generate_")) for name in metrics)
+    assert "elapsed_seconds_p50" not in summarize_results({"tasks": []}).metrics
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import pytest
+
+from agent_lab.evals import selection
+
+_COLLECTED = """\
+tests/test_math.py::test_add
+tests/test_math.py::test_add_negative[1-2]
+tests/test_math.py::test_add_negative[3-4]
+tests/test_math.py::TestDiv::test_div
+tests/test_math.py::test_adder
+
+5 tests collected in 0.01s
+"""
+
+
+def test_is_node_id() -> None:
+    for arg in ("tests/test_a.py", "tests/test_a.py::TestX::test_y", "test_a.py::test_b[1-x]"):
+        assert selection.is_node_id(arg)
+    for arg in ("-x", "--rootdir=/", "/etc/test.py", "../test_a.py", "tests/../x.py", "test_a.py::t[$(id)]"):
+        assert not selection.is_node_id(arg)
+
+
+def test_nodes_for_target_drops_parametrize_ids() -> None:
+    nodes = selection.parse_collected(_COLLECTED)
+    assert len(nodes) == 5
+    assert selection.nodes_for_target(nodes, "add") == [
+        "tests/test_math.py::test_add",
+        "tests/test_math.py::test_add_negative",
+    ]
+    assert selection.nodes_for_target(nodes, "div") == ["tests/test_math.py::TestDiv::test_div"]
+    assert selection.nodes_for_target(nodes, "mul") == []
+
+
+def test_index_collects_each_fixture_once() -> None:
+    calls: list[str] = []
+
+    def collect(fixture_name: str) -> list[str]:
+        calls.append(fixture_name)
+        return selection.parse_collected(_COLLECTED)
+
+    index = selection.TestIndex(collect)
+    task = {"fixture": "math", "goal": {"target": "add"}, "check": {"select": "goal"}}
+    assert index.select(task) == ["tests/test_math.py::test_add", "tests/test_math.py::test_add_negative"]
+    # Uncovered targets and "all" fall back to the whole suite.
+    assert index.select({**task, "goal": {"target": "mul"}}) is None
+    assert index.select({**task, "goal": {"target": "all"}}) is None
+    assert calls == ["math"]
+    assert index.select({"check": {}}) is None
+    assert index.select({"check": {"select": ["tests/test_math.py"]}}) == ["tests/test_math.py"]
+    with pytest.raises(ValueError):
+        index.select({"check": {"select": "changed"}})
+
+
+def test_run_default_applies_only_to_tasks_without_a_select() -> None:
+    index = selection.TestIndex(lambda fixture_name: selection.parse_collected(_COLLECTED), default_select="goal")
+    task = {"fixture": "math", "goal": {"target": "div"}, "check": {}}
+    assert index.select(task) == ["tests/test_math.py::TestDiv::test_div"]
+    assert index.select({**task, "check": {"select": ["tests/test_math.py"]}}) == ["tests/test_math.py"]
+    with pytest.raises(selection.SelectionError):
+        index.select({**task, "check": {"select": ["--rootdir=/"]}})
+    with pytest.raises(ValueError):
+        selection.TestIndex(lambda fixture_name: [], default_select="changed")
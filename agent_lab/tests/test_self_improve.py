@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import json
+import shutil
+import subprocess
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Iterator
+
+import pytest
+
+from agent_lab.evals.agent_worker import AgentWorker
+
+_REPO_AGENT = Path(__file__).resolve().parents[1] / "child_agent"
+
+
+def _prepend(rel: str, lines: list[str], line: str) -> str:
+    # A diff adding `line` above the first two lines of a file.
+    context = "".join(f" {old}\n" for old in lines[:2])
+    return f"--- a/{rel}\n+++ b/{rel}\n@@ -1,2 +1,3 @@\n+{line}\n{context}"
+
+
+@pytest.fixture
+def llm(monkeypatch: pytest.MonkeyPatch) -> Iterator[list[str]]:
+    # A Responses API stand-in that answers every request with the next queued text.
+    pytest.importorskip("openai")
+    replies: list[str] = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self) -> None:
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            content = [{"type": "output_text", "text": replies.pop(0), "annotations": []}]
+            message = {"type": "message", "id": "msg_1", "role": "assistant", "status": "completed", "content": content}
+            payload = {
+                "id": "resp_1",
+                "object": "response",
+                "created_at": 0,
+                "model": body["model"],
+                "status": "completed",
+                "parallel_tool_calls": False,
+                "tool_choice": "auto",
+                "tools": [],
+                "output": [message],
+            }
+            data = json.dumps(payload).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args: Any) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    # Agent workers inherit the environment.
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setenv("OPENAI_BASE_URL", f"http://127.0.0.1:{server.server_address[1]}/v1")
+    try:
+        yield replies
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _candidate(tmp_path: Path) -> Path:
+    candidate = tmp_path / "candidate"
+    shutil.copytree(_REPO_AGENT, candidate, ignore=shutil.ignore_patterns("__pycache__"))
+    return candidate
+
+
+def test_multi_file_diff_applies_every_file(tmp_path: Path, llm: list[str]) -> None:
+    candidate = _candidate(tmp_path)
+    agent_lines = (candidate / "agent.py").read_text().splitlines()
+    prompt_lines = (candidate / "prompts.py").read_text().splitlines()
+    llm.append(_prepend("agent.py", agent_lines, "# agent") + _prepend("prompts.py", prompt_lines, "# prompts"))
+    with AgentWorker(_REPO_AGENT) as worker:
+        assert worker.self_improve(candidate, "improve")
+    assert (candidate / "agent.py").read_text().splitlines() == ["# agent", *agent_lines]
+    assert (candidate / "prompts.py").read_text().splitlines() == ["# prompts", *prompt_lines]
+
+
+def test_diff_that_does_not_apply_changes_nothing(tmp_path: Path, llm: list[str]) -> None:
+    candidate = _candidate(tmp_path)
+    before = {rel: (candidate / rel).read_text() for rel in ("agent.py", "prompts.py")}
+    agent_lines = (candidate / "agent.py").read_text().splitlines()
+    llm.append(_prepend("agent.py", agent_lines, "# agent") + _prepend("prompts.py", ["stale", "context"], "# x"))
+    with AgentWorker(_REPO_AGENT) as worker:
+        assert not worker.self_improve(candidate, "improve")
+    assert {rel: (candidate / rel).read_text() for rel in before} == before
+
+
+def test_agent_tree_imports_nothing_from_agent_lab(tmp_path: Path) -> None:
+    candidate = _candidate(tmp_path)
+    # Run from inside the copy, where only the agent's own files are importable.
+    subprocess.run([sys.executable, "-c", "import agent"], cwd=candidate, check=True)
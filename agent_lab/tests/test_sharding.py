@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+
+from agent_lab.evals.sharding import merge_results, parse_shard, select_shard, shard_of
+
+_IDS = [f"task_{k}" for k in range(12)]
+
+
+def _write_shard(root: Path, index: int, count: int) -> Path:
+    shard_dir = root / f"shard_{index}"
+    (shard_dir / "blobs" / "ab").mkdir(parents=True)
+    (shard_dir / "blobs" / "ab" / f"blob{index}.gz").write_bytes(b"x")
+    tasks = [
+        {"id": task_id, "passed": k % 2 == 0} for k, task_id in enumerate(_IDS) if shard_of(task_id, count) == index
+    ]
+    results = {"tasks": tasks, "shard": {"index": index, "count": count}}
+    (shard_dir / "results.json").write_text(json.dumps(results))
+    trace = "".join(json.dumps({"task": {"id": task["id"]}}) + "\n" for task in tasks)
+    (shard_dir / "trace.jsonl").write_text(trace)
+    return shard_dir
+
+
+def test_parse_shard() -> None:
+    assert parse_shard("1/3") == (1, 3)
+    for spec in ("3/3", "-1/2", "0/0", "1", "a/b"):
+        with pytest.raises(ValueError):
+            parse_shard(spec)
+
+
+def test_shards_partition_the_tasks() -> None:
+    tasks = [{"id": task_id} for task_id in _IDS]
+    shards = [select_shard(tasks, (index, 3)) for index in range(3)]
+    assert sorted(task["id"] for shard in shards for task in shard) == sorted(_IDS)
+    # Membership depends only on the id, not on the task file's order.
+    assert select_shard(tasks[::-1], (1, 3)) == shards[1][::-1]
+
+
+def test_merge_restores_task_order(tmp_path: Path) -> None:
+    shard_dirs = [_write_shard(tmp_path, index, 3) for index in (2, 0, 1)]
+    merged = merge_results(shard_dirs, tmp_path / "merged", task_ids=_IDS)
+    assert [task["id"] for task in merged["tasks"]] == _IDS
+    assert merged["score"] == 6 and merged["shards"] == 3
+    trace = (tmp_path / "merged" / "trace.jsonl").read_text().splitlines()
+    assert [json.loads(line)["task"]["id"] for line in trace] == _IDS
+    assert len(list((tmp_path / "merged" / "blobs").rglob("*.gz"))) == 3
+
+
+def test_merge_rejects_missing_or_repeated_shards(tmp_path: Path) -> None:
+    shard_dirs = [_write_shard(tmp_path, index, 3) for index in range(3)]
+    with pytest.raises(ValueError, match="exactly once"):
+        merge_results(shard_dirs[:2], tmp_path / "merged")
+    with pytest.raises(ValueError, match="exactly once"):
+        merge_results([*shard_dirs, shard_dirs[0]], tmp_path / "merged")
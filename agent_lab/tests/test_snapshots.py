@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from agent_lab.evals.hashing import hash_tree
+from agent_lab.parent_runner.promote import promote_candidate
+from agent_lab.parent_runner.snapshots import SnapshotStore
+
+
+def _tree(root: Path, files: dict[str, str]) -> Path:
+    for rel, text in files.items():
+        (root / rel).parent.mkdir(parents=True, exist_ok=True)
+        (root / rel).write_text(text)
+    return root
+
+
+def test_snapshot_is_content_addressed_and_deduplicated(tmp_path: Path) -> None:
+    store = SnapshotStore(tmp_path / "store")
+    first = _tree(tmp_path / "a", {"agent.py": "x = 1\n", "prompts.py": "P = 'p'\n"})
+    second = _tree(tmp_path / "b", {"agent.py": "x = 2\n", "prompts.py": "P = 'p'\n"})
+    tree_a, tree_b = store.snapshot(first), store.snapshot(second)
+    assert tree_a == hash_tree(first) and tree_a != tree_b
+    assert store.snapshot(first) == tree_a
+    # prompts.py is stored once.
+    assert len(list((tmp_path / "store" / "objects").glob("*/*"))) == 3
+
+
+def test_tree_path_is_read_only_and_checkout_is_private(tmp_path: Path) -> None:
+    store = SnapshotStore(tmp_path / "store")
+    tree = store.snapshot(_tree(tmp_path / "a", {"agent.py": "x = 1\n"}))
+    materialized = store.tree_path(tree) / "agent.py"
+    assert not materialized.stat().st_mode & 0o222
+    checkout = store.checkout(tree, tmp_path / "work")
+    (checkout / "agent.py").write_text("x = 99\n")
+    assert materialized.read_text() == "x = 1\n"
+    assert store.snapshot(checkout) != tree
+
+
+def test_promotion_moves_ref_and_link(tmp_path: Path) -> None:
+    store = SnapshotStore(tmp_path / "store")
+    old = store.snapshot(_tree(tmp_path / "a", {"agent.py": "x = 1\n"}))
+    new = store.snapshot(_tree(tmp_path / "b", {"agent.py": "x = 2\n"}))
+    baseline = tmp_path / "baseline"
+    promote_candidate(store, old, baseline)
+    promote_candidate(store, new, baseline)
+    assert store.get_ref("baseline") == new
+    assert (baseline / "agent.py").read_text() == "x = 2\n"
+    with pytest.raises(KeyError):
+        store.set_ref("baseline", "0" * 64)
+
+
+def test_gc_keeps_referenced_snapshots(tmp_path: Path) -> None:
+    store = SnapshotStore(tmp_path / "store")
+    kept = store.snapshot(_tree(tmp_path / "a", {"agent.py": "x = 1\n", "shared.py": "s\n"}))
+    dropped = store.snapshot(_tree(tmp_path / "b", {"agent.py": "x = 2\n", "shared.py": "s\n"}))
+    store.tree_path(dropped)
+    store.set_ref("baseline", kept)
+    assert store.gc() == {"snapshots_removed": 1, "objects_removed": 1}
+    assert store.list_snapshots() == [kept]
+    assert (store.tree_path(kept) / "shared.py").read_text() == "s\n"
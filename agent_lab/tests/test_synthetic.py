@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+
+from agent_lab.evals.bench_harness import run_benchmark
+from agent_lab.evals.synthetic import SuiteSpec, generate_suite
+
+_SPEC = SuiteSpec(files=3, functions_per_file=4, lines_per_file=80, patch_lines=3, tasks=5, seed=1)
+
+
+def test_generated_suite_matches_spec(tmp_path: Path) -> None:
+    paths = generate_suite(tmp_path, _SPEC)
+    fixture = paths["fixtures_root"] / "synthetic"
+    modules = sorted((fixture / "src" / "synthetic").glob("mod_*.py"))
+    assert len(modules) == 3
+    assert all(len(module.read_text().splitlines()) >= 80 for module in modules)
+    tasks = [json.loads(line) for line in paths["tasks_path"].read_text().splitlines()]
+    assert len(tasks) == 5 and len({task["goal"]["target"] for task in tasks}) == 5
+    assert all(task["bench"]["patch"].count("\n-") == 3 for task in tasks)
+    # The same seed builds the same suite.
+    assert generate_suite(tmp_path / "again", _SPEC)["tasks_path"].read_text() == paths["tasks_path"].read_text()
+
+
+def test_too_many_tasks_is_rejected(tmp_path: Path) -> None:
+    with pytest.raises(ValueError):
+        generate_suite(tmp_path, SuiteSpec(files=1, functions_per_file=2, tasks=3))
+
+
+def test_benchmark_passes_every_task(tmp_path: Path) -> None:
+    stats = run_benchmark(_SPEC, workers=2, suite_dir=tmp_path)
+    assert stats["tasks"] == stats["passed"] == 5
+    assert stats["tasks_per_second"] > 0 and stats["peak_rss_mb"] > 0
+    assert "check_seconds_p50" in stats
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import time
+from pathlib import Path
+
+from agent_lab.evals.queue_worker import _Leases
+from agent_lab.evals.task_queue import TaskQueue
+
+
+def _queue(tmp_path: Path, n: int = 1) -> TaskQueue:
+    queue = TaskQueue(tmp_path / "queue.sqlite")
+    queue.post([{"id": f"t{k}"} for k in range(n)], {"workers": 1})
+    return queue
+
+
+def test_claims_in_task_order(tmp_path: Path) -> None:
+    queue = _queue(tmp_path, n=3)
+    assert [queue.claim("w")[0] for _ in range(3)] == [0, 1, 2]
+    assert queue.claim("w") is None
+    assert queue.unfinished() == 3
+
+
+def test_expired_lease_is_reclaimed_and_gives_up_after_max_attempts(tmp_path: Path) -> None:
+    queue = _queue(tmp_path)
+    assert queue.claim("a", lease_seconds=0.05, max_attempts=2) is not None
+    time.sleep(0.1)
+    assert queue.claim("b", lease_seconds=0.05, max_attempts=2) is not None
+    time.sleep(0.1)
+    assert queue.claim("c", lease_seconds=0.05, max_attempts=2) is None
+    [(seq, state, result, error)] = queue.finished_after(-1)
+    assert (seq, state, result) == (0, "failed", None)
+    assert "2 attempts" in error
+
+
+def test_renew_only_matches_the_claiming_owner(tmp_path: Path) -> None:
+    queue = _queue(tmp_path)
+    queue.claim("host:1:0", lease_seconds=0.2)
+    queue.renew([0], "host:1", lease_seconds=60)
+    time.sleep(0.3)
+    assert queue.claim("other") is not None
+
+
+def test_heartbeat_keeps_a_task_that_outlives_its_lease(tmp_path: Path) -> None:
+    queue = _queue(tmp_path)
+    seq, _ = queue.claim("host:1:0", lease_seconds=0.3)
+    leases = _Leases(queue, lease_seconds=0.3)
+    try:
+        leases.hold(seq, "host:1:0")
+        time.sleep(1.0)
+        assert queue.claim("other", lease_seconds=0.3) is None
+    finally:
+        leases.close()
+    queue.complete(seq, {"id": "t0", "passed": True})
+    assert queue.finished_after(-1) == [(0, "done", {"id": "t0", "passed": True}, None)]
+    assert queue.unfinished() == 0
+
+
+def test_first_result_wins(tmp_path: Path) -> None:
+    queue = _queue(tmp_path)
+    queue.claim("a")
+    queue.complete(0, {"id": "t0", "passed": True})
+    queue.fail(0, "late failure")
+    queue.complete(0, {"id": "t0", "passed": False})
+    assert queue.finished_after(-1)[0][1:3] == ("done", {"id": "t0", "passed": True})
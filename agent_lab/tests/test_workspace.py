@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import os
+import stat
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from agent_lab.evals.workspace import WorkspaceProvisioner, reflink_supported
+
+
+@pytest.fixture
+def fixtures_root(tmp_path: Path) -> Path:
+    root = tmp_path / "fixtures"
+    (root / "proj" / "pkg").mkdir(parents=True)
+    (root / "proj" / "pkg" / "core.py").write_text("VALUE = 'clean'\n")
+    return root
+
+
+def _poison(path: Path) -> None:
+    # Same size, mtime and mode restored: only ctime and content give it away.
+    st = path.stat()
+    path.chmod(st.st_mode | stat.S_IWUSR)
+    path.write_text("VALUE = 'dirty'\n")
+    path.chmod(st.st_mode)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+
+def test_auto_mode_links_only_with_reflinks(fixtures_root: Path) -> None:
+    with WorkspaceProvisioner(fixtures_root) as provisioner:
+        expected = "link" if reflink_supported(Path(tempfile.gettempdir())) else "copy"
+        assert provisioner.mode == expected
+
+
+def test_copy_workspaces_are_independent(fixtures_root: Path, tmp_path: Path) -> None:
+    with WorkspaceProvisioner(fixtures_root, mode="copy") as provisioner:
+        assert provisioner.materialize("proj", tmp_path / "a") is None
+        (tmp_path / "a" / "pkg" / "core.py").write_text("changed\n")
+        provisioner.materialize("proj", tmp_path / "b")
+        assert (tmp_path / "b" / "pkg" / "core.py").read_text() == "VALUE = 'clean'\n"
+        assert provisioner.release("proj", None)
+
+
+def test_untouched_link_workspace_is_intact(fixtures_root: Path, tmp_path: Path) -> None:
+    with WorkspaceProvisioner(fixtures_root, mode="link") as provisioner:
+        for name in ("a", "b"):
+            snapshot = provisioner.materialize("proj", tmp_path / name)
+            assert snapshot is not None
+            assert provisioner.release("proj", snapshot)
+
+
+def test_write_through_link_taints_overlapping_workspaces(fixtures_root: Path, tmp_path: Path) -> None:
+    with WorkspaceProvisioner(fixtures_root, mode="link") as provisioner:
+        first = provisioner.materialize("proj", tmp_path / "a")
+        second = provisioner.materialize("proj", tmp_path / "b")
+        _poison(tmp_path / "a" / "pkg" / "core.py")
+        if provisioner._reflink_supported:
+            # Copy-on-write: the write never reached the snapshot.
+            assert provisioner.release("proj", first)
+            return
+        assert (tmp_path / "b" / "pkg" / "core.py").read_text() == "VALUE = 'dirty'\n"
+        assert not provisioner.release("proj", first)
+        assert not provisioner.release("proj", second)
+
+        fresh = provisioner.materialize("proj", tmp_path / "c")
+        assert fresh is not None and fresh.generation != first.generation
+        assert (tmp_path / "c" / "pkg" / "core.py").read_text() == "VALUE = 'clean'\n"
+        assert provisioner.release("proj", fresh)